@@ -0,0 +1,7 @@
+"""
+Offline micro-benchmarks for FlowSplit hot paths.
+
+Run from backend/ with src on the path, e.g.:
+
+    PYTHONPATH=src python -m benchmarks.bench_allocation
+"""
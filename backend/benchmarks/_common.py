@@ -0,0 +1,60 @@
+"""Shared helpers for the benchmark scripts."""
+import random
+import timeit
+from collections.abc import Callable
+from decimal import Decimal
+from types import SimpleNamespace
+
+from app.models.bucket import BucketType
+
+
+def make_buckets(
+    count: int, fixed_ratio: float = 0.2, seed: int = 0
+) -> list[SimpleNamespace]:
+    """
+    Build `count` bucket stand-ins shaped like ORM rows (Decimal values).
+
+    Roughly `fixed_ratio` of them are fixed; the percentage ones sum to 100%.
+    """
+    rng = random.Random(seed)
+    n_fixed = int(count * fixed_ratio)
+    n_pct = count - n_fixed
+    raw = [rng.random() for _ in range(n_pct)]
+    scale = 100 / sum(raw) if raw else 0
+    percents = [Decimal(str(round(r * scale, 2))) for r in raw]
+    if percents:
+        percents[-1] = Decimal(100) - sum(percents[:-1])
+
+    buckets = []
+    for i in range(n_fixed):
+        buckets.append(SimpleNamespace(
+            id=f"fixed-{i}",
+            bucket_type=BucketType.FIXED.value,
+            allocation_value=Decimal(rng.randint(5, 200)),
+            target_amount=None,
+            current_balance=Decimal(0),
+        ))
+    for i, percent in enumerate(percents):
+        buckets.append(SimpleNamespace(
+            id=f"pct-{i}",
+            bucket_type=BucketType.PERCENTAGE.value,
+            allocation_value=percent,
+            target_amount=None,
+            current_balance=Decimal(0),
+        ))
+    return buckets
+
+
+def best_of(fn: Callable[[], object], number: int, repeat: int = 5) -> float:
+    """Best per-call time in microseconds over `repeat` runs of `number` calls."""
+    return min(timeit.repeat(fn, number=number, repeat=repeat)) / number * 1e6
+
+
+def print_table(headers: list[str], rows: list[list[object]]) -> None:
+    widths = [
+        max(len(str(h)), *(len(str(r[i])) for r in rows))
+        for i, h in enumerate(headers)
+    ]
+    print("  ".join(str(h).rjust(w) for h, w in zip(headers, widths)))
+    for row in rows:
+        print("  ".join(str(c).rjust(w) for c, w in zip(row, widths)))
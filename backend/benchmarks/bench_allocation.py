@@ -0,0 +1,190 @@
+"""
+Allocation core benchmark.
+
+1. Integer-cents engine vs the previous float calculate_allocation.
+2. The shared AllocationProgram under both policies — preview (CAP) and
+   template auto-apply (REJECT) — vs the previous Decimal auto-apply math.
+3. Target-capped preview: single-pass water-filling vs naive re-looping.
+
+    PYTHONPATH=src python -m benchmarks.bench_allocation
+"""
+from decimal import Decimal
+from types import SimpleNamespace
+
+from app.models.bucket import BucketType
+from app.services.allocation import (
+    AllocationProgram,
+    OverflowPolicy,
+    calculate_allocation,
+    to_cents,
+)
+from benchmarks._common import best_of, make_buckets, print_table
+
+
+def legacy_calculate_allocation(total_amount: float, buckets) -> dict[str, float]:
+    """The float implementation calculate_allocation replaced (baseline)."""
+    if not buckets:
+        return {}
+
+    allocations: dict[str, float] = {}
+    remaining = total_amount
+
+    fixed_buckets = [b for b in buckets if b.bucket_type == BucketType.FIXED.value]
+    for bucket in fixed_buckets:
+        allocation = min(float(bucket.allocation_value), remaining)
+        if allocation > 0:
+            allocations[bucket.id] = round(allocation, 2)
+            remaining -= allocation
+
+    percentage_buckets = [
+        b for b in buckets if b.bucket_type == BucketType.PERCENTAGE.value
+    ]
+    total_percentage = sum(float(b.allocation_value) for b in percentage_buckets)
+
+    if total_percentage > 0 and remaining > 0:
+        for bucket in percentage_buckets:
+            percentage = float(bucket.allocation_value)
+            if total_percentage > 100:
+                percentage = (percentage / total_percentage) * 100
+            allocation = round((percentage / 100) * remaining, 2)
+            if allocation > 0:
+                allocations[bucket.id] = allocation
+
+    allocated_total = sum(allocations.values())
+    if allocations and abs(total_amount - allocated_total) > 0.01:
+        first_bucket_id = next(iter(allocations))
+        allocations[first_bucket_id] = round(
+            allocations[first_bucket_id] + (total_amount - allocated_total), 2
+        )
+
+    return allocations
+
+
+def legacy_template_math(deposit_amount: float, items) -> list[tuple[str, Decimal]] | None:
+    """The Decimal per-item math auto-apply used before (baseline)."""
+    deposit = Decimal(str(deposit_amount))
+    action_amounts: list[tuple[str, Decimal]] = []
+    fixed_total = Decimal("0")
+    for item in items:
+        if item.allocation_type == "fixed":
+            amount = Decimal(str(item.allocation_value))
+            fixed_total += amount
+            action_amounts.append((item.bucket_id, amount))
+        else:
+            amount = (deposit * Decimal(str(item.allocation_value)) / Decimal("100")).quantize(
+                Decimal("0.01")
+            )
+            action_amounts.append((item.bucket_id, amount))
+    if fixed_total > deposit:
+        return None
+    return action_amounts
+
+
+def template_items(buckets) -> list[SimpleNamespace]:
+    return [
+        SimpleNamespace(
+            bucket_id=b.id,
+            allocation_type=b.bucket_type,
+            allocation_value=b.allocation_value,
+        )
+        for b in buckets
+    ]
+
+
+def bench_policies(amount: float) -> None:
+    rows = []
+    for count in (10, 20, 30, 50):
+        buckets = make_buckets(count, seed=count)
+        items = template_items(buckets)
+        program = AllocationProgram.from_buckets(buckets)
+        total = to_cents(amount)
+        legacy = best_of(lambda: legacy_template_math(amount, items), 5000, repeat=7)
+        cap = best_of(lambda: program.run(total, OverflowPolicy.CAP), 5000, repeat=7)
+        reject = best_of(lambda: program.run(total, OverflowPolicy.REJECT), 5000, repeat=7)
+        compile_us = best_of(
+            lambda: AllocationProgram.from_template(SimpleNamespace(items=items)), 2000
+        )
+        rows.append([
+            count,
+            f"{legacy:.1f}",
+            f"{cap:.1f}",
+            f"{reject:.1f}",
+            f"{compile_us:.1f}",
+        ])
+    print(f"\nshared core, deposit ${amount} (µs per call)")
+    print("compile = AllocationProgram.from_template (paid once per cache miss)")
+    print_table(
+        ["buckets", "legacy auto-apply", "preview CAP", "auto-apply REJECT", "compile"],
+        rows,
+    )
+
+
+def naive_capped_split(pool: int, weights: list[int], caps: list[int | None]) -> list[float]:
+    """Re-loop until no share exceeds its cap (floats, no cent rounding)."""
+    shares = [0.0] * len(weights)
+    active = [i for i, w in enumerate(weights) if w > 0]
+    left = float(pool)
+    while active:
+        weight = sum(weights[i] for i in active)
+        over = [i for i in active if caps[i] is not None and caps[i] < left * weights[i] / weight]
+        if not over:
+            for i in active:
+                shares[i] = left * weights[i] / weight
+            break
+        for i in over:
+            shares[i] = caps[i]
+            left -= caps[i]
+        active = [i for i in active if i not in over]
+    return shares
+
+
+def bench_targets(amount: float) -> None:
+    rows = []
+    total = to_cents(amount)
+    for count in (10, 50, 200, 1000):
+        buckets = make_buckets(count, fixed_ratio=0, seed=count)
+        level = Decimal(str(amount)) / count
+        for i, bucket in enumerate(buckets):
+            # Every other bucket has a target spread around the fair share, so
+            # filling one raises the level past the next: many re-loop rounds
+            bucket.target_amount = (level * i / count).quantize(Decimal("0.01")) if i % 2 else None
+            bucket.current_balance = Decimal(0)
+        program = AllocationProgram.from_buckets(buckets)
+        capped = AllocationProgram.from_buckets(buckets, respect_targets=True)
+        headroom = [to_cents(b.target_amount) if b.target_amount is not None else None for b in buckets]
+        naive = best_of(lambda: naive_capped_split(total, list(capped.weights), headroom), 200)
+        uncapped_us = best_of(lambda: program.run(total), 200)
+        capped_us = best_of(lambda: capped.run(total), 200)
+        rows.append([count, f"{uncapped_us:.1f}", f"{naive:.1f}", f"{capped_us:.1f}"])
+    print(f"\nrespect_targets preview, deposit ${amount} (µs per call)")
+    print_table(["buckets", "uncapped", "naive re-loop", "water-fill"], rows)
+
+
+def main() -> None:
+    amount = 4321.87
+    rows = []
+    for count in (10, 20, 30, 50):
+        buckets = make_buckets(count, seed=count)
+        legacy = best_of(lambda: legacy_calculate_allocation(amount, buckets), 5000, repeat=7)
+        cents = best_of(lambda: calculate_allocation(amount, buckets), 5000, repeat=7)
+        program = AllocationProgram.from_buckets(buckets)
+        compiled = best_of(lambda: program.allocate(amount), 5000, repeat=7)
+        drift = abs(sum(legacy_calculate_allocation(amount, buckets).values()) - amount)
+        rows.append([
+            count,
+            f"{legacy:.1f}",
+            f"{cents:.1f}",
+            f"{legacy / cents:.2f}x",
+            f"{compiled:.1f}",
+            f"{drift:.4f}",
+        ])
+    print(f"calculate_allocation, deposit ${amount} (µs per call)")
+    print("compiled = cached AllocationProgram.allocate (preview hot path)")
+    print_table(["buckets", "float", "cents", "speedup", "compiled", "float drift $"], rows)
+
+    bench_policies(amount)
+    bench_targets(amount)
+
+
+if __name__ == "__main__":
+    main()
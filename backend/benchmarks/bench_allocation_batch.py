@@ -0,0 +1,51 @@
+"""
+Batch (NumPy) allocation vs a per-deposit calculate_allocation loop.
+
+    PYTHONPATH=src python -m benchmarks.bench_allocation_batch
+
+The scalar loop is timed on up to 100k deposits and extrapolated beyond that.
+"""
+import time
+
+import numpy as np
+
+from app.services.allocation import calculate_allocation, calculate_allocation_batch
+from benchmarks._common import make_buckets, print_table
+
+SCALAR_CAP = 100_000
+
+
+def main() -> None:
+    rng = np.random.default_rng(0)
+    buckets = make_buckets(12, seed=12)
+    rows = []
+    for n in (1_000, 100_000, 1_000_000):
+        amounts = np.round(rng.uniform(10, 10_000, size=n), 2)
+
+        start = time.perf_counter()
+        matrix = calculate_allocation_batch(amounts, buckets)
+        batch_s = time.perf_counter() - start
+
+        sample = amounts[: min(n, SCALAR_CAP)].tolist()
+        start = time.perf_counter()
+        scalar = [calculate_allocation(a, buckets) for a in sample]
+        scalar_s = (time.perf_counter() - start) * n / len(sample)
+
+        # Spot-check bit-identity on the scalar sample
+        floats = matrix.amounts
+        for i in range(0, len(sample), max(1, len(sample) // 1000)):
+            for j, bucket_id in enumerate(matrix.bucket_ids):
+                assert floats[i, j] == scalar[i].get(bucket_id, 0.0)
+
+        rows.append([
+            f"{n:,}",
+            f"{scalar_s * 1e3:,.1f}" + (" (est.)" if n > SCALAR_CAP else ""),
+            f"{batch_s * 1e3:,.1f}",
+            f"{scalar_s / batch_s:,.0f}x",
+        ])
+    print(f"{len(buckets)} buckets (ms total)")
+    print_table(["deposits", "scalar loop", "batch", "speedup"], rows)
+
+
+if __name__ == "__main__":
+    main()
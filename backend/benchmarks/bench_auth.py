@@ -0,0 +1,70 @@
+"""
+Per-request auth CPU: full JWT verification vs the verified-token cache.
+
+    PYTHONPATH=src python -m benchmarks.bench_auth
+
+Signs ES256 (Supabase's asymmetric default), RS256 and HS256 tokens with
+local keys and times verify_supabase_token with the cache cleared before
+every call (what each request paid before) and warm (a bearer token reused
+across a screen's requests). The public keys are loaded straight into the
+JWKS store, so no network time is included: the difference is pure CPU.
+"""
+import jwt
+from cryptography.hazmat.primitives.asymmetric import ec, rsa
+from jwt.algorithms import ECAlgorithm, RSAAlgorithm
+
+from app.core import security
+from app.core.jwks import supabase_jwks
+from benchmarks._common import best_of, print_table
+
+HS256_SECRET = "bench-secret-of-at-least-32-bytes!!"
+
+
+def run(coro):
+    """Drive a coroutine that never suspends (warm JWKS store) without a loop."""
+    try:
+        coro.send(None)
+    except StopIteration as done:
+        return done.value
+    raise RuntimeError("verify_supabase_token awaited the network")
+
+
+def make_token(algorithm: str) -> str:
+    """A token for algorithm, with its public key loaded into the JWKS store."""
+    claims = {"sub": "user-1", "aud": "authenticated", "exp": 4_102_444_800}
+    if algorithm == "HS256":
+        return jwt.encode(claims, HS256_SECRET, algorithm="HS256")
+    if algorithm == "ES256":
+        private = ec.generate_private_key(ec.SECP256R1())
+        public = ECAlgorithm.to_jwk(private.public_key(), as_dict=True)
+    else:
+        private = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        public = RSAAlgorithm.to_jwk(private.public_key(), as_dict=True)
+    supabase_jwks.load({"keys": [{**public, "kid": algorithm, "alg": algorithm, "use": "sig"}]})
+    return jwt.encode(claims, private, algorithm=algorithm, headers={"kid": algorithm})
+
+
+def main() -> None:
+    security.settings.supabase_jwt_secret = HS256_SECRET
+    rows = []
+    for algorithm in ("ES256", "RS256", "HS256"):
+        token = make_token(algorithm)
+
+        def uncached() -> None:
+            security.clear_verified_tokens()
+            run(security.verify_supabase_token(token))
+
+        def cached() -> None:
+            run(security.verify_supabase_token(token))
+
+        assert run(security.verify_supabase_token(token)) is not None
+        cold = best_of(uncached, number=200)
+        warm = best_of(cached, number=2_000)
+        rows.append([algorithm, f"{cold:.1f}", f"{warm:.2f}", f"{cold - warm:.1f}", f"{cold / warm:.0f}x"])
+
+    print("µs per verify_supabase_token call, best of 5")
+    print_table(["alg", "verify", "cached", "saved/request", "speedup"], rows)
+
+
+if __name__ == "__main__":
+    main()
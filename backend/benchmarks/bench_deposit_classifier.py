@@ -0,0 +1,95 @@
+"""
+Deposit classification: per-transaction rule rebuild vs compiled classifier.
+
+    PYTHONPATH=src python -m benchmarks.bench_deposit_classifier
+
+Classifies 10k synthetic Plaid transactions (mixed debits, credits, pending,
+categories and merchants) with the old is_deposit_transaction logic, which
+rebuilt its category set on every call, and with DepositClassifier.classify
+under the default rules and under a user rule set with merchant lists.
+"""
+import random
+from datetime import date
+from types import SimpleNamespace
+
+from app.services.deposit_classifier import DepositClassifier
+from app.services.plaid import PlaidTransaction
+from benchmarks._common import best_of, print_table
+
+TRANSACTION_COUNT = 10_000
+CATEGORIES = [
+    "Payroll", "Transfer", "Direct Deposit", "Income", "Dividend",
+    "Food and Drink", "Shops", "Travel", "Payment", "Recreation",
+]
+MERCHANTS = [None, "Gusto", "ADP", "Venmo", "Etsy Payouts", "Starbucks", "Amazon", "Uber"]
+
+
+def legacy_is_deposit(transaction: PlaidTransaction) -> bool:
+    """PlaidService.is_deposit_transaction before the classifier (baseline)."""
+    if transaction.amount >= 0:
+        return False
+    if transaction.pending:
+        return False
+    min_deposit = 10.00
+    if abs(transaction.amount) < min_deposit:
+        return False
+    deposit_categories = {
+        "Transfer",
+        "Payroll",
+        "Direct Deposit",
+        "Income",
+        "Dividend",
+    }
+    if any(cat in deposit_categories for cat in transaction.category):
+        return True
+    return False
+
+
+def make_transactions(count: int, seed: int = 0) -> list[PlaidTransaction]:
+    rng = random.Random(seed)
+    return [
+        PlaidTransaction(
+            transaction_id=f"tx-{i}",
+            account_id="acc",
+            amount=round(rng.uniform(-3_000, 500), 2),
+            date=date(2026, 1, 1),
+            name=f"TRANSACTION {i % 97}",
+            merchant_name=rng.choice(MERCHANTS),
+            category=rng.sample(CATEGORIES, rng.randint(1, 3)),
+            pending=rng.random() < 0.05,
+        )
+        for i in range(count)
+    ]
+
+
+def main() -> None:
+    transactions = make_transactions(TRANSACTION_COUNT)
+    default = DepositClassifier.compile()
+    custom = DepositClassifier.compile(SimpleNamespace(
+        min_amount=25,
+        allow_categories=["Interest Earned"],
+        deny_categories=["Transfer"],
+        allow_merchants=["Etsy Payouts"],
+        deny_merchants=["Venmo"],
+    ))
+    assert default.classify(transactions) == [t for t in transactions if legacy_is_deposit(t)]
+
+    cases = [
+        ("legacy per-transaction", lambda: [t for t in transactions if legacy_is_deposit(t)]),
+        ("classify (defaults)", lambda: default.classify(transactions)),
+        ("classify (user rules)", lambda: custom.classify(transactions)),
+    ]
+    baseline = None
+    rows = []
+    for name, fn in cases:
+        micros = best_of(fn, number=5)
+        baseline = baseline or micros
+        rows.append([name, f"{micros / 1000:.2f}", f"{micros * 1000 / TRANSACTION_COUNT:.0f}",
+                     f"{baseline / micros:.1f}x"])
+
+    print(f"{TRANSACTION_COUNT:,} synthetic transactions, best of 5")
+    print_table(["classifier", "ms", "ns/tx", "speedup"], rows)
+
+
+if __name__ == "__main__":
+    main()
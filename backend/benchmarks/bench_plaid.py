@@ -0,0 +1,90 @@
+"""
+Plaid round trips through the SDK, against the local stand-in.
+
+    PYTHONPATH=src python -m benchmarks.bench_plaid [--latency-ms 80] [--concurrency 8]
+
+Starts benchmarks.fake_plaid in-process and points PlaidService at it, then
+times a full first sync of one item at several page sizes (detection) and
+a batch of transfers (authorization + create each) issued with
+--concurrency in flight (execution). Per-request latency is simulated by
+the fake, so results show how page size and concurrency amortise it; the
+remainder is SDK serialization and thread hand-off cost. On sync that
+remainder dominates: the SDK's type-checked deserialization of composed
+Transaction models costs milliseconds per transaction.
+"""
+import argparse
+import asyncio
+import time
+
+from app.services import plaid as plaid_module
+from app.services.plaid import PlaidService
+from benchmarks._common import print_table
+from benchmarks.fake_plaid import (
+    ACCESS_TOKEN_PREFIX,
+    FakePlaid,
+    FakePlaidConfig,
+    serve_in_thread,
+)
+
+TRANSACTIONS = 5_000
+PAGE_SIZES = (100, 250, 500)
+TRANSFERS = 200
+
+
+async def time_sync(service: PlaidService, item_id: str) -> tuple[float, int, int]:
+    """(seconds, pages, transactions) for a first sync of item_id."""
+    start = time.perf_counter()
+    pages = transactions = 0
+    async for page in service.sync_transactions(ACCESS_TOKEN_PREFIX + item_id):
+        pages += 1
+        transactions += len(page.added)
+    return time.perf_counter() - start, pages, transactions
+
+
+async def time_transfers(service: PlaidService, count: int, concurrency: int) -> float:
+    slots = asyncio.Semaphore(concurrency)
+
+    async def one(i: int) -> None:
+        async with slots:
+            await service.create_plaid_transfer(
+                ACCESS_TOKEN_PREFIX + "item-0", "item-0-checking", 25.0, "FlowSplit", f"bench-{i}"
+            )
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(count)))
+    return time.perf_counter() - start
+
+
+async def run(latency_ms: float, concurrency: int) -> None:
+    fake = FakePlaid(FakePlaidConfig(transactions_per_item=TRANSACTIONS, latency_ms=latency_ms))
+    settings = plaid_module.settings
+    with serve_in_thread(fake) as url:
+        settings.plaid_host, settings.plaid_client_id, settings.plaid_secret = url, "bench", "bench"
+        service = PlaidService()
+
+        rows = []
+        for page_size in PAGE_SIZES:
+            fake.config.page_size = page_size
+            seconds, pages, transactions = await time_sync(service, f"item-{page_size}")
+            rows.append([page_size, pages, f"{seconds * 1000:.0f}", f"{transactions / seconds:,.0f}"])
+        print(f"First sync of {TRANSACTIONS:,} transactions, {latency_ms:.0f} ms simulated latency")
+        print_table(["page size", "pages", "ms", "tx/s"], rows)
+
+        rows = []
+        for in_flight in sorted({1, concurrency}):
+            seconds = await time_transfers(service, TRANSFERS, in_flight)
+            rows.append([in_flight, f"{seconds * 1000:.0f}", f"{TRANSFERS / seconds:.1f}"])
+        print(f"\n{TRANSFERS} transfers (authorize + create)")
+        print_table(["in flight", "ms", "transfers/s"], rows)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+    asyncio.run(run(args.latency_ms, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
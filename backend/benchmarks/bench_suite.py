@@ -0,0 +1,156 @@
+"""
+Allocation regression suite.
+
+Times preview (calculate_allocation / cached program, CAP) and template
+auto-apply (template program, REJECT) over a grid of bucket counts, fixed /
+percentage mixes and amount ranges, so changes to the engine can be checked
+against a saved baseline. Correctness is covered by
+tests/test_allocation_properties.py.
+
+    PYTHONPATH=src python -m benchmarks.bench_suite --save baseline.json
+    # ...change the engine...
+    PYTHONPATH=src python -m benchmarks.bench_suite --compare baseline.json
+
+--compare exits non-zero if any case is slower than the baseline by more
+than --threshold (default 25%). Each case also times a fixed pure-Python
+calibration loop, and baseline timings are rescaled by its ratio, so machine
+speed drift (frequency scaling, noisy neighbours) is not reported as a
+regression.
+"""
+import argparse
+import json
+import random
+import sys
+from types import SimpleNamespace
+
+from app.services.allocation import (
+    AllocationProgram,
+    OverflowPolicy,
+    calculate_allocation,
+    to_cents,
+)
+from benchmarks._common import best_of, make_buckets, print_table
+
+BUCKET_COUNTS = (1, 5, 20, 100)
+FIXED_RATIOS = (0.0, 0.2, 0.5)
+AMOUNT_RANGES = {
+    "small": (1, 100),
+    "typical": (100, 5_000),
+    "large": (5_000, 1_000_000),
+}
+SAMPLE_SIZE = 200
+
+
+def template_from(buckets) -> SimpleNamespace:
+    return SimpleNamespace(items=[
+        SimpleNamespace(
+            bucket_id=b.id,
+            allocation_type=b.bucket_type,
+            allocation_value=b.allocation_value,
+        )
+        for b in buckets
+    ])
+
+
+def run_case(count: int, fixed_ratio: float, amount_range: tuple[int, int]) -> dict[str, float]:
+    """Mean µs per deposit for each entry point over SAMPLE_SIZE amounts."""
+    calibration = calibrate()
+    buckets = make_buckets(count, fixed_ratio=fixed_ratio, seed=count)
+    rng = random.Random(count)
+    amounts = [round(rng.uniform(*amount_range), 2) for _ in range(SAMPLE_SIZE)]
+    totals = [to_cents(amount) for amount in amounts]
+    bucket_program = AllocationProgram.from_buckets(buckets)
+    template_program = AllocationProgram.from_template(template_from(buckets))
+
+    def uncached() -> None:
+        for amount in amounts:
+            calculate_allocation(amount, buckets)
+
+    def preview() -> None:
+        for total in totals:
+            bucket_program.run(total, OverflowPolicy.CAP)
+
+    def auto_apply() -> None:
+        for total in totals:
+            try:
+                template_program.run(total, OverflowPolicy.REJECT)
+            except ValueError:
+                pass
+
+    timings = {
+        name: best_of(fn, number=5) / SAMPLE_SIZE
+        for name, fn in (
+            ("calculate_allocation", uncached),
+            ("preview", preview),
+            ("auto_apply", auto_apply),
+        )
+    }
+    timings["calibration"] = min(calibration, calibrate())
+    return timings
+
+
+def calibrate() -> float:
+    """µs for a fixed pure-Python workload; tracks the machine's current speed."""
+    return best_of(lambda: sorted(range(5_000, 0, -1), key=lambda i: i % 97), 10)
+
+
+def run_suite() -> dict[str, dict[str, float]]:
+    results = {}
+    for count in BUCKET_COUNTS:
+        for fixed_ratio in FIXED_RATIOS:
+            for range_name, amount_range in AMOUNT_RANGES.items():
+                key = f"{count}b/{int(fixed_ratio * 100)}%fixed/{range_name}"
+                results[key] = run_case(count, fixed_ratio, amount_range)
+    return results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--save", metavar="FILE", help="write results as JSON")
+    parser.add_argument("--compare", metavar="FILE", help="compare to a saved run")
+    parser.add_argument("--threshold", type=float, default=0.25)
+    args = parser.parse_args()
+
+    results = run_suite()
+    baseline = {}
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+    headers = ["case", "calculate_allocation", "preview", "auto_apply"]
+    regressions = []
+    rows = []
+    for key, timings in results.items():
+        row: list[object] = [key]
+        before_timings = baseline.get(key, {})
+        scale = timings["calibration"] / before_timings.get("calibration", timings["calibration"])
+        for name in headers[1:]:
+            cell = f"{timings[name]:.2f}"
+            before = before_timings.get(name)
+            if before:
+                before *= scale
+                change = timings[name] / before - 1
+                cell += f" ({change:+.0%})"
+                if change > args.threshold:
+                    regressions.append(f"{key} {name}: {before:.2f} -> {timings[name]:.2f} µs")
+            row.append(cell)
+        rows.append(row)
+
+    print(f"µs per deposit, best of 5 over {SAMPLE_SIZE} amounts")
+    if args.compare:
+        print("(change vs baseline, rescaled by each case's calibration loop)")
+    print_table(headers, rows)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) above {args.threshold:.0%}:")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
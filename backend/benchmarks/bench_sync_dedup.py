@@ -0,0 +1,146 @@
+"""
+Webhook sync deduplication: per-transaction SELECT vs one set lookup per page.
+
+    PYTHONPATH=src python -m benchmarks.bench_sync_dedup [--rtt-ms 1.0]
+    PYTHONPATH=src python -m benchmarks.bench_sync_dedup --database-url postgresql+asyncpg://...
+
+Without --database-url, queries go to an in-memory stand-in session that
+charges --rtt-ms of simulated round trip per query (the cost that dominates
+on the webhook path against a hosted database). With --database-url, the
+lookups run read-only against a real `deposits` table and queries are
+counted on the engine.
+"""
+import argparse
+import asyncio
+import time
+import uuid
+
+from sqlalchemy import String, any_, bindparam, event, select
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app.models.deposit import Deposit
+from benchmarks._common import print_table
+
+PAGE_SIZES = (100, 500)
+DUPLICATE_RATIO = 0.3  # share of a page already stored (e.g. an overlapping resync)
+
+
+async def legacy_dedup(db: AsyncSession, transaction_ids: list[str]) -> set[str]:
+    """The per-transaction SELECT that sync_new_transactions used to run (baseline)."""
+    existing = set()
+    for tx_id in transaction_ids:
+        result = await db.execute(select(Deposit).where(Deposit.plaid_transaction_id == tx_id))
+        if result.scalar_one_or_none():
+            existing.add(tx_id)
+    return existing
+
+
+async def array_dedup(db: AsyncSession, transaction_ids: list[str]) -> set[str]:
+    """
+    The subset of transaction_ids that already have a Deposit, in one query.
+
+    Binds the ids as a single array (`= ANY(:ids)`) rather than an IN list, so
+    the statement text — and asyncpg's prepared statement — is the same for
+    every page size.
+    """
+    if not transaction_ids:
+        return set()
+    result = await db.execute(
+        select(Deposit.plaid_transaction_id).where(
+            Deposit.plaid_transaction_id
+            == any_(bindparam("transaction_ids", transaction_ids, type_=ARRAY(String)))
+        )
+    )
+    return set(result.scalars())
+
+
+class _FakeResult:
+    def __init__(self, rows: list):
+        self._rows = rows
+
+    def scalar_one_or_none(self):
+        return self._rows[0] if self._rows else None
+
+    def scalars(self):
+        return iter(self._rows)
+
+
+class SimulatedSession:
+    """Answers the two dedup query shapes from a set, sleeping one RTT per query."""
+
+    def __init__(self, stored_ids: set[str], rtt_seconds: float):
+        self.stored_ids = stored_ids
+        self.rtt_seconds = rtt_seconds
+        self.queries = 0
+
+    async def execute(self, statement):
+        self.queries += 1
+        await asyncio.sleep(self.rtt_seconds)
+        params = statement.compile().params
+        if "transaction_ids" in params:
+            return _FakeResult([i for i in params["transaction_ids"] if i in self.stored_ids])
+        (tx_id,) = params.values()
+        return _FakeResult([object()] if tx_id in self.stored_ids else [])
+
+
+def make_page(size: int) -> tuple[list[str], set[str]]:
+    ids = [f"bench-{uuid.uuid4().hex}" for _ in range(size)]
+    return ids, set(ids[: int(size * DUPLICATE_RATIO)])
+
+
+async def run_simulated(rtt_ms: float) -> list[list[object]]:
+    rows = []
+    for size in PAGE_SIZES:
+        ids, stored = make_page(size)
+        for name, dedup in (("per-row SELECT", legacy_dedup), ("= ANY(array)", array_dedup)):
+            db = SimulatedSession(stored, rtt_ms / 1000)
+            start = time.perf_counter()
+            found = await dedup(db, ids)  # type: ignore[arg-type]
+            elapsed = (time.perf_counter() - start) * 1000
+            assert found == stored
+            rows.append([size, name, db.queries, f"{elapsed:.1f}"])
+    return rows
+
+
+async def run_database(url: str) -> list[list[object]]:
+    engine = create_async_engine(url)
+    queries = 0
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def _count(*_args) -> None:
+        nonlocal queries
+        queries += 1
+
+    rows = []
+    async with AsyncSession(engine) as db:
+        await db.execute(select(1))  # warm the connection
+        for size in PAGE_SIZES:
+            ids, _ = make_page(size)  # read-only: none of these exist
+            for name, dedup in (("per-row SELECT", legacy_dedup), ("= ANY(array)", array_dedup)):
+                queries = 0
+                start = time.perf_counter()
+                await dedup(db, ids)
+                elapsed = (time.perf_counter() - start) * 1000
+                rows.append([size, name, queries, f"{elapsed:.1f}"])
+    await engine.dispose()
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--database-url", help="run against a real database (read-only)")
+    parser.add_argument("--rtt-ms", type=float, default=1.0, help="simulated round trip per query")
+    args = parser.parse_args()
+
+    if args.database_url:
+        rows = asyncio.run(run_database(args.database_url))
+        print("dedup lookup per page against", args.database_url.split("@")[-1])
+    else:
+        rows = asyncio.run(run_simulated(args.rtt_ms))
+        print(f"dedup lookup per page, simulated {args.rtt_ms} ms round trip per query")
+    print_table(["page size", "strategy", "queries", "ms"], rows)
+
+
+if __name__ == "__main__":
+    main()
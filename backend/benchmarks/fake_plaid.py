@@ -0,0 +1,414 @@
+"""
+Local stand-in for the Plaid API, for load and integration benchmarks.
+
+    PYTHONPATH=src python -m benchmarks.fake_plaid --port 8765 \\
+        --transactions-per-item 5000 --page-size 250 --latency-ms 80 \\
+        --error-rate 0.01 --webhook-url http://localhost:8000/api/v1/webhooks/plaid \\
+        --webhook-items item-1,item-2 --webhook-interval 0.5
+
+Point the app at it with PLAID_HOST=http://localhost:8765 (PLAID_CLIENT_ID and
+PLAID_SECRET must be set, to anything). Requests then go through the real
+plaid-python SDK, so detection (transactions/sync), execution
+(transfer/authorization/create + transfer/create) and webhook verification
+(webhook_verification_key/get) run end to end with no network access.
+
+Behaviour:
+- Each item (access token `access-fake-<item_id>`) has a deterministic
+  stream of transactions, `--deposit-ratio` of them payroll-style credits.
+  transactions/sync pages through it by offset cursor, at most
+  --page-size per page.
+- Every response waits --latency-ms (± --latency-jitter-ms). --error-rate of
+  requests fail with INTERNAL_SERVER_ERROR and --mutation-rate of sync pages
+  with TRANSACTIONS_SYNC_MUTATION_DURING_PAGINATION.
+- Webhooks are signed with an ES256 key served by
+  webhook_verification_key/get, exactly as Plaid signs them. Each one adds
+  --new-per-webhook transactions to the item first, so the sync it triggers
+  has work to do. They are sent every --webhook-interval seconds, or on
+  demand via POST /sandbox/item/fire_webhook.
+- GET /fake/stats reports requests, injected errors and webhooks sent.
+"""
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import logging
+import random
+import socket
+import threading
+import time
+import uuid
+from collections import Counter
+from collections.abc import Iterator
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta, timezone
+
+import httpx
+import jwt
+from cryptography.hazmat.primitives.asymmetric import ec
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+logger = logging.getLogger(__name__)
+
+ACCESS_TOKEN_PREFIX = "access-fake-"
+DEPOSIT_CATEGORIES = [["Transfer", "Payroll"], ["Transfer", "Deposit"], ["Income"]]
+DEBIT_CATEGORIES = [["Food and Drink"], ["Shops"], ["Travel"], ["Payment"]]
+MERCHANTS = [None, "Gusto", "ADP", "Starbucks", "Amazon", "Uber"]
+# Plaid returns these objects with every field present, null when unknown
+EMPTY_LOCATION = dict.fromkeys(
+    ["address", "city", "region", "postal_code", "country", "lat", "lon", "store_number"]
+)
+EMPTY_PAYMENT_META = dict.fromkeys(
+    ["reference_number", "ppd_id", "payee", "by_order_of", "payer",
+     "payment_method", "payment_processor", "reason"]
+)
+
+
+@dataclass
+class FakePlaidConfig:
+    transactions_per_item: int = 1_000
+    page_size: int = 500  # caps the count a sync request asks for
+    deposit_ratio: float = 0.3
+    latency_ms: float = 0.0
+    latency_jitter_ms: float = 0.0
+    error_rate: float = 0.0
+    mutation_rate: float = 0.0
+    transfer_decline_rate: float = 0.0
+    webhook_url: str | None = None
+    webhook_items: list[str] = field(default_factory=list)
+    webhook_interval_seconds: float = 0.0  # 0 = only on demand
+    new_per_webhook: int = 10
+    seed: int = 0
+
+
+def _b64(n: int) -> str:
+    return base64.urlsafe_b64encode(n.to_bytes(32, "big")).rstrip(b"=").decode()
+
+
+def _error(status_code: int, error_type: str, error_code: str, message: str) -> JSONResponse:
+    return JSONResponse(
+        status_code=status_code,
+        content={
+            "error_type": error_type,
+            "error_code": error_code,
+            "error_message": message,
+            "display_message": None,
+            "request_id": uuid.uuid4().hex,
+        },
+    )
+
+
+class FakePlaid:
+    def __init__(self, config: FakePlaidConfig | None = None):
+        self.config = config or FakePlaidConfig()
+        self.rng = random.Random(self.config.seed)
+        self.kid = f"fake-{uuid.uuid4().hex[:8]}"
+        self.signing_key = ec.generate_private_key(ec.SECP256R1())
+        self.key_created_at = int(time.time())
+        self.transaction_counts: dict[str, int] = {}
+        self.transfers: dict[str, dict] = {}  # idempotency_key -> transfer
+        self.stats: Counter[str] = Counter()
+        self.app = self._build_app()
+
+    # -- data ----------------------------------------------------------------
+
+    @staticmethod
+    def item_id(access_token: str) -> str:
+        return access_token.removeprefix(ACCESS_TOKEN_PREFIX)
+
+    def transaction_count(self, item_id: str) -> int:
+        return self.transaction_counts.setdefault(item_id, self.config.transactions_per_item)
+
+    def transaction(self, item_id: str, index: int) -> dict:
+        """The index-th transaction of an item (same every time it is asked for)."""
+        rng = random.Random(f"{self.config.seed}:{item_id}:{index}")
+        is_deposit = rng.random() < self.config.deposit_ratio
+        amount = -round(rng.uniform(50, 5_000), 2) if is_deposit else round(rng.uniform(1, 400), 2)
+        category = rng.choice(DEPOSIT_CATEGORIES if is_deposit else DEBIT_CATEGORIES)
+        day = date.today() - timedelta(days=max(0, (self.transaction_count(item_id) - index) // 20))
+        return {
+            "transaction_id": f"{item_id}-tx-{index}",
+            "account_id": f"{item_id}-checking",
+            "amount": amount,
+            "iso_currency_code": "USD",
+            "unofficial_currency_code": None,
+            "category": category,
+            "category_id": None,
+            "date": day.isoformat(),
+            "authorized_date": None,
+            "authorized_datetime": None,
+            "datetime": None,
+            "location": EMPTY_LOCATION,
+            "name": f"{category[-1].upper()} {index % 97}",
+            "merchant_name": rng.choice(MERCHANTS),
+            "payment_meta": EMPTY_PAYMENT_META,
+            "payment_channel": "other",
+            "pending": False,
+            "pending_transaction_id": None,
+            "account_owner": None,
+            "transaction_code": None,
+        }
+
+    def add_transactions(self, item_id: str, count: int) -> None:
+        self.transaction_counts[item_id] = self.transaction_count(item_id) + count
+
+    # -- webhooks ------------------------------------------------------------
+
+    def public_key(self) -> dict:
+        numbers = self.signing_key.public_key().public_numbers()
+        return {
+            "alg": "ES256", "crv": "P-256", "kid": self.kid, "kty": "EC", "use": "sig",
+            "x": _b64(numbers.x), "y": _b64(numbers.y),
+            "created_at": self.key_created_at, "expired_at": None,
+        }
+
+    def sign_webhook(self, body: bytes) -> str:
+        """Plaid-Verification header value for a webhook body."""
+        claims = {"iat": int(time.time()), "request_body_sha256": hashlib.sha256(body).hexdigest()}
+        return jwt.encode(claims, self.signing_key, algorithm="ES256", headers={"kid": self.kid})
+
+    def webhook_body(self, item_id: str, code: str = "SYNC_UPDATES_AVAILABLE") -> bytes:
+        return json.dumps({
+            "webhook_type": "TRANSACTIONS",
+            "webhook_code": code,
+            "item_id": item_id,
+            "initial_update_complete": True,
+            "historical_update_complete": True,
+            "environment": "sandbox",
+        }).encode()
+
+    async def send_webhook(self, client: httpx.AsyncClient, item_id: str) -> int | None:
+        """Add new transactions to item_id and POST a signed webhook about them."""
+        self.add_transactions(item_id, self.config.new_per_webhook)
+        if not self.config.webhook_url:
+            return None
+        body = self.webhook_body(item_id)
+        try:
+            response = await client.post(
+                self.config.webhook_url,
+                content=body,
+                headers={"Content-Type": "application/json", "Plaid-Verification": self.sign_webhook(body)},
+            )
+        except httpx.HTTPError as e:
+            self.stats["webhooks_failed"] += 1
+            logger.warning("Webhook for %s failed: %s", item_id, e)
+            return None
+        self.stats["webhooks_sent"] += 1
+        return response.status_code
+
+    async def emit_webhooks(self) -> None:
+        """Round-robin signed webhooks over config.webhook_items forever."""
+        async with httpx.AsyncClient() as client:
+            while True:
+                for item_id in self.config.webhook_items:
+                    await asyncio.sleep(self.config.webhook_interval_seconds)
+                    await self.send_webhook(client, item_id)
+
+    # -- HTTP ----------------------------------------------------------------
+
+    def _fail_randomly(self, path: str) -> JSONResponse | None:
+        if self.rng.random() < self.config.error_rate:
+            self.stats["errors_injected"] += 1
+            return _error(500, "API_ERROR", "INTERNAL_SERVER_ERROR", "fake-plaid injected error")
+        if path == "/transactions/sync" and self.rng.random() < self.config.mutation_rate:
+            self.stats["mutations_injected"] += 1
+            return _error(
+                400, "TRANSACTIONS_ERROR", "TRANSACTIONS_SYNC_MUTATION_DURING_PAGINATION",
+                "Underlying transaction data changed since last page was fetched.",
+            )
+        return None
+
+    @asynccontextmanager
+    async def _lifespan(self, app: FastAPI):
+        emitter = None
+        if self.config.webhook_interval_seconds > 0 and self.config.webhook_items:
+            emitter = asyncio.create_task(self.emit_webhooks())
+        yield
+        if emitter is not None:
+            emitter.cancel()
+
+    def _build_app(self) -> FastAPI:
+        app = FastAPI(title="fake-plaid", lifespan=self._lifespan)
+
+        @app.middleware("http")
+        async def latency_and_errors(request: Request, call_next):
+            path = request.url.path
+            if path.startswith(("/fake/", "/sandbox/")):
+                return await call_next(request)
+            self.stats[f"requests {path}"] += 1
+            delay = self.config.latency_ms + self.rng.uniform(
+                -self.config.latency_jitter_ms, self.config.latency_jitter_ms
+            )
+            if delay > 0:
+                await asyncio.sleep(delay / 1000)
+            return self._fail_randomly(path) or await call_next(request)
+
+        @app.post("/transactions/sync")
+        async def transactions_sync(body: dict) -> dict:
+            item_id = self.item_id(body["access_token"])
+            start = int(body.get("cursor") or 0)
+            count = min(int(body.get("count") or 100), self.config.page_size)
+            end = min(start + count, self.transaction_count(item_id))
+            return {
+                "transactions_update_status": "HISTORICAL_UPDATE_COMPLETE",
+                "accounts": [],
+                "added": [self.transaction(item_id, i) for i in range(start, end)],
+                "modified": [],
+                "removed": [],
+                "next_cursor": str(end),
+                "has_more": end < self.transaction_count(item_id),
+                "request_id": uuid.uuid4().hex,
+            }
+
+        @app.post("/transfer/authorization/create")
+        async def transfer_authorization_create(body: dict) -> dict:
+            approved = self.rng.random() >= self.config.transfer_decline_rate
+            return {
+                "authorization": {
+                    "id": f"auth-{uuid.uuid4().hex}",
+                    "created": datetime.now(timezone.utc).isoformat(),
+                    "decision": "approved" if approved else "declined",
+                    "decision_rationale": None if approved else {
+                        "code": "NSF", "description": "Insufficient funds (fake-plaid)",
+                    },
+                    "guarantee_decision": None,
+                    "guarantee_decision_rationale": None,
+                    "payment_risk": None,
+                    "proposed_transfer": {
+                        "ach_class": body.get("ach_class", "ppd"),
+                        "account_id": body["account_id"],
+                        "funding_account_id": None,
+                        "type": body["type"],
+                        "user": {"phone_number": None, "email_address": None, "address": None, **body["user"]},
+                        "amount": body["amount"],
+                        "requested_amount": body["amount"],
+                        "network": body["network"],
+                        "iso_currency_code": "USD",
+                        "origination_account_id": "",
+                        "originator_client_id": None,
+                        "credit_funds_source": None,
+                    },
+                },
+                "request_id": uuid.uuid4().hex,
+            }
+
+        @app.post("/transfer/create")
+        async def transfer_create(body: dict) -> dict:
+            key = body.get("idempotency_key") or uuid.uuid4().hex
+            transfer = self.transfers.get(key)
+            if transfer is None:
+                transfer = self.transfers[key] = {
+                    "id": f"transfer-{uuid.uuid4().hex}",
+                    "authorization_id": body["authorization_id"],
+                    "account_id": body.get("account_id"),
+                    "funding_account_id": None,
+                    "type": "debit",
+                    "user": {
+                        "legal_name": "FlowSplit User", "phone_number": None,
+                        "email_address": None, "address": None,
+                    },
+                    "amount": body.get("amount") or "0.00",
+                    "description": body["description"],
+                    "created": datetime.now(timezone.utc).isoformat(),
+                    "status": "pending",
+                    "network": "ach",
+                    "cancellable": True,
+                    "failure_reason": None,
+                    "metadata": None,
+                    "origination_account_id": "",
+                    "guarantee_decision": None,
+                    "guarantee_decision_rationale": None,
+                    "iso_currency_code": "USD",
+                    "standard_return_window": None,
+                    "unauthorized_return_window": None,
+                    "expected_settlement_date": None,
+                    "originator_client_id": None,
+                    "refunds": [],
+                    "recurring_transfer_id": None,
+                    "credit_funds_source": None,
+                }
+            return {"transfer": transfer, "request_id": uuid.uuid4().hex}
+
+        @app.post("/webhook_verification_key/get")
+        async def webhook_verification_key_get(body: dict):
+            if body.get("key_id") != self.kid:
+                return _error(400, "INVALID_INPUT", "INVALID_WEBHOOK_VERIFICATION_KEY_ID", "unknown key_id")
+            return {"key": self.public_key(), "request_id": uuid.uuid4().hex}
+
+        @app.post("/sandbox/item/fire_webhook")
+        async def fire_webhook(body: dict) -> dict:
+            item_id = self.item_id(body["access_token"])
+            async with httpx.AsyncClient() as client:
+                status_code = await self.send_webhook(client, item_id)
+            return {"webhook_fired": status_code is not None, "status_code": status_code}
+
+        @app.get("/fake/stats")
+        async def stats() -> dict:
+            return {**self.stats, "transactions": dict(self.transaction_counts)}
+
+        return app
+
+
+@contextmanager
+def serve_in_thread(fake: FakePlaid) -> Iterator[str]:
+    """Run fake on an ephemeral localhost port for the block; yields its base URL."""
+    import uvicorn
+
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(fake.app, host="127.0.0.1", port=port, log_level="error"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    try:
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        server.should_exit = True
+        thread.join(timeout=5)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--transactions-per-item", type=int, default=1_000)
+    parser.add_argument("--page-size", type=int, default=500)
+    parser.add_argument("--deposit-ratio", type=float, default=0.3)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--latency-jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--mutation-rate", type=float, default=0.0)
+    parser.add_argument("--transfer-decline-rate", type=float, default=0.0)
+    parser.add_argument("--webhook-url")
+    parser.add_argument("--webhook-items", default="", help="comma-separated item ids")
+    parser.add_argument("--webhook-interval", type=float, default=0.0, help="seconds; 0 = on demand only")
+    parser.add_argument("--new-per-webhook", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    import uvicorn
+
+    fake = FakePlaid(FakePlaidConfig(
+        transactions_per_item=args.transactions_per_item,
+        page_size=args.page_size,
+        deposit_ratio=args.deposit_ratio,
+        latency_ms=args.latency_ms,
+        latency_jitter_ms=args.latency_jitter_ms,
+        error_rate=args.error_rate,
+        mutation_rate=args.mutation_rate,
+        transfer_decline_rate=args.transfer_decline_rate,
+        webhook_url=args.webhook_url,
+        webhook_items=[i for i in args.webhook_items.split(",") if i],
+        webhook_interval_seconds=args.webhook_interval,
+        new_per_webhook=args.new_per_webhook,
+        seed=args.seed,
+    ))
+    uvicorn.run(fake.app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""Add template_routing_rules table
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-17
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from alembic import op
+
+revision: str = '005'
+down_revision: Union[str, None] = '004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'template_routing_rules',
+        sa.Column('id', postgresql.UUID(as_uuid=False), primary_key=True),
+        sa.Column('user_id', postgresql.UUID(as_uuid=False),
+                  sa.ForeignKey('users.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('template_id', postgresql.UUID(as_uuid=False),
+                  sa.ForeignKey('split_templates.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('priority', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('source_pattern', sa.String(255), nullable=True),
+        sa.Column('min_amount', sa.Numeric(12, 2), nullable=True),
+        sa.Column('max_amount', sa.Numeric(12, 2), nullable=True),
+        sa.Column('bank_account_id', postgresql.UUID(as_uuid=False),
+                  sa.ForeignKey('bank_accounts.id', ondelete='CASCADE'), nullable=True),
+        sa.Column('is_active', sa.Boolean(), nullable=False, server_default=sa.true()),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(),
+                  onupdate=sa.func.now()),
+    )
+    op.create_index('ix_template_routing_rules_user_id', 'template_routing_rules', ['user_id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_template_routing_rules_user_id', table_name='template_routing_rules')
+    op.drop_table('template_routing_rules')
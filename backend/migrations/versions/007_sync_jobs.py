@@ -0,0 +1,48 @@
+"""Add sync_jobs table
+
+Revision ID: 007
+Revises: 006
+Create Date: 2026-10-17
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from alembic import op
+
+revision: str = '007'
+down_revision: Union[str, None] = '006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'sync_jobs',
+        sa.Column('id', postgresql.UUID(as_uuid=False), primary_key=True),
+        sa.Column('item_id', sa.String(255), nullable=False),
+        sa.Column('status', sa.String(20), nullable=False, server_default='queued'),
+        sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('run_after', sa.DateTime(timezone=True), nullable=False,
+                  server_default=sa.func.now()),
+        sa.Column('locked_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(),
+                  onupdate=sa.func.now()),
+    )
+    op.create_index(
+        'ix_sync_jobs_queued_item_id', 'sync_jobs', ['item_id'],
+        unique=True, postgresql_where=sa.text("status = 'queued'"),
+    )
+    op.create_index(
+        'ix_sync_jobs_queued_run_after', 'sync_jobs', ['run_after'],
+        postgresql_where=sa.text("status = 'queued'"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_sync_jobs_queued_run_after', table_name='sync_jobs')
+    op.drop_index('ix_sync_jobs_queued_item_id', table_name='sync_jobs')
+    op.drop_table('sync_jobs')
@@ -0,0 +1,42 @@
+"""Add deposit_rules table
+
+Revision ID: 008
+Revises: 007
+Create Date: 2026-10-17
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from alembic import op
+
+revision: str = '008'
+down_revision: Union[str, None] = '007'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'deposit_rules',
+        sa.Column('id', postgresql.UUID(as_uuid=False), primary_key=True),
+        sa.Column('user_id', postgresql.UUID(as_uuid=False),
+                  sa.ForeignKey('users.id', ondelete='CASCADE'), nullable=False, unique=True),
+        sa.Column('min_amount', sa.Numeric(12, 2), nullable=True),
+        sa.Column('allow_categories', postgresql.ARRAY(sa.String(100)),
+                  nullable=False, server_default='{}'),
+        sa.Column('deny_categories', postgresql.ARRAY(sa.String(100)),
+                  nullable=False, server_default='{}'),
+        sa.Column('allow_merchants', postgresql.ARRAY(sa.String(255)),
+                  nullable=False, server_default='{}'),
+        sa.Column('deny_merchants', postgresql.ARRAY(sa.String(255)),
+                  nullable=False, server_default='{}'),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(),
+                  onupdate=sa.func.now()),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('deposit_rules')
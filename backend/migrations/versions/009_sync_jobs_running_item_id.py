@@ -0,0 +1,32 @@
+"""One running sync job per item; drop bank_accounts.sync_pending
+
+Revision ID: 009
+Revises: 008
+Create Date: 2026-10-17
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+revision: str = '009'
+down_revision: Union[str, None] = '008'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'ix_sync_jobs_running_item_id', 'sync_jobs', ['item_id'],
+        unique=True, postgresql_where=sa.text("status = 'running'"),
+    )
+    op.drop_column('bank_accounts', 'sync_pending')
+
+
+def downgrade() -> None:
+    op.add_column(
+        'bank_accounts',
+        sa.Column('sync_pending', sa.Boolean(), nullable=False, server_default=sa.false()),
+    )
+    op.drop_index('ix_sync_jobs_running_item_id', table_name='sync_jobs')
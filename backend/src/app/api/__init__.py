@@ -4,7 +4,9 @@ from app.api.routes import (
     auth_router,
     bank_accounts_router,
     buckets_router,
+    deposit_rules_router,
     deposits_router,
+    routing_rules_router,
     split_plans_router,
     split_templates_router,
     users_router,
@@ -18,8 +20,10 @@ api_router.include_router(users_router)
 api_router.include_router(buckets_router)
 api_router.include_router(bank_accounts_router)
 api_router.include_router(deposits_router)
+api_router.include_router(deposit_rules_router)
 api_router.include_router(split_plans_router)
 api_router.include_router(split_templates_router)
+api_router.include_router(routing_rules_router)
 api_router.include_router(webhooks_router)
 
 __all__ = ["api_router"]
@@ -1,22 +1,51 @@
+import logging
 from typing import Annotated
 
-from fastapi import Depends, HTTPException, status
+from fastapi import BackgroundTasks, Depends, HTTPException, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from sqlalchemy.exc import IntegrityError
 
-from app.core.database import SessionDep
+from app.core.cache import rejected_claims_cache
+from app.core.database import SessionDep, async_session_maker
 from app.core.security import verify_supabase_token
-from app.crud import get_user, get_or_create_user
+from app.crud import resolve_user, sync_user_profile
 from app.models.user import User
 
+logger = logging.getLogger(__name__)
+
 security = HTTPBearer()
 
 
+async def _sync_profile_from_claims(
+    supabase_id: str,
+    email: str | None,
+    phone_number: str | None,
+    full_name: str | None,
+) -> None:
+    """Background task: write changed Supabase claims to the user row."""
+    async with async_session_maker() as session:
+        try:
+            await sync_user_profile(session, supabase_id, email, phone_number, full_name)
+            await session.commit()
+        except IntegrityError:
+            # e.g. the new email or phone already belongs to another user
+            await session.rollback()
+            rejected_claims_cache.set(supabase_id, (email, phone_number, full_name))
+            logger.warning("Could not sync profile claims for user %s", supabase_id)
+
+
 async def get_current_user(
     session: SessionDep,
     credentials: Annotated[HTTPAuthorizationCredentials, Depends(security)],
+    background_tasks: BackgroundTasks,
 ) -> User:
     """
     Verify Supabase JWT and get/create user in our database.
+
+    Known users come from the user cache without a query; if the token's
+    profile claims changed, they are written after the response is sent.
+    Claims that failed to sync are not retried until rejected_claims_cache
+    forgets them, so such requests stay write-free too.
     """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -25,7 +54,7 @@ async def get_current_user(
     )
 
     token = credentials.credentials
-    payload = verify_supabase_token(token)
+    payload = await verify_supabase_token(token)
 
     if payload is None:
         raise credentials_exception
@@ -41,13 +70,18 @@ async def get_current_user(
     phone = payload.get("phone")
 
     # Get or create user in our database
-    user = await get_or_create_user(
+    full_name = user_metadata.get("full_name")
+    user, stale = await resolve_user(
         session,
         supabase_id=supabase_user_id,
         email=email,
         phone_number=phone,
-        full_name=user_metadata.get("full_name"),
+        full_name=full_name,
     )
+    if stale and rejected_claims_cache.get(supabase_user_id) != (email, phone, full_name):
+        background_tasks.add_task(
+            _sync_profile_from_claims, supabase_user_id, email, phone, full_name
+        )
 
     if not user.is_active:
         raise HTTPException(
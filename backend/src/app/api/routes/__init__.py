@@ -1,7 +1,9 @@
 from app.api.routes.auth import router as auth_router
 from app.api.routes.bank_accounts import router as bank_accounts_router
 from app.api.routes.buckets import router as buckets_router
+from app.api.routes.deposit_rules import router as deposit_rules_router
 from app.api.routes.deposits import router as deposits_router
+from app.api.routes.routing_rules import router as routing_rules_router
 from app.api.routes.split_plans import router as split_plans_router
 from app.api.routes.split_templates import router as split_templates_router
 from app.api.routes.users import router as users_router
@@ -13,7 +15,9 @@ __all__ = [
     "buckets_router",
     "bank_accounts_router",
     "deposits_router",
+    "deposit_rules_router",
     "split_plans_router",
     "split_templates_router",
+    "routing_rules_router",
     "webhooks_router",
 ]
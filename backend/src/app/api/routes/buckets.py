@@ -6,6 +6,7 @@ from app.crud import (
     create_bucket,
     delete_bucket,
     get_bucket,
+    get_bucket_snapshot,
     get_buckets_by_user,
     reorder_buckets,
     update_bucket,
@@ -21,9 +22,9 @@ async def list_buckets(
     current_user: CurrentUser,
     include_inactive: bool = False,
 ) -> list[BucketResponse]:
-    buckets = await get_buckets_by_user(
-        session, current_user.id, active_only=not include_inactive
-    )
+    if not include_inactive:
+        return list((await get_bucket_snapshot(session, current_user.id)).buckets)
+    buckets = await get_buckets_by_user(session, current_user.id, active_only=False)
     return [BucketResponse.model_validate(b) for b in buckets]
 
 
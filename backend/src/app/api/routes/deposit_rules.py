@@ -0,0 +1,41 @@
+from fastapi import APIRouter
+
+from app.api.deps import CurrentUser
+from app.core.database import SessionDep
+from app.crud.crud_deposit_rule import get_deposit_rules, update_deposit_rules
+from app.models.deposit_rule import DepositRuleSet
+from app.schemas.deposit_rule import DepositRulesResponse, DepositRulesUpdate
+from app.services.deposit_classifier import DEFAULT_DEPOSIT_CATEGORIES
+
+router = APIRouter(prefix="/deposit-rules", tags=["deposit-rules"])
+
+
+def _response(rules: DepositRuleSet | None) -> DepositRulesResponse:
+    fields = {} if rules is None else {
+        "min_amount": rules.min_amount,
+        "allow_categories": rules.allow_categories,
+        "deny_categories": rules.deny_categories,
+        "allow_merchants": rules.allow_merchants,
+        "deny_merchants": rules.deny_merchants,
+    }
+    return DepositRulesResponse(default_categories=sorted(DEFAULT_DEPOSIT_CATEGORIES), **fields)
+
+
+@router.get("", response_model=DepositRulesResponse)
+async def get_my_deposit_rules(
+    session: SessionDep,
+    current_user: CurrentUser,
+) -> DepositRulesResponse:
+    """Which Plaid credits are detected as deposits (defaults until first updated)."""
+    return _response(await get_deposit_rules(session, current_user.id))
+
+
+@router.patch("", response_model=DepositRulesResponse)
+async def update_my_deposit_rules(
+    session: SessionDep,
+    current_user: CurrentUser,
+    rules_in: DepositRulesUpdate,
+) -> DepositRulesResponse:
+    rules = await update_deposit_rules(session, current_user.id, rules_in)
+    await session.commit()
+    return _response(rules)
@@ -0,0 +1,97 @@
+from fastapi import APIRouter, HTTPException, status
+
+from app.api.deps import CurrentUser
+from app.core.database import SessionDep
+from app.crud.crud_bank_account import get_bank_account
+from app.crud.crud_routing_rule import (
+    create_routing_rule,
+    delete_routing_rule,
+    get_routing_rule,
+    get_routing_rules_by_user,
+    update_routing_rule,
+)
+from app.crud.crud_split_template import get_split_template
+from app.schemas.routing_rule import (
+    RoutingRuleCreate,
+    RoutingRuleResponse,
+    RoutingRuleUpdate,
+)
+
+router = APIRouter(prefix="/routing-rules", tags=["routing-rules"])
+
+
+async def _check_references(
+    session: SessionDep,
+    user_id: str,
+    template_id: str | None,
+    bank_account_id: str | None,
+) -> None:
+    """404 unless the referenced template and bank account belong to the user."""
+    if template_id is not None:
+        template = await get_split_template(session, template_id)
+        if not template or template.user_id != user_id:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Template not found")
+    if bank_account_id is not None:
+        account = await get_bank_account(session, bank_account_id)
+        if not account or account.user_id != user_id:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Bank account not found")
+
+
+@router.get("", response_model=list[RoutingRuleResponse])
+async def list_routing_rules(
+    session: SessionDep,
+    current_user: CurrentUser,
+) -> list[RoutingRuleResponse]:
+    rules = await get_routing_rules_by_user(session, current_user.id)
+    return [RoutingRuleResponse.model_validate(r) for r in rules]
+
+
+@router.post("", response_model=RoutingRuleResponse, status_code=status.HTTP_201_CREATED)
+async def create_new_routing_rule(
+    session: SessionDep,
+    current_user: CurrentUser,
+    rule_in: RoutingRuleCreate,
+) -> RoutingRuleResponse:
+    await _check_references(session, current_user.id, rule_in.template_id, rule_in.bank_account_id)
+    rule = await create_routing_rule(session, current_user.id, rule_in)
+    await session.commit()
+    return RoutingRuleResponse.model_validate(rule)
+
+
+@router.patch("/{rule_id}", response_model=RoutingRuleResponse)
+async def update_routing_rule_by_id(
+    session: SessionDep,
+    current_user: CurrentUser,
+    rule_id: str,
+    rule_in: RoutingRuleUpdate,
+) -> RoutingRuleResponse:
+    rule = await get_routing_rule(session, rule_id)
+    if not rule or rule.user_id != current_user.id:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Routing rule not found")
+    await _check_references(session, current_user.id, rule_in.template_id, rule_in.bank_account_id)
+
+    changes = rule_in.model_dump(exclude_unset=True)
+    min_amount = changes.get("min_amount", rule.min_amount)
+    max_amount = changes.get("max_amount", rule.max_amount)
+    if min_amount is not None and max_amount is not None and min_amount > max_amount:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="min_amount must not exceed max_amount",
+        )
+
+    rule = await update_routing_rule(session, rule, rule_in)
+    await session.commit()
+    return RoutingRuleResponse.model_validate(rule)
+
+
+@router.delete("/{rule_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_routing_rule_by_id(
+    session: SessionDep,
+    current_user: CurrentUser,
+    rule_id: str,
+) -> None:
+    rule = await get_routing_rule(session, rule_id)
+    if not rule or rule.user_id != current_user.id:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Routing rule not found")
+    await delete_routing_rule(session, rule)
+    await session.commit()
@@ -5,20 +5,23 @@ from app.core.database import SessionDep
 from app.crud import (
     approve_split_plan,
     create_split_plan,
-    get_buckets_by_user,
     get_deposit,
+    get_deposits_by_ids,
+    get_pending_deposits,
     get_split_plan,
     get_split_plan_by_deposit,
 )
 from app.models.split_plan import SplitPlanStatus
 from app.schemas.split_plan import (
     SplitActionCreate,
+    SplitPlanBatchPreview,
+    SplitPlanBatchPreviewRequest,
     SplitPlanCreate,
     SplitPlanPreview,
     SplitPlanResponse,
     SplitExecutionResponse,
 )
-from app.services.allocation import calculate_allocation
+from app.services.allocation import load_bucket_program
 from app.services.split_execution import split_execution_service
 
 router = APIRouter(prefix="/split-plans", tags=["split-plans"])
@@ -29,21 +32,28 @@ async def preview_split_plan(
     session: SessionDep,
     current_user: CurrentUser,
     deposit_id: str,
+    respect_targets: bool = False,
 ) -> SplitPlanPreview:
+    """
+    Preview how a deposit would be split across the user's buckets.
+
+    With respect_targets, buckets that have reached their target_amount get
+    nothing and their share spills to the others.
+    """
     deposit = await get_deposit(session, deposit_id)
     if not deposit or deposit.user_id != current_user.id:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Deposit not found"
         )
 
-    buckets = await get_buckets_by_user(session, current_user.id)
-    if not buckets:
+    program = await load_bucket_program(session, current_user.id, respect_targets)
+    if program.is_empty:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="No buckets configured",
         )
 
-    allocations = calculate_allocation(float(deposit.amount), buckets)
+    allocations = program.allocate(deposit.amount)
 
     return SplitPlanPreview(
         deposit_id=deposit_id,
@@ -55,6 +65,58 @@ async def preview_split_plan(
     )
 
 
+@router.post("/preview", response_model=SplitPlanBatchPreview)
+async def preview_split_plans(
+    session: SessionDep,
+    current_user: CurrentUser,
+    preview_in: SplitPlanBatchPreviewRequest,
+) -> SplitPlanBatchPreview:
+    """
+    Preview many deposits in one call.
+
+    One deposits query and one (cached) bucket program load, then a single
+    batch allocation — instead of a round trip per pending deposit.
+    """
+    if preview_in.all_pending:
+        deposits = await get_pending_deposits(session, current_user.id)
+    else:
+        deposits = await get_deposits_by_ids(
+            session, current_user.id, preview_in.deposit_ids
+        )
+
+    found = {d.id for d in deposits}
+    not_found = [i for i in dict.fromkeys(preview_in.deposit_ids) if i not in found]
+
+    if not deposits:
+        return SplitPlanBatchPreview(previews=[], not_found=not_found)
+
+    program = await load_bucket_program(
+        session, current_user.id, preview_in.respect_targets
+    )
+    if program.is_empty:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="No buckets configured",
+        )
+
+    matrix = program.allocate_batch([deposit.amount for deposit in deposits])
+
+    return SplitPlanBatchPreview(
+        previews=[
+            SplitPlanPreview(
+                deposit_id=deposit.id,
+                total_amount=float(deposit.amount),
+                actions=[
+                    SplitActionCreate(bucket_id=bucket_id, amount=amount)
+                    for bucket_id, amount in matrix.row(i).items()
+                ],
+            )
+            for i, deposit in enumerate(deposits)
+        ],
+        not_found=not_found,
+    )
+
+
 @router.post("", response_model=SplitPlanResponse, status_code=status.HTTP_201_CREATED)
 async def create_new_split_plan(
     session: SessionDep,
@@ -72,6 +134,23 @@ async def create_new_split_plan(
         # Return the existing plan instead of erroring (idempotent)
         return SplitPlanResponse.model_validate(existing_plan)
 
+    if not plan_in.actions:
+        # No client-side split supplied — allocate with the same engine as preview
+        program = await load_bucket_program(session, current_user.id)
+        if program.is_empty:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="No buckets configured",
+            )
+        allocations = program.allocate(deposit.amount)
+        plan_in = plan_in.model_copy(update={
+            "total_amount": float(deposit.amount),
+            "actions": [
+                SplitActionCreate(bucket_id=bucket_id, amount=amount)
+                for bucket_id, amount in allocations.items()
+            ],
+        })
+
     plan = await create_split_plan(session, plan_in)
     return SplitPlanResponse.model_validate(plan)
 
@@ -1,4 +1,7 @@
-from fastapi import APIRouter, HTTPException, status
+from datetime import datetime, timedelta, timezone
+
+from fastapi import APIRouter, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
 
 from app.api.deps import CurrentUser
 from app.core.database import SessionDep
@@ -9,11 +12,14 @@ from app.crud.crud_split_template import (
     get_split_templates_by_user,
     update_split_template,
 )
+from app.crud.crud_user import get_rules_version
 from app.schemas.split_template import (
     SplitTemplateCreate,
     SplitTemplateResponse,
     SplitTemplateUpdate,
 )
+from app.services.allocation import load_template_program
+from app.services.simulation import stream_template_simulation
 
 router = APIRouter(prefix="/split-templates", tags=["split-templates"])
 
@@ -76,3 +82,32 @@ async def delete_split_template_by_id(
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Template not found")
     await delete_split_template(session, template)
     await session.commit()
+
+
+@router.get("/{template_id}/simulate")
+async def simulate_split_template(
+    session: SessionDep,
+    current_user: CurrentUser,
+    template_id: str,
+    months: int = Query(6, ge=1, le=60),
+) -> StreamingResponse:
+    """
+    What-if: how this template would have split the last `months` of deposits.
+
+    Streams NDJSON — one {"type": "deposit"} line per deposit, oldest first,
+    then a {"type": "summary"} line with per-bucket totals. Nothing is written.
+    """
+    template = await get_split_template(session, template_id)
+    if not template or template.user_id != current_user.id:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Template not found")
+
+    version = await get_rules_version(session, current_user.id)
+    program = await load_template_program(session, template_id, version)
+    if program is None:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Template has no items")
+
+    since = datetime.now(timezone.utc) - timedelta(days=30 * months)
+    return StreamingResponse(
+        stream_template_simulation(program, current_user.id, since),
+        media_type="application/x-ndjson",
+    )
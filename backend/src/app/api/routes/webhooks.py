@@ -4,14 +4,14 @@ Plaid webhook endpoint.
 Plaid signs every webhook with a JWT in the `Plaid-Verification` header.
 Verification steps:
   1. Decode the JWT header (unverified) to get `kid`
-  2. Fetch the matching public key from Plaid's /webhook_verification_key/get
+  2. Look up the matching public key (cached per kid; fetched from Plaid's
+     /webhook_verification_key/get on a miss, see app.services.webhook_keys)
   3. Verify the JWT signature (ES256) using python-jose
   4. Assert the JWT's `request_body_sha256` matches SHA-256 of the raw request body
   5. Assert the JWT was issued within the last 5 minutes
 
 In development (no Plaid client / sandbox), verification is skipped with a warning.
 """
-import asyncio
 import hashlib
 import json
 import logging
@@ -21,8 +21,10 @@ from fastapi import APIRouter, HTTPException, Request, status
 
 from app.core.config import settings
 from app.core.database import SessionDep
-from app.services.deposit_detection import sync_new_transactions
+from app.core.metrics import metrics
+from app.services.job_queue import enqueue_sync
 from app.services.plaid import plaid_service
+from app.services.webhook_keys import WebhookKeyError, plaid_webhook_keys
 
 logger = logging.getLogger(__name__)
 
@@ -44,15 +46,11 @@ async def _verify_plaid_signature(token: str, raw_body: bytes) -> None:
     try:
         import jwt as pyjwt  # PyJWT
         from jose import jwt as jose_jwt, JWTError
-        from plaid.model.webhook_verification_key_get_request import (
-            WebhookVerificationKeyGetRequest,
-        )
     except ImportError as e:
         logger.warning("Webhook verification skipped — missing dependency: %s", e)
         return
 
-    client = plaid_service.client
-    if client is None:
+    if plaid_service.client is None:
         logger.warning("Webhook verification skipped — Plaid client not initialized")
         return
 
@@ -66,21 +64,16 @@ async def _verify_plaid_signature(token: str, raw_body: bytes) -> None:
     if not key_id:
         raise HTTPException(status.HTTP_401_UNAUTHORIZED, "Missing kid in Plaid-Verification JWT")
 
-    # Step 2: fetch public key from Plaid
+    # Step 2: public key for kid (cached; fetched from Plaid on a miss)
     try:
-        key_response = await asyncio.to_thread(
-            client.webhook_verification_key_get,
-            WebhookVerificationKeyGetRequest(key_id=key_id),
-        )
-        key = key_response.key
-    except Exception as e:
-        logger.error("Failed to fetch Plaid verification key: %s", e)
-        raise HTTPException(status.HTTP_401_UNAUTHORIZED, "Could not fetch Plaid verification key")
+        key = await plaid_webhook_keys.get(key_id)
+    except WebhookKeyError as e:
+        logger.error("Plaid verification key unavailable: %s", e)
+        raise HTTPException(status.HTTP_401_UNAUTHORIZED, str(e))
 
-    # Step 3: build JWK and verify JWT
-    jwk = {"kty": key.kty, "crv": key.crv, "x": key.x, "y": key.y}
+    # Step 3: verify JWT
     try:
-        claims = jose_jwt.decode(token, jwk, algorithms=["ES256"])
+        claims = jose_jwt.decode(token, key, algorithms=["ES256"])
     except JWTError as e:
         raise HTTPException(status.HTTP_401_UNAUTHORIZED, f"Plaid JWT verification failed: {e}")
 
@@ -105,7 +98,8 @@ async def plaid_webhook(request: Request, db: SessionDep) -> dict:
     Receive and process Plaid webhooks.
 
     Plaid signs requests with the Plaid-Verification JWT header.
-    We verify the signature before processing any payload.
+    We verify the signature before processing any payload. Transaction
+    webhooks only enqueue a sync job; app.worker runs it.
     """
     raw_body = await request.body()
 
@@ -138,9 +132,18 @@ async def plaid_webhook(request: Request, db: SessionDep) -> dict:
             logger.warning("TRANSACTIONS webhook missing item_id")
             return {"status": "ignored", "reason": "missing item_id"}
 
-        # Inline sync for MVP (no job queue needed at this scale)
-        new_deposits = await sync_new_transactions(db, item_id)
-        return {"status": "ok", "new_deposits": len(new_deposits)}
+        # The sync itself runs in app.worker; answer Plaid right away. The job
+        # waits out the coalescing window, so a burst of webhooks for the
+        # item becomes one sync.
+        metrics.incr("plaid_webhooks_received")
+        queued = await enqueue_sync(
+            db, item_id, delay_seconds=settings.plaid_webhook_coalesce_seconds
+        )
+        if not queued:
+            metrics.incr("plaid_webhooks_coalesced")
+            return {"status": "coalesced", "item_id": item_id}
+        metrics.incr("sync_jobs_enqueued")
+        return {"status": "queued", "item_id": item_id}
 
     # All other webhook types are acknowledged but not acted on
     return {"status": "ignored", "webhook_type": webhook_type, "webhook_code": webhook_code}
@@ -0,0 +1,144 @@
+"""
+Per-user bucket snapshot cache.
+
+A snapshot is the user's active buckets, in sort order, as immutable
+BucketResponse models. Entries are keyed by (user_id, version), and every
+bucket mutation bumps the user's version instead of deleting entries: stale
+snapshots are simply never looked up again and age out of the LRU/TTL. Things
+derived from a snapshot (compiled allocation programs) can use the same
+version in their own keys and need no invalidation of their own.
+
+Two tiers:
+- in-process LRU, always on;
+- Redis (settings.bucket_cache_use_redis), shared by all workers. When it is
+  on, Redis also holds the version counter, so a bump in one worker is seen
+  by the others on their next read. Any Redis error falls back to an
+  uncached read rather than risking a stale one.
+"""
+import asyncio
+import logging
+from dataclasses import dataclass
+
+import redis.asyncio as redis
+from pydantic import TypeAdapter
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import LRUCache, on_commit
+from app.core.config import settings
+from app.schemas.bucket import BucketResponse
+
+logger = logging.getLogger(__name__)
+
+_snapshot_adapter = TypeAdapter(tuple[BucketResponse, ...])
+
+
+@dataclass(frozen=True)
+class BucketSnapshot:
+    """A user's active buckets at `version` (None: not cacheable, e.g. Redis down)."""
+    version: int | None
+    buckets: tuple[BucketResponse, ...]
+
+
+class BucketSnapshotCache:
+    def __init__(
+        self,
+        maxsize: int,
+        ttl_seconds: int,
+        redis_client: "redis.Redis | None" = None,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.redis = redis_client
+        self._local: LRUCache[tuple[str, int], tuple[BucketResponse, ...]] = LRUCache(
+            maxsize=maxsize, ttl_seconds=ttl_seconds
+        )
+        # Local version counters; only used without Redis. One int per user
+        # that has changed buckets in this process, so left unbounded: an
+        # evicted counter would restart at 0 and could revive a stale entry.
+        self._versions: dict[str, int] = {}
+        self._background: set[asyncio.Task] = set()
+
+    @staticmethod
+    def _version_key(user_id: str) -> str:
+        return f"flowsplit:bucket-version:{user_id}"
+
+    @staticmethod
+    def _snapshot_key(user_id: str, version: int) -> str:
+        return f"flowsplit:buckets:{user_id}:{version}"
+
+    async def current_version(self, user_id: str) -> int | None:
+        if self.redis is None:
+            return self._versions.get(user_id, 0)
+        try:
+            return int(await self.redis.get(self._version_key(user_id)) or 0)
+        except redis.RedisError:
+            logger.warning("Bucket cache: Redis unavailable, reading from Postgres", exc_info=True)
+            return None
+
+    async def get(self, user_id: str, version: int) -> tuple[BucketResponse, ...] | None:
+        buckets = self._local.get((user_id, version))
+        if buckets is not None or self.redis is None:
+            return buckets
+        try:
+            raw = await self.redis.get(self._snapshot_key(user_id, version))
+        except redis.RedisError:
+            logger.warning("Bucket cache: Redis read failed", exc_info=True)
+            return None
+        if raw is None:
+            return None
+        buckets = _snapshot_adapter.validate_json(raw)
+        self._local.set((user_id, version), buckets)
+        return buckets
+
+    async def set(
+        self, user_id: str, version: int, buckets: tuple[BucketResponse, ...]
+    ) -> None:
+        self._local.set((user_id, version), buckets)
+        if self.redis is None:
+            return
+        try:
+            await self.redis.set(
+                self._snapshot_key(user_id, version),
+                _snapshot_adapter.dump_json(buckets),
+                ex=self.ttl_seconds,
+            )
+        except redis.RedisError:
+            logger.warning("Bucket cache: Redis write failed", exc_info=True)
+
+    async def bump(self, user_id: str) -> None:
+        """Move the user to a new version; snapshots at older versions are dead."""
+        if self.redis is None:
+            self._versions[user_id] = self._versions.get(user_id, 0) + 1
+            return
+        try:
+            await self.redis.incr(self._version_key(user_id))
+        except redis.RedisError:
+            # Other workers may serve the old snapshot until its TTL runs out
+            logger.error("Bucket cache: failed to bump version for %s", user_id, exc_info=True)
+
+    def bump_soon(self, user_id: str) -> None:
+        """bump() from sync code running on the event loop (session events)."""
+        if self.redis is None:
+            self._versions[user_id] = self._versions.get(user_id, 0) + 1
+            return
+        task = asyncio.get_running_loop().create_task(self.bump(user_id))
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+
+bucket_snapshot_cache = BucketSnapshotCache(
+    maxsize=settings.allocation_cache_size,
+    ttl_seconds=settings.allocation_cache_ttl_seconds,
+    redis_client=redis.from_url(settings.redis_url) if settings.bucket_cache_use_redis else None,
+)
+
+
+async def invalidate_buckets(session: AsyncSession, user_id: str) -> None:
+    """
+    Bump the user's bucket version now and again once the session commits.
+
+    The second bump closes the window where another request reads the
+    still-committed old rows between our flush and commit and caches them
+    under the first new version.
+    """
+    await bucket_snapshot_cache.bump(user_id)
+    on_commit(session, lambda: bucket_snapshot_cache.bump_soon(user_id))
@@ -0,0 +1,146 @@
+"""
+In-process caches.
+
+Lives in core so crud modules can invalidate entries without importing the
+service layer (which itself imports crud). See app.core.bucket_cache for the
+two-tier bucket snapshot cache.
+"""
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from typing import Generic, Hashable, TypeVar
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class LRUCache(Generic[K, V]):
+    """
+    Bounded LRU map with an optional per-entry TTL.
+
+    Not thread-safe; meant for use from the event loop. The TTL bounds how
+    stale an entry can get in other worker processes, which never see this
+    process's invalidations; caches that must not go stale key their entries
+    on a version stored in the database instead.
+    """
+
+    def __init__(self, maxsize: int, ttl_seconds: float | None = None):
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self._data: OrderedDict[K, tuple[V, float]] = OrderedDict()
+
+    def get(self, key: K) -> V | None:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at and expires_at < time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: K, value: V, ttl_seconds: float | None = None) -> None:
+        """Store value; `ttl_seconds` overrides the cache TTL for this entry."""
+        ttl = ttl_seconds if ttl_seconds is not None else self.ttl_seconds
+        expires_at = time.monotonic() + ttl if ttl else 0.0
+        self._data[key] = (value, expires_at)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def discard(self, key: K) -> None:
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: object) -> bool:
+        return self.get(key) is not None  # type: ignore[arg-type]
+
+
+# Compiled AllocationPrograms (see app.services.allocation). Bucket programs
+# are keyed by the bucket snapshot version (app.core.bucket_cache), so bucket
+# mutations never need to touch this cache.
+bucket_program_cache: LRUCache[tuple[str, int, bool], object] = LRUCache(
+    maxsize=settings.allocation_cache_size,
+    ttl_seconds=settings.allocation_cache_ttl_seconds,
+)
+
+# Template programs, TemplateRouters (app.services.template_routing) and
+# DepositClassifiers (app.services.deposit_classifier) are keyed by the
+# owner's users.rules_version, which every template, routing rule and deposit
+# rule change bumps in its own transaction (crud_user.bump_rules_version).
+# Both the API and app.worker read the version from Postgres, so neither ever
+# serves a compiled object from before a committed change.
+template_program_cache: LRUCache[tuple[str, int], object] = LRUCache(
+    maxsize=settings.allocation_cache_size,
+    ttl_seconds=settings.allocation_cache_ttl_seconds,
+)
+template_router_cache: LRUCache[tuple[str, int], object] = LRUCache(
+    maxsize=settings.allocation_cache_size,
+    ttl_seconds=settings.allocation_cache_ttl_seconds,
+)
+deposit_classifier_cache: LRUCache[tuple[str, int], object] = LRUCache(
+    maxsize=settings.allocation_cache_size,
+    ttl_seconds=settings.allocation_cache_ttl_seconds,
+)
+
+# Detached Users by supabase_id (see app.crud.crud_user.resolve_user), so an
+# authenticated request needs no query to find its user
+user_cache: LRUCache[str, object] = LRUCache(
+    maxsize=settings.user_cache_size,
+    ttl_seconds=settings.user_cache_ttl_seconds,
+)
+# (email, phone_number, full_name) claims whose profile sync was rejected by
+# a unique constraint, by supabase_id, so requests carrying them do not
+# retry the UPDATE until the entry expires
+rejected_claims_cache: LRUCache[str, tuple[str | None, ...]] = LRUCache(
+    maxsize=settings.user_cache_size,
+    ttl_seconds=settings.user_cache_ttl_seconds,
+)
+
+
+# Session.info key holding callbacks to run once the session commits
+_ON_COMMIT = "on_commit_callbacks"
+
+
+def on_commit(session: AsyncSession, callback: Callable[[], None]) -> None:
+    """Run `callback` after the session's current transaction commits (not on rollback)."""
+    session.info.setdefault(_ON_COMMIT, []).append(callback)
+
+
+@event.listens_for(Session, "after_commit")
+def _run_on_commit(session: Session) -> None:
+    for callback in session.info.pop(_ON_COMMIT, ()):
+        callback()
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_on_commit(session: Session) -> None:
+    session.info.pop(_ON_COMMIT, None)
+
+
+def _invalidate(session: AsyncSession, cache: LRUCache, key: str) -> None:
+    """
+    Drop `key` now and again after the session commits.
+
+    The second discard closes the window where another request reads the
+    still-committed old rows between our flush and commit and re-caches them.
+    """
+    cache.discard(key)
+    on_commit(session, lambda: cache.discard(key))
+
+
+def invalidate_user(session: AsyncSession, supabase_id: str) -> None:
+    """Drop a cached user after their profile row changes."""
+    _invalidate(session, user_cache, supabase_id)
@@ -0,0 +1,136 @@
+"""
+Supabase JWKS key store.
+
+Supabase signs asymmetric (ES256/RS256) access tokens with keys published at
+/auth/v1/.well-known/jwks.json. The store keeps the parsed keys in memory by
+kid so token verification never waits on the network:
+
+- start() prefetches the key set (from main.lifespan) and runs a background
+  task that refetches it every settings.supabase_jwks_refresh_seconds.
+- A token with an unknown kid (Supabase rotated keys since the last refresh)
+  triggers one refetch; concurrent requests share it, and refetches for
+  unknown kids are rate limited so junk tokens cannot hammer the endpoint.
+
+Fetches use httpx.AsyncClient, so even a miss only suspends the request that
+needs the key.
+"""
+import asyncio
+import logging
+import ssl
+import time
+
+import certifi
+import httpx
+from jwt import PyJWK
+from jwt.exceptions import PyJWTError
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class SupabaseJWKS:
+    def __init__(
+        self,
+        url: str,
+        refresh_seconds: float,
+        min_refetch_seconds: float = 30.0,
+        timeout_seconds: float = 5.0,
+    ):
+        self.url = url
+        self.refresh_seconds = refresh_seconds
+        self.min_refetch_seconds = min_refetch_seconds
+        self.timeout_seconds = timeout_seconds
+        self._keys: dict[str, PyJWK] = {}
+        # Last refetch for an unknown kid, failed or not; routine refreshes
+        # don't count, so a key rotated just after one is still fetched
+        self._kid_refetch_at: float | None = None
+        self._inflight: asyncio.Task[None] | None = None
+        self._refresher: asyncio.Task[None] | None = None
+
+    async def get_signing_key(self, kid: str | None) -> PyJWK | None:
+        """Key for kid, refetching the key set once if kid is unknown."""
+        key = self._keys.get(kid) if kid else None
+        if key is not None or not kid:
+            return key
+        # Join a fetch in flight; otherwise at most one per min_refetch_seconds,
+        # counting failed ones so an unreachable endpoint is not retried per request
+        if self._inflight is None:
+            now = time.monotonic()
+            if (
+                self._kid_refetch_at is not None
+                and now - self._kid_refetch_at < self.min_refetch_seconds
+            ):
+                return None
+            self._kid_refetch_at = now
+        try:
+            await self.refresh()
+        except Exception as e:
+            logger.error("Could not fetch Supabase JWKS: %s", e)
+            return None
+        return self._keys.get(kid)
+
+    async def refresh(self) -> None:
+        """Refetch the key set; concurrent callers share one request."""
+        if self._inflight is None:
+            self._inflight = asyncio.create_task(self._fetch())
+            self._inflight.add_done_callback(self._clear_inflight)
+        # shield: one cancelled request must not cancel the others' fetch
+        await asyncio.shield(self._inflight)
+
+    def _clear_inflight(self, task: asyncio.Task[None]) -> None:
+        if self._inflight is task:
+            self._inflight = None
+
+    async def _fetch(self) -> None:
+        ssl_context = ssl.create_default_context(cafile=certifi.where())
+        async with httpx.AsyncClient(verify=ssl_context, timeout=self.timeout_seconds) as client:
+            response = await client.get(self.url)
+            response.raise_for_status()
+            document = response.json()
+        self.load(document)
+
+    def load(self, document: dict) -> None:
+        """Replace the keys with a JWKS document's signing keys."""
+        keys: dict[str, PyJWK] = {}
+        for jwk in document.get("keys", []):
+            if jwk.get("use", "sig") != "sig" or not jwk.get("kid"):
+                continue
+            try:
+                keys[jwk["kid"]] = PyJWK(jwk)
+            except PyJWTError as e:
+                logger.warning("Skipping Supabase JWK %s: %s", jwk["kid"], e)
+        self._keys = keys
+        logger.info("Loaded %d Supabase signing keys", len(keys))
+
+    async def start(self) -> None:
+        """Prefetch the key set and start the background refresh."""
+        try:
+            await self.refresh()
+        except Exception as e:
+            # HS256 tokens still verify; asymmetric ones retry on first use
+            logger.error("Could not prefetch Supabase JWKS: %s", e)
+        self._refresher = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self) -> None:
+        if self._refresher is not None:
+            self._refresher.cancel()
+            try:
+                await self._refresher
+            except asyncio.CancelledError:
+                pass
+            self._refresher = None
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.refresh_seconds)
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error("Supabase JWKS refresh failed, keeping %d keys: %s", len(self._keys), e)
+
+
+supabase_jwks = SupabaseJWKS(
+    url=f"{settings.supabase_url}/auth/v1/.well-known/jwks.json",
+    refresh_seconds=settings.supabase_jwks_refresh_seconds,
+)
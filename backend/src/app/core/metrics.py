@@ -0,0 +1,36 @@
+"""
+In-process counters.
+
+Plain monotonic counters, read through GET /metrics (API process) or logged
+by app.worker. Each process counts its own events: the API counts webhooks
+and enqueues, the worker counts the syncs it runs. GET /metrics reports sync
+outcomes from the sync_jobs table instead, so they cover every worker.
+"""
+from collections import Counter
+
+
+class Counters:
+    """Named integer counters. Not thread-safe; meant for use from the event loop."""
+
+    def __init__(self):
+        self._values: Counter[str] = Counter()
+
+    def incr(self, name: str, amount: int = 1) -> None:
+        self._values[name] += amount
+
+    def get(self, name: str) -> int:
+        return self._values[name]
+
+    def snapshot(self) -> dict[str, int]:
+        return dict(sorted(self._values.items()))
+
+    def hit_rate(self, name: str) -> float | None:
+        """`{name}_hits` over hits + `{name}_misses`; None before any lookup."""
+        hits, misses = self._values[f"{name}_hits"], self._values[f"{name}_misses"]
+        return hits / (hits + misses) if hits + misses else None
+
+    def reset(self) -> None:
+        self._values.clear()
+
+
+metrics = Counters()
@@ -1,33 +1,53 @@
+import hashlib
 import logging
-import ssl
-import certifi
+import time
+
 import jwt
-from jwt import PyJWKClient
 
+from app.core.cache import LRUCache
 from app.core.config import settings
+from app.core.jwks import supabase_jwks
+from app.core.metrics import metrics
 
 logger = logging.getLogger(__name__)
 
-# Cache for JWKS client
-_jwks_client: PyJWKClient | None = None
-
-
-def get_jwks_client() -> PyJWKClient:
-    """Get or create JWKS client for Supabase JWT verification."""
-    global _jwks_client
-    if _jwks_client is None:
-        jwks_url = f"{settings.supabase_url}/auth/v1/.well-known/jwks.json"
-        # Use certifi for SSL certificates (fixes macOS issues)
-        ssl_context = ssl.create_default_context(cafile=certifi.where())
-        _jwks_client = PyJWKClient(jwks_url, ssl_context=ssl_context)
-    return _jwks_client
+# Verified payloads by SHA-256 of the token, each expiring at the token's exp.
+# A bearer token is reused for many requests per screen, so most requests
+# skip signature verification entirely.
+_verified_tokens: LRUCache[bytes, dict] = LRUCache(maxsize=settings.auth_token_cache_size)
 
 
-def verify_supabase_token(token: str) -> dict | None:
+async def verify_supabase_token(token: str) -> dict | None:
     """
     Verify a Supabase JWT token.
     Returns the decoded payload if valid, None otherwise.
+
+    Asymmetric tokens are checked against the in-memory JWKS store, so this
+    only awaits the network when a kid is unknown. Verified payloads are
+    cached until the token expires; failures are not cached. Lookups count as auth_token_cache_hits / _misses in app metrics.
     """
+    digest = hashlib.sha256(token.encode()).digest()
+    payload = _verified_tokens.get(digest)
+    if payload is not None:
+        metrics.incr("auth_token_cache_hits")
+        return payload
+    metrics.incr("auth_token_cache_misses")
+
+    payload = await _verify_token_signature(token)
+    exp = payload.get("exp") if payload else None
+    if isinstance(exp, (int, float)):
+        remaining = exp - time.time()
+        if remaining > 0:
+            _verified_tokens.set(digest, payload, ttl_seconds=remaining)
+    return payload
+
+
+def clear_verified_tokens() -> None:
+    _verified_tokens.clear()
+
+
+async def _verify_token_signature(token: str) -> dict | None:
+    """Full verification of a token (signature, audience, expiry)."""
     try:
         # Get the algorithm from the token header
         unverified_header = jwt.get_unverified_header(token)
@@ -37,8 +57,10 @@ def verify_supabase_token(token: str) -> dict | None:
         # ES256/RS256 tokens use JWKS for verification
         if algorithm in ["ES256", "RS256"]:
             logger.debug("Using JWKS verification")
-            jwks_client = get_jwks_client()
-            signing_key = jwks_client.get_signing_key_from_jwt(token)
+            signing_key = await supabase_jwks.get_signing_key(unverified_header.get("kid"))
+            if signing_key is None:
+                logger.error("No Supabase signing key for kid %s", unverified_header.get("kid"))
+                return None
             payload = jwt.decode(
                 token,
                 signing_key.key,
@@ -74,9 +96,9 @@ def verify_supabase_token(token: str) -> dict | None:
         return None
 
 
-def get_user_id_from_token(token: str) -> str | None:
+async def get_user_id_from_token(token: str) -> str | None:
     """Extract user ID from Supabase JWT token."""
-    payload = verify_supabase_token(token)
+    payload = await verify_supabase_token(token)
     if payload:
         return payload.get("sub")
     return None
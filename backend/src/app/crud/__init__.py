@@ -11,6 +11,7 @@ from app.crud.crud_bucket import (
     create_bucket,
     delete_bucket,
     get_bucket,
+    get_bucket_snapshot,
     get_buckets_by_user,
     reorder_buckets,
     update_bucket,
@@ -19,6 +20,7 @@ from app.crud.crud_bucket import (
 from app.crud.crud_deposit import (
     create_deposit,
     get_deposit,
+    get_deposits_by_ids,
     get_deposits_by_user,
     get_pending_deposits,
     update_deposit_status,
@@ -38,6 +40,9 @@ from app.crud.crud_user import (
     get_user_by_email,
     get_user_by_phone,
     get_user_by_supabase_id,
+    profile_changes,
+    resolve_user,
+    sync_user_profile,
     update_user,
 )
 
@@ -47,8 +52,12 @@ __all__ = [
     "get_user_by_email",
     "get_user_by_supabase_id",
     "get_or_create_user",
+    "resolve_user",
+    "sync_user_profile",
+    "profile_changes",
     "update_user",
     "get_bucket",
+    "get_bucket_snapshot",
     "get_buckets_by_user",
     "create_bucket",
     "update_bucket",
@@ -63,6 +72,7 @@ __all__ = [
     "deactivate_bank_account",
     "set_primary_bank_account",
     "get_deposit",
+    "get_deposits_by_ids",
     "get_deposits_by_user",
     "get_pending_deposits",
     "create_deposit",
@@ -1,8 +1,13 @@
 from sqlalchemy import select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.bucket_cache import (
+    BucketSnapshot,
+    bucket_snapshot_cache,
+    invalidate_buckets,
+)
 from app.models.bucket import Bucket
-from app.schemas.bucket import BucketCreate, BucketUpdate
+from app.schemas.bucket import BucketCreate, BucketResponse, BucketUpdate
 
 
 async def get_bucket(session: AsyncSession, bucket_id: str) -> Bucket | None:
@@ -21,6 +26,27 @@ async def get_buckets_by_user(
     return list(result.scalars().all())
 
 
+async def get_bucket_snapshot(session: AsyncSession, user_id: str) -> BucketSnapshot:
+    """
+    The user's active buckets, served from the snapshot cache when possible.
+
+    Misses read Postgres via get_buckets_by_user and fill the cache. The
+    returned models are detached copies, safe to share across requests.
+    """
+    version = await bucket_snapshot_cache.current_version(user_id)
+    if version is not None:
+        buckets = await bucket_snapshot_cache.get(user_id, version)
+        if buckets is not None:
+            return BucketSnapshot(version, buckets)
+
+    buckets = tuple(
+        BucketResponse.model_validate(b) for b in await get_buckets_by_user(session, user_id)
+    )
+    if version is not None:
+        await bucket_snapshot_cache.set(user_id, version, buckets)
+    return BucketSnapshot(version, buckets)
+
+
 async def create_bucket(
     session: AsyncSession, user_id: str, bucket_in: BucketCreate
 ) -> Bucket:
@@ -41,6 +67,7 @@ async def create_bucket(
     session.add(bucket)
     await session.flush()
     await session.refresh(bucket)
+    await invalidate_buckets(session, user_id)
     return bucket
 
 
@@ -53,12 +80,14 @@ async def update_bucket(
 
     await session.flush()
     await session.refresh(bucket)
+    await invalidate_buckets(session, bucket.user_id)
     return bucket
 
 
 async def delete_bucket(session: AsyncSession, bucket: Bucket) -> None:
     bucket.is_active = False
     await session.flush()
+    await invalidate_buckets(session, bucket.user_id)
 
 
 async def reorder_buckets(
@@ -70,6 +99,7 @@ async def reorder_buckets(
             .where(Bucket.id == bucket_id, Bucket.user_id == user_id)
             .values(sort_order=index)
         )
+    await invalidate_buckets(session, user_id)
     return await get_buckets_by_user(session, user_id)
 
 
@@ -79,6 +109,7 @@ async def update_bucket_balance(
     bucket = await get_bucket(session, bucket_id)
     if bucket:
         bucket.current_balance = float(bucket.current_balance) + amount
+        await invalidate_buckets(session, bucket.user_id)
         await session.flush()
         await session.refresh(bucket)
     return bucket
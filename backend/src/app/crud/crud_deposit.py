@@ -1,3 +1,5 @@
+from uuid import UUID
+
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
@@ -31,6 +33,34 @@ async def get_deposits_by_user(
     return list(result.scalars().all())
 
 
+async def get_deposits_by_ids(
+    session: AsyncSession, user_id: str, deposit_ids: list[str]
+) -> list[Deposit]:
+    """
+    Fetch the user's deposits among deposit_ids in one query (others are ignored).
+
+    Ids that aren't UUIDs can't match and would make Postgres reject the whole
+    query, so they're dropped up front and reported by the caller as not found.
+    """
+    deposit_ids = [i for i in deposit_ids if _is_uuid(i)]
+    if not deposit_ids:
+        return []
+    result = await session.execute(
+        select(Deposit)
+        .where(Deposit.user_id == user_id, Deposit.id.in_(deposit_ids))
+        .order_by(Deposit.detected_at.desc())
+    )
+    return list(result.scalars().all())
+
+
+def _is_uuid(value: str) -> bool:
+    try:
+        UUID(value)
+    except ValueError:
+        return False
+    return True
+
+
 async def get_pending_deposits(
     session: AsyncSession, user_id: str
 ) -> list[Deposit]:
@@ -0,0 +1,35 @@
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.crud.crud_user import bump_rules_version
+from app.models.deposit_rule import DepositRuleSet
+from app.schemas.deposit_rule import DepositRulesUpdate
+
+
+async def get_deposit_rules(session: AsyncSession, user_id: str) -> DepositRuleSet | None:
+    result = await session.execute(
+        select(DepositRuleSet).where(DepositRuleSet.user_id == user_id)
+    )
+    return result.scalar_one_or_none()
+
+
+async def update_deposit_rules(
+    session: AsyncSession, user_id: str, rules_in: DepositRulesUpdate
+) -> DepositRuleSet:
+    """Apply the set fields to the user's rules, creating the row on first use."""
+    rules = await get_deposit_rules(session, user_id)
+    if rules is None:
+        rules = DepositRuleSet(
+            user_id=user_id,
+            allow_categories=[],
+            deny_categories=[],
+            allow_merchants=[],
+            deny_merchants=[],
+        )
+        session.add(rules)
+    for field, value in rules_in.model_dump(exclude_unset=True).items():
+        setattr(rules, field, value)
+    await session.flush()
+    await session.refresh(rules)
+    await bump_rules_version(session, user_id)
+    return rules
@@ -0,0 +1,54 @@
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.crud.crud_user import bump_rules_version
+from app.models.routing_rule import TemplateRoutingRule
+from app.schemas.routing_rule import RoutingRuleCreate, RoutingRuleUpdate
+
+
+async def get_routing_rule(
+    session: AsyncSession, rule_id: str
+) -> TemplateRoutingRule | None:
+    result = await session.execute(
+        select(TemplateRoutingRule).where(TemplateRoutingRule.id == rule_id)
+    )
+    return result.scalar_one_or_none()
+
+
+async def get_routing_rules_by_user(
+    session: AsyncSession, user_id: str, active_only: bool = False
+) -> list[TemplateRoutingRule]:
+    query = select(TemplateRoutingRule).where(TemplateRoutingRule.user_id == user_id)
+    if active_only:
+        query = query.where(TemplateRoutingRule.is_active == True)  # noqa: E712
+    query = query.order_by(TemplateRoutingRule.priority, TemplateRoutingRule.created_at)
+    result = await session.execute(query)
+    return list(result.scalars().all())
+
+
+async def create_routing_rule(
+    session: AsyncSession, user_id: str, rule_in: RoutingRuleCreate
+) -> TemplateRoutingRule:
+    rule = TemplateRoutingRule(user_id=user_id, **rule_in.model_dump())
+    session.add(rule)
+    await session.flush()
+    await session.refresh(rule)
+    await bump_rules_version(session, user_id)
+    return rule
+
+
+async def update_routing_rule(
+    session: AsyncSession, rule: TemplateRoutingRule, rule_in: RoutingRuleUpdate
+) -> TemplateRoutingRule:
+    for field, value in rule_in.model_dump(exclude_unset=True).items():
+        setattr(rule, field, value)
+    await session.flush()
+    await session.refresh(rule)
+    await bump_rules_version(session, rule.user_id)
+    return rule
+
+
+async def delete_routing_rule(session: AsyncSession, rule: TemplateRoutingRule) -> None:
+    await session.delete(rule)
+    await session.flush()
+    await bump_rules_version(session, rule.user_id)
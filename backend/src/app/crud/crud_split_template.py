@@ -2,6 +2,7 @@ from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
+from app.crud.crud_user import bump_rules_version
 from app.models.split_template import SplitTemplate, SplitTemplateItem
 from app.schemas.split_template import SplitTemplateCreate, SplitTemplateUpdate
 
@@ -58,6 +59,7 @@ async def create_split_template(
         session.add(item)
 
     await session.flush()
+    await bump_rules_version(session, user_id)
     return await _load_template(session, template.id)  # type: ignore[return-value]
 
 
@@ -86,6 +88,7 @@ async def update_split_template(
             session.add(item)
 
     await session.flush()
+    await bump_rules_version(session, template.user_id)
     return await _load_template(session, template.id)  # type: ignore[return-value]
 
 
@@ -94,3 +97,4 @@ async def delete_split_template(
 ) -> None:
     await session.delete(template)
     await session.flush()
+    await bump_rules_version(session, template.user_id)
@@ -1,9 +1,33 @@
-from sqlalchemy import select
+from sqlalchemy import inspect, or_, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
 
+from app.core.cache import invalidate_user, on_commit, user_cache
+from app.core.metrics import metrics
 from app.models.user import User
 
 
+async def get_rules_version(session: AsyncSession, user_id: str) -> int:
+    """The user's rules_version, the cache key for their compiled templates and rules."""
+    version = await session.scalar(select(User.rules_version).where(User.id == user_id))
+    return version or 0
+
+
+async def bump_rules_version(session: AsyncSession, user_id: str) -> None:
+    """
+    Retire every cached template program, router and classifier of the user.
+
+    Runs in the caller's transaction, so the new version becomes visible to
+    all processes (the API and app.worker) together with the change itself.
+    """
+    await session.execute(
+        update(User)
+        .where(User.id == user_id)
+        .values(rules_version=User.rules_version + 1)
+        .execution_options(synchronize_session=False)
+    )
+
+
 async def get_user(session: AsyncSession, user_id: str) -> User | None:
     result = await session.execute(select(User).where(User.id == user_id))
     return result.scalar_one_or_none()
@@ -43,17 +67,11 @@ async def get_or_create_user(
 
     if user:
         # Update user info if changed
-        updated = False
-        if email and user.email != email:
-            user.email = email
-            updated = True
-        if phone_number and user.phone_number != phone_number:
-            user.phone_number = phone_number
-            updated = True
-        if full_name and user.full_name != full_name:
-            user.full_name = full_name
-            updated = True
-        if updated:
+        changes = profile_changes(user, email, phone_number, full_name)
+        if changes:
+            for field, value in changes.items():
+                setattr(user, field, value)
+            invalidate_user(session, supabase_id)
             await session.flush()
             await session.refresh(user)
         return user
@@ -80,6 +98,91 @@ async def update_user(
     if full_name is not None:
         user.full_name = full_name
 
+    invalidate_user(session, user.supabase_id)
     await session.flush()
     await session.refresh(user)
     return user
+
+
+def profile_changes(
+    user: User,
+    email: str | None = None,
+    phone_number: str | None = None,
+    full_name: str | None = None,
+) -> dict[str, str]:
+    """Auth claims that differ from the stored profile (missing claims never clear a field)."""
+    claims = {"email": email, "phone_number": phone_number, "full_name": full_name}
+    return {
+        field: value
+        for field, value in claims.items()
+        if value and getattr(user, field) != value
+    }
+
+
+def _detached_copy(user: User) -> User:
+    """A clean, session-less copy of user's columns that can be merged without a query."""
+    copy = User(**{attr.key: getattr(user, attr.key) for attr in inspect(User).column_attrs})
+    make_transient_to_detached(copy)
+    return copy
+
+
+async def resolve_user(
+    session: AsyncSession,
+    supabase_id: str,
+    email: str | None = None,
+    phone_number: str | None = None,
+    full_name: str | None = None,
+) -> tuple[User, bool]:
+    """
+    The user for an authenticated request, read-mostly.
+
+    A cached user is merged into session without a query or a write. On a
+    miss this falls back to get_or_create_user and caches the user once the
+    request commits.
+
+    Returns:
+        (user, stale): stale means the claims differ from the cached profile;
+        the caller should sync them with sync_user_profile off the request path.
+    """
+    cached = user_cache.get(supabase_id)
+    if cached is not None:
+        metrics.incr("user_cache_hits")
+        user = await session.merge(cached, load=False)
+        return user, bool(profile_changes(user, email, phone_number, full_name))
+
+    metrics.incr("user_cache_misses")
+    user = await get_or_create_user(session, supabase_id, email, phone_number, full_name)
+    snapshot = _detached_copy(user)
+    on_commit(session, lambda: user_cache.set(supabase_id, snapshot))
+    return user, False
+
+
+async def sync_user_profile(
+    session: AsyncSession,
+    supabase_id: str,
+    email: str | None = None,
+    phone_number: str | None = None,
+    full_name: str | None = None,
+) -> bool:
+    """
+    Copy changed auth claims onto the user row in one guarded UPDATE.
+
+    The cached user is dropped on commit either way: it no longer matches
+    the claims, even when another request already wrote them.
+
+    Returns:
+        True if the row changed
+    """
+    claims = {"email": email, "phone_number": phone_number, "full_name": full_name}
+    values = {field: value for field, value in claims.items() if value}
+    if not values:
+        return False
+    result = await session.execute(
+        update(User)
+        .where(User.supabase_id == supabase_id)
+        .where(or_(*(getattr(User, field).is_distinct_from(value) for field, value in values.items())))
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    )
+    invalidate_user(session, supabase_id)
+    return bool(result.rowcount)
@@ -5,13 +5,20 @@ from fastapi.middleware.cors import CORSMiddleware
 
 from app.api import api_router
 from app.core.config import settings
+from app.core.database import SessionDep
+from app.core.jwks import supabase_jwks
+from app.core.metrics import metrics
+from app.services.job_queue import count_jobs
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
+    if settings.supabase_url:
+        await supabase_jwks.start()
     yield
     # Shutdown
+    await supabase_jwks.stop()
 
 
 app = FastAPI(
@@ -37,3 +44,22 @@ app.include_router(api_router, prefix=settings.api_v1_prefix)
 @app.get("/health")
 async def health_check():
     return {"status": "healthy"}
+
+
+@app.get("/metrics")
+async def get_metrics(session: SessionDep):
+    """
+    This API process's counters (webhooks received vs sync jobs enqueued, ...)
+    and sync job outcomes from the sync_jobs table.
+
+    Syncs run in app.worker, so their outcomes come from the table rather than
+    in-process counters.
+    """
+    return {
+        "counters": metrics.snapshot(),
+        "sync_jobs": await count_jobs(session),
+        "hit_rates": {
+            "auth_token_cache": metrics.hit_rate("auth_token_cache"),
+            "user_cache": metrics.hit_rate("user_cache"),
+        },
+    }
@@ -1,8 +1,11 @@
 from app.models.bank_account import BankAccount
 from app.models.bucket import Bucket, BucketType
 from app.models.deposit import Deposit, DepositStatus
+from app.models.deposit_rule import DepositRuleSet
+from app.models.routing_rule import TemplateRoutingRule
 from app.models.split_plan import SplitAction, SplitPlan, SplitPlanStatus
 from app.models.split_template import SplitTemplate, SplitTemplateItem
+from app.models.sync_job import SyncJob, SyncJobStatus
 from app.models.user import User
 
 __all__ = [
@@ -12,9 +15,13 @@ __all__ = [
     "BucketType",
     "Deposit",
     "DepositStatus",
+    "DepositRuleSet",
     "SplitPlan",
     "SplitPlanStatus",
     "SplitAction",
     "SplitTemplate",
     "SplitTemplateItem",
+    "TemplateRoutingRule",
+    "SyncJob",
+    "SyncJobStatus",
 ]
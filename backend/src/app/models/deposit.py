@@ -16,6 +16,8 @@ class DepositStatus(str, Enum):
     FAILED = "failed"
     DETECTED = "detected"          # Auto-detected from Plaid, no template applied
     PENDING_REVIEW = "pending_review"  # Auto-detected + split plan auto-applied, awaiting confirmation
+    HISTORICAL = "historical"      # Imported by the first-link backfill; never auto-applied
+    REMOVED = "removed"            # Plaid removed the transaction (e.g. reversed) before it was split
 
 
 class Deposit(Base):
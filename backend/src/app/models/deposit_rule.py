@@ -0,0 +1,43 @@
+from datetime import datetime
+from uuid import uuid4
+
+from sqlalchemy import DateTime, ForeignKey, Numeric, String, func
+from sqlalchemy.dialects.postgresql import ARRAY, UUID
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.core.database import Base
+
+
+class DepositRuleSet(Base):
+    """
+    A user's overrides for which Plaid credits count as deposits.
+
+    Compiled into a DepositClassifier (app.services.deposit_classifier).
+    Users without a row get the default rules.
+    """
+    __tablename__ = "deposit_rules"
+
+    id: Mapped[str] = mapped_column(
+        UUID(as_uuid=False),
+        primary_key=True,
+        default=lambda: str(uuid4()),
+    )
+    user_id: Mapped[str] = mapped_column(
+        UUID(as_uuid=False),
+        ForeignKey("users.id", ondelete="CASCADE"),
+        unique=True,
+    )
+    min_amount: Mapped[float | None] = mapped_column(Numeric(12, 2), nullable=True)
+    allow_categories: Mapped[list[str]] = mapped_column(ARRAY(String(100)), default=list)
+    deny_categories: Mapped[list[str]] = mapped_column(ARRAY(String(100)), default=list)
+    allow_merchants: Mapped[list[str]] = mapped_column(ARRAY(String(255)), default=list)
+    deny_merchants: Mapped[list[str]] = mapped_column(ARRAY(String(255)), default=list)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+    )
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        onupdate=func.now(),
+    )
@@ -0,0 +1,57 @@
+from datetime import datetime
+from uuid import uuid4
+
+from sqlalchemy import DateTime, ForeignKey, Numeric, String, func
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+
+from app.core.database import Base
+
+
+class TemplateRoutingRule(Base):
+    """
+    Routes matching deposits to a split template during auto-apply.
+
+    Every set condition must hold: the deposit source contains
+    `source_pattern`'s words in order (case-insensitive), the amount is within
+    [min_amount, max_amount], and it arrived on `bank_account_id`. Lower
+    `priority` wins; deposits no rule matches use the oldest template.
+    """
+    __tablename__ = "template_routing_rules"
+
+    id: Mapped[str] = mapped_column(
+        UUID(as_uuid=False),
+        primary_key=True,
+        default=lambda: str(uuid4()),
+    )
+    user_id: Mapped[str] = mapped_column(
+        UUID(as_uuid=False),
+        ForeignKey("users.id", ondelete="CASCADE"),
+        index=True,
+    )
+    template_id: Mapped[str] = mapped_column(
+        UUID(as_uuid=False),
+        ForeignKey("split_templates.id", ondelete="CASCADE"),
+    )
+    priority: Mapped[int] = mapped_column(default=0)
+    source_pattern: Mapped[str | None] = mapped_column(String(255), nullable=True)
+    min_amount: Mapped[float | None] = mapped_column(Numeric(12, 2), nullable=True)
+    max_amount: Mapped[float | None] = mapped_column(Numeric(12, 2), nullable=True)
+    bank_account_id: Mapped[str | None] = mapped_column(
+        UUID(as_uuid=False),
+        ForeignKey("bank_accounts.id", ondelete="CASCADE"),
+        nullable=True,
+    )
+    is_active: Mapped[bool] = mapped_column(default=True)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+    )
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        onupdate=func.now(),
+    )
+
+    # Relationships
+    template: Mapped["SplitTemplate"] = relationship("SplitTemplate")
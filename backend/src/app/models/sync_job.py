@@ -0,0 +1,68 @@
+from datetime import datetime
+from enum import Enum
+from uuid import uuid4
+
+from sqlalchemy import DateTime, Index, String, Text, func, text
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.core.database import Base
+
+
+class SyncJobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+
+class SyncJob(Base):
+    """
+    A queued Plaid transaction sync for one item, run by app.worker.
+
+    At most one job per item is queued at a time (partial unique index), so
+    repeated webhooks for an item that has not been picked up yet add nothing.
+    At most one per item is running, so syncs of an item never overlap.
+    """
+    __tablename__ = "sync_jobs"
+    __table_args__ = (
+        Index(
+            "ix_sync_jobs_queued_item_id", "item_id",
+            unique=True, postgresql_where=text("status = 'queued'"),
+        ),
+        Index(
+            "ix_sync_jobs_running_item_id", "item_id",
+            unique=True, postgresql_where=text("status = 'running'"),
+        ),
+        Index(
+            "ix_sync_jobs_queued_run_after", "run_after",
+            postgresql_where=text("status = 'queued'"),
+        ),
+    )
+
+    id: Mapped[str] = mapped_column(
+        UUID(as_uuid=False),
+        primary_key=True,
+        default=lambda: str(uuid4()),
+    )
+    item_id: Mapped[str] = mapped_column(String(255))
+    status: Mapped[str] = mapped_column(String(20), default=SyncJobStatus.QUEUED.value)
+    attempts: Mapped[int] = mapped_column(default=0)
+    run_after: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+    )
+    locked_at: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True),
+        nullable=True,
+    )
+    last_error: Mapped[str | None] = mapped_column(Text, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+    )
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        onupdate=func.now(),
+    )
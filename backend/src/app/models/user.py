@@ -28,6 +28,9 @@ class User(Base):
     )
     full_name: Mapped[str | None] = mapped_column(String(255), nullable=True)
     is_active: Mapped[bool] = mapped_column(default=True)
+    # Bumped by every template, routing rule and deposit rule change; caches
+    # of what is compiled from them are keyed on it (see crud_user)
+    rules_version: Mapped[int] = mapped_column(default=0, server_default="0")
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True),
         server_default=func.now(),
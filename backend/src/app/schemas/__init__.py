@@ -18,6 +18,8 @@ from app.schemas.split_plan import (
     SplitActionResponse,
     SplitActionUpdate,
     SplitPlanApprove,
+    SplitPlanBatchPreview,
+    SplitPlanBatchPreviewRequest,
     SplitPlanCreate,
     SplitPlanPreview,
     SplitPlanResponse,
@@ -48,4 +50,6 @@ __all__ = [
     "SplitPlanResponse",
     "SplitPlanApprove",
     "SplitPlanPreview",
+    "SplitPlanBatchPreview",
+    "SplitPlanBatchPreviewRequest",
 ]
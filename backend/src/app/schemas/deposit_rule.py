@@ -0,0 +1,33 @@
+from pydantic import BaseModel, Field, field_validator
+
+
+class DepositRulesBase(BaseModel):
+    # Smallest credit treated as a deposit; None uses the default ($10)
+    min_amount: float | None = Field(None, ge=0)
+    # Added to / removed from the default deposit categories
+    allow_categories: list[str] = Field(default_factory=list, max_length=100)
+    deny_categories: list[str] = Field(default_factory=list, max_length=100)
+    # Merchant (or transaction) names, case-insensitive; checked before categories
+    allow_merchants: list[str] = Field(default_factory=list, max_length=100)
+    deny_merchants: list[str] = Field(default_factory=list, max_length=100)
+
+
+class DepositRulesUpdate(BaseModel):
+    min_amount: float | None = Field(None, ge=0)
+    allow_categories: list[str] | None = Field(None, max_length=100)
+    deny_categories: list[str] | None = Field(None, max_length=100)
+    allow_merchants: list[str] | None = Field(None, max_length=100)
+    deny_merchants: list[str] | None = Field(None, max_length=100)
+
+    @field_validator(
+        "allow_categories", "deny_categories", "allow_merchants", "deny_merchants",
+        mode="before",
+    )
+    @classmethod
+    def _null_clears(cls, value):
+        # An explicit null clears the list; the columns are NOT NULL
+        return [] if value is None else value
+
+
+class DepositRulesResponse(DepositRulesBase):
+    default_categories: list[str]
@@ -0,0 +1,52 @@
+from datetime import datetime
+
+from pydantic import BaseModel, Field, field_validator, model_validator
+
+
+class RoutingRuleBase(BaseModel):
+    template_id: str
+    priority: int = 0  # lower wins
+    source_pattern: str | None = Field(None, max_length=255)  # words the source must contain, in order
+    min_amount: float | None = Field(None, ge=0)
+    max_amount: float | None = Field(None, ge=0)
+    bank_account_id: str | None = None
+    is_active: bool = True
+
+
+class RoutingRuleCreate(RoutingRuleBase):
+    @model_validator(mode="after")
+    def _check_amount_range(self) -> "RoutingRuleCreate":
+        if (
+            self.min_amount is not None
+            and self.max_amount is not None
+            and self.min_amount > self.max_amount
+        ):
+            raise ValueError("min_amount must not exceed max_amount")
+        return self
+
+
+class RoutingRuleUpdate(BaseModel):
+    template_id: str | None = None
+    priority: int | None = None
+    source_pattern: str | None = Field(None, max_length=255)
+    min_amount: float | None = Field(None, ge=0)
+    max_amount: float | None = Field(None, ge=0)
+    bank_account_id: str | None = None
+    is_active: bool | None = None
+
+    @field_validator("template_id", "priority", "is_active")
+    @classmethod
+    def _not_null(cls, value):
+        # Omit these to leave them unchanged; the columns are NOT NULL
+        if value is None:
+            raise ValueError("may be omitted but not null")
+        return value
+
+
+class RoutingRuleResponse(RoutingRuleBase):
+    id: str
+    user_id: str
+    created_at: datetime
+    updated_at: datetime
+
+    model_config = {"from_attributes": True}
@@ -1,6 +1,6 @@
 from datetime import datetime
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
 
 from app.models.split_plan import SplitPlanStatus
 
@@ -33,7 +33,8 @@ class SplitPlanBase(BaseModel):
 
 
 class SplitPlanCreate(SplitPlanBase):
-    actions: list[SplitActionCreate]
+    # Leave empty to have the server allocate across the user's buckets
+    actions: list[SplitActionCreate] = Field(default_factory=list)
 
 
 class SplitPlanUpdate(BaseModel):
@@ -62,6 +63,24 @@ class SplitPlanPreview(BaseModel):
     actions: list[SplitActionBase]
 
 
+class SplitPlanBatchPreviewRequest(BaseModel):
+    """Preview many deposits at once: explicit IDs, or every pending deposit."""
+    deposit_ids: list[str] = Field(default_factory=list, max_length=500)
+    all_pending: bool = False
+    respect_targets: bool = False
+
+    @model_validator(mode="after")
+    def _ids_or_all_pending(self) -> "SplitPlanBatchPreviewRequest":
+        if not self.deposit_ids and not self.all_pending:
+            raise ValueError("Provide deposit_ids or set all_pending")
+        return self
+
+
+class SplitPlanBatchPreview(BaseModel):
+    previews: list[SplitPlanPreview]
+    not_found: list[str] = []  # requested IDs that are missing or not the user's
+
+
 class ActionExecutionResult(BaseModel):
     """Result of executing a single split action."""
     action_id: str
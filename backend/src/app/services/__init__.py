@@ -2,7 +2,7 @@
 Services barrel export
 """
 
-from app.services.allocation import calculate_allocation
+from app.services.allocation import calculate_allocation, calculate_allocation_batch
 from app.services.notification import notification_service
 from app.services.split_execution import split_execution_service
 from app.services.transfer import transfer_service
@@ -10,6 +10,7 @@ from app.services.plaid import plaid_service
 
 __all__ = [
     "calculate_allocation",
+    "calculate_allocation_batch",
     "notification_service",
     "split_execution_service",
     "transfer_service",
@@ -1,4 +1,496 @@
+"""
+Allocation engine.
+
+All arithmetic is done in integer cents. Percentage shares are floored and the
+left-over cents are handed out by the largest-remainder method, so the result
+always sums exactly to the deposit and never needs a correction pass.
+
+A bucket set or split template is compiled once into an immutable
+AllocationProgram (fixed amounts in priority order with their prefix sums,
+integer percentage weights with the normalizing denominator) and cached, so
+the hot path is a cache lookup plus a short arithmetic loop.
+
+Preview and template auto-apply run the same program; they differ only in
+the OverflowPolicy they pass. Bucket percentages share what the fixed buckets
+leave, while template percentages are of the whole deposit (as the mobile
+client shows them), so template programs are compiled with percent_of_total.
+
+A bucket program can also be compiled with targets respected: each bucket
+with a target_amount is capped at its headroom (target minus current
+balance), and percentage shares that would overfill a bucket spill to the
+others by water-filling.
+"""
+from collections.abc import Mapping, Sequence
+from dataclasses import dataclass
+from decimal import Decimal
+from enum import Enum
+from fractions import Fraction
+
+import numpy as np
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import bucket_program_cache, template_program_cache
+from app.crud.crud_bucket import get_bucket_snapshot
+from app.crud.crud_split_template import get_split_template
 from app.models.bucket import Bucket, BucketType
+from app.models.split_template import SplitTemplate
+from app.schemas.bucket import BucketResponse
+
+# allocation_value is Numeric(12, 2), so percentages are whole hundredths of a
+# percent: 100% == 10_000.
+PERCENT_SCALE = 10_000
+
+_FIXED = BucketType.FIXED.value
+_PERCENTAGE = BucketType.PERCENTAGE.value
+
+# Products of cents and weights must stay inside int64 on the batch path.
+_INT64_SAFE = 2**62
+
+
+class OverflowPolicy(str, Enum):
+    """
+    What to do when a configuration does not fit the deposit.
+
+    CAP: cap fixed buckets at what is left, normalize percentages above 100%
+        and send any unassigned remainder to the first funded bucket — always
+        a complete split (interactive preview, manual plans).
+    REJECT: raise AllocationOverflowError if fixed amounts exceed the deposit,
+        percentages exceed 100% or, for percent_of_total programs, fixed plus
+        percentage shares exceed the deposit; any unassigned remainder stays
+        in the source account (unattended auto-apply).
+    """
+    CAP = "cap"
+    REJECT = "reject"
+
+
+class AllocationOverflowError(ValueError):
+    """Raised under OverflowPolicy.REJECT when a configuration overflows."""
+
+
+def to_cents(amount: float | Decimal) -> int:
+    """Convert a dollar amount (float or Decimal) to integer cents."""
+    return round(float(amount) * 100)
+
+
+def from_cents(cents: int) -> float:
+    """Convert integer cents back to a dollar float."""
+    return cents / 100
+
+
+def to_weight(percentage: float | Decimal) -> int:
+    """Convert a percentage (e.g. 33.33) to hundredths of a percent."""
+    return round(float(percentage) * 100)
+
+
+def split_largest_remainder(
+    amount_cents: int, weights: Sequence[int], denominator: int, target: int
+) -> list[int]:
+    """
+    Split amount_cents * weight / denominator across weights in whole cents.
+
+    Each share is floored, then the `target - sum(shares)` left-over cents go
+    one each to the largest remainders (ties favour the earlier entry).
+    """
+    products = [amount_cents * weight for weight in weights]
+    shares = [product // denominator for product in products]
+    leftover = target - sum(shares)
+    if leftover > 0:
+        remainders = [product % denominator for product in products]
+        # sorted() stays stable with reverse=True, so ties keep bucket order
+        order = sorted(range(len(remainders)), key=remainders.__getitem__, reverse=True)
+        for index in order[:leftover]:
+            shares[index] += 1
+    return shares
+
+
+@dataclass(frozen=True)
+class AllocationMatrix:
+    """
+    Allocations for many deposits over one bucket configuration.
+
+    `cents[i, j]` is what deposit i sends to `bucket_ids[j]` (0 when the scalar
+    path would omit the bucket). Columns are fixed buckets, then percentage
+    buckets, each in their original order. Rows in `rejected` overflowed under
+    OverflowPolicy.REJECT and are all zero.
+    """
+    bucket_ids: tuple[str, ...]
+    cents: np.ndarray
+    rejected: np.ndarray
+
+    @property
+    def amounts(self) -> np.ndarray:
+        """Dollar amounts, bit-identical to calculate_allocation's floats."""
+        return self.cents / 100
+
+    def row(self, index: int) -> dict[str, float]:
+        """One deposit's allocation in calculate_allocation's dict form."""
+        return {
+            bucket_id: int(cents) / 100
+            for bucket_id, cents in zip(self.bucket_ids, self.cents[index])
+            if cents
+        }
+
+
+@dataclass(frozen=True, slots=True)
+class AllocationProgram:
+    """
+    A bucket set or template compiled for repeated allocation.
+
+    Fixed buckets are funded first, in priority order; percentage buckets then
+    share what is left. With percent_of_total (templates) they take their
+    percentage of the whole deposit instead, scaled down under CAP to fit what
+    the fixed buckets leave. Overflow (fixed amounts above the deposit,
+    percentages above 100%) and any unassigned remainder are handled per
+    OverflowPolicy. Zero shares are omitted.
+
+    With headroom (capped mode), buckets in `capped_ids` never receive more
+    than their headroom: fixed amounts are clipped at compile time, and
+    percentage buckets are water-filled — `fill_order` lists the capped
+    percentage buckets by headroom/weight, so each deposit saturates a prefix
+    of it in one pass and splits the rest proportionally. Money no bucket can
+    take stays in the source account.
+    """
+    fixed_ids: tuple[str, ...]
+    fixed_cents: tuple[int, ...]
+    fixed_prefix: tuple[int, ...]  # cents claimed by the fixed buckets before each one
+    fixed_total: int
+    percentage_ids: tuple[str, ...]
+    weights: tuple[int, ...]  # hundredths of a percent
+    weight_total: int
+    denominator: int  # max(weight_total, PERCENT_SCALE)
+    capped_ids: frozenset[str] = frozenset()
+    caps: tuple[int | None, ...] = ()  # per percentage bucket; None if uncapped
+    fill_order: tuple[int, ...] = ()  # capped percentage indices by cap/weight
+    percent_of_total: bool = False  # percentages of the deposit, not the remainder
+
+    @classmethod
+    def compile(
+        cls,
+        fixed: Sequence[tuple[str, int]],
+        percentages: Sequence[tuple[str, int]],
+        headroom: Mapping[str, int] | None = None,
+        percent_of_total: bool = False,
+    ) -> "AllocationProgram":
+        """
+        Args:
+            fixed: (bucket_id, cents) pairs, in priority order
+            percentages: (bucket_id, weight) pairs, weight in hundredths of a percent
+            headroom: bucket_id -> cents it can still take, for capped buckets
+            percent_of_total: take percentages of the whole deposit rather
+                than of what the fixed buckets leave
+        """
+        caps: tuple[int | None, ...] = ()
+        fill_order: tuple[int, ...] = ()
+        if headroom:
+            fixed = [
+                (bucket_id, min(cents, headroom.get(bucket_id, cents)))
+                for bucket_id, cents in fixed
+            ]
+            caps = tuple(headroom.get(bucket_id) for bucket_id, _ in percentages)
+            fill_order = tuple(sorted(
+                (
+                    i for i, (cap, (_, weight)) in enumerate(zip(caps, percentages))
+                    if cap is not None and weight > 0
+                ),
+                key=lambda i: Fraction(caps[i], percentages[i][1]),
+            ))
+
+        fixed_cents = tuple(cents for _, cents in fixed)
+        prefix: list[int] = []
+        running = 0
+        for cents in fixed_cents:
+            prefix.append(running)
+            running += cents
+        weights = tuple(weight for _, weight in percentages)
+        weight_total = sum(weights)
+        return cls(
+            fixed_ids=tuple(bucket_id for bucket_id, _ in fixed),
+            fixed_cents=fixed_cents,
+            fixed_prefix=tuple(prefix),
+            fixed_total=running,
+            percentage_ids=tuple(bucket_id for bucket_id, _ in percentages),
+            weights=weights,
+            weight_total=weight_total,
+            denominator=max(weight_total, PERCENT_SCALE),
+            capped_ids=frozenset(headroom or ()),
+            caps=caps,
+            fill_order=fill_order,
+            percent_of_total=percent_of_total,
+        )
+
+    @classmethod
+    def from_buckets(
+        cls, buckets: Sequence[Bucket | BucketResponse], respect_targets: bool = False
+    ) -> "AllocationProgram":
+        """
+        Compile buckets in their given (sort_order) order.
+
+        With respect_targets, buckets that have a target_amount are capped at
+        target_amount - current_balance (never below zero).
+        """
+        fixed: list[tuple[str, int]] = []
+        percentages: list[tuple[str, int]] = []
+        headroom: dict[str, int] = {}
+        for bucket in buckets:
+            if bucket.bucket_type == _FIXED:
+                fixed.append((bucket.id, round(float(bucket.allocation_value) * 100)))
+            elif bucket.bucket_type == _PERCENTAGE:
+                percentages.append((bucket.id, round(float(bucket.allocation_value) * 100)))
+            else:
+                continue
+            if respect_targets and bucket.target_amount is not None:
+                headroom[bucket.id] = max(
+                    0, to_cents(bucket.target_amount) - to_cents(bucket.current_balance)
+                )
+        return cls.compile(fixed, percentages, headroom)
+
+    @classmethod
+    def from_template(cls, template: SplitTemplate) -> "AllocationProgram":
+        """
+        Compile a template's items (must be loaded) in their sort order.
+
+        Template percentages are of the whole deposit, not of what the fixed
+        items leave.
+        """
+        fixed: list[tuple[str, int]] = []
+        percentages: list[tuple[str, int]] = []
+        for item in template.items:
+            if item.allocation_type == _FIXED:
+                fixed.append((item.bucket_id, to_cents(item.allocation_value)))
+            else:
+                percentages.append((item.bucket_id, to_weight(item.allocation_value)))
+        return cls.compile(fixed, percentages, percent_of_total=True)
+
+    @property
+    def bucket_ids(self) -> tuple[str, ...]:
+        return self.fixed_ids + self.percentage_ids
+
+    @property
+    def is_empty(self) -> bool:
+        return not (self.fixed_ids or self.percentage_ids)
+
+    def _percentage_base(self, total_cents: int, remaining: int) -> int:
+        """
+        Cents the percentages are taken of, given `remaining` > 0 after fixed.
+
+        Normally that is `remaining`. With percent_of_total it is the whole
+        deposit, lowered if need be to the largest base whose floored share
+        still fits in `remaining`.
+        """
+        if not self.percent_of_total:
+            return remaining
+        fits = ((remaining + 1) * self.denominator - 1) // self.weight_total
+        return total_cents if total_cents < fits else fits
+
+    def _split_percentages(self, base: int, target: int) -> list[int]:
+        """
+        Percentage shares of `base` cents, summing to `target` if uncapped.
+
+        Capped buckets are water-filled in one walk of fill_order. The level
+        starts at the exact uncapped share rate (base / denominator); a
+        bucket whose cap is at or below level * weight is filled to its cap,
+        which can only raise the level for the rest, so the first bucket that
+        fits ends the walk. The others split what is left by largest
+        remainder. Cents nobody can take are left out of the result.
+        """
+        shares = [0] * len(self.weights)
+        # Exact pool left, scaled by the denominator to stay in integers
+        pool_scaled = base * self.weight_total
+        weight_left = self.weight_total
+        saturated = 0
+        for i in self.fill_order:
+            cap, weight = self.caps[i], self.weights[i]
+            if cap * self.denominator * weight_left > pool_scaled * weight:
+                break
+            shares[i] = cap
+            pool_scaled -= cap * self.denominator
+            target -= cap
+            weight_left -= weight
+            saturated += 1
+
+        if not saturated:
+            return split_largest_remainder(base, self.weights, self.denominator, target)
+
+        # The rest share the exact pool left at the raised level; target is
+        # already its floor, so leftover cents go by largest remainder as usual.
+        filled = set(self.fill_order[:saturated])
+        rest = [i for i in range(len(self.weights)) if i not in filled]
+        if weight_left > 0 and target > 0:
+            rest_shares = split_largest_remainder(
+                pool_scaled,
+                [self.weights[i] for i in rest],
+                self.denominator * weight_left,
+                target,
+            )
+            for i, share in zip(rest, rest_shares):
+                shares[i] = share
+        return shares
+
+    def check_overflow(self, total_cents: int) -> None:
+        """Raise AllocationOverflowError if the program overflows total_cents."""
+        if self.fixed_total > total_cents:
+            raise AllocationOverflowError(
+                f"fixed total ${from_cents(self.fixed_total):.2f} exceeds "
+                f"deposit ${from_cents(total_cents):.2f}"
+            )
+        if self.weight_total > PERCENT_SCALE:
+            raise AllocationOverflowError(
+                f"percentages add up to {self.weight_total / 100:g}%"
+            )
+        if self.percent_of_total and total_cents > 0:
+            shares = total_cents * self.weight_total // self.denominator
+            if self.fixed_total + shares > total_cents:
+                raise AllocationOverflowError(
+                    f"fixed ${from_cents(self.fixed_total):.2f} plus "
+                    f"{self.weight_total / 100:g}% exceeds "
+                    f"deposit ${from_cents(total_cents):.2f}"
+                )
+
+    def run(
+        self, total_cents: int, policy: OverflowPolicy = OverflowPolicy.CAP
+    ) -> dict[str, int]:
+        """Allocate one deposit (in cents); returns bucket_id -> cents."""
+        if policy is OverflowPolicy.REJECT:
+            self.check_overflow(total_cents)
+
+        allocations: dict[str, int] = {}
+        for bucket_id, cents, claimed in zip(
+            self.fixed_ids, self.fixed_cents, self.fixed_prefix
+        ):
+            available = total_cents - claimed
+            if available <= 0:
+                break
+            allocation = cents if cents < available else available
+            if allocation > 0:
+                allocations[bucket_id] = allocation
+
+        remaining = total_cents
+        if total_cents > 0:
+            remaining -= min(total_cents, self.fixed_total)
+
+        if self.weight_total > 0 and remaining > 0:
+            base = self._percentage_base(total_cents, remaining)
+            target = base * self.weight_total // self.denominator
+            if self.fill_order:
+                shares = self._split_percentages(base, target)
+            else:
+                shares = split_largest_remainder(
+                    base, self.weights, self.denominator, target
+                )
+            for bucket_id, share in zip(self.percentage_ids, shares):
+                if share > 0:
+                    allocations[bucket_id] = share
+                    remaining -= share
+
+        if policy is OverflowPolicy.CAP and allocations and remaining > 0:
+            # Slack goes to the first funded bucket that has no target
+            first_bucket_id = next(
+                (b for b in allocations if b not in self.capped_ids), None
+            )
+            if first_bucket_id is not None:
+                allocations[first_bucket_id] += remaining
+
+        return allocations
+
+    def allocate(
+        self,
+        total_amount: float | Decimal,
+        policy: OverflowPolicy = OverflowPolicy.CAP,
+    ) -> dict[str, float]:
+        """Allocate one deposit in dollars; returns bucket_id -> amount."""
+        return {
+            bucket_id: cents / 100
+            for bucket_id, cents in self.run(to_cents(total_amount), policy).items()
+        }
+
+    def run_batch(
+        self, totals_cents: np.ndarray, policy: OverflowPolicy = OverflowPolicy.CAP
+    ) -> AllocationMatrix:
+        """
+        Vectorized run() over an array of deposit totals (in cents).
+
+        Same semantics, bit for bit: fixed buckets capped via the prefix sums,
+        floored percentage shares plus largest-remainder cents, remainder per
+        policy. Under REJECT, overflowing rows are flagged instead of raising.
+        """
+        totals = np.asarray(totals_cents, dtype=np.int64)
+        n = totals.shape[0]
+        bucket_ids = self.bucket_ids
+
+        rejected = np.zeros(n, dtype=bool)
+        if policy is OverflowPolicy.REJECT:
+            if self.weight_total > PERCENT_SCALE:
+                rejected[:] = True
+            else:
+                rejected = totals < self.fixed_total
+                if self.percent_of_total:
+                    shares = totals * self.weight_total // self.denominator
+                    rejected |= (totals > 0) & (self.fixed_total + shares > totals)
+            # Rejected rows allocate nothing
+            totals = np.where(rejected, 0, totals)
+
+        # percent_of_total also scales (total + 1) by the denominator
+        scale = self.denominator if self.percent_of_total else max(self.weights, default=0)
+        if n and (self.capped_ids or (
+            self.weights and (int(np.abs(totals).max()) + 1) * scale >= _INT64_SAFE
+        )):
+            # Capped programs and absurd magnitudes go row by row through run()
+            cents = np.zeros((n, len(bucket_ids)), dtype=np.int64)
+            columns = {bucket_id: j for j, bucket_id in enumerate(bucket_ids)}
+            for i, total in enumerate(totals.tolist()):
+                if rejected[i]:
+                    continue
+                for bucket_id, value in self.run(total, policy).items():
+                    cents[i, columns[bucket_id]] = value
+            return AllocationMatrix(bucket_ids=bucket_ids, cents=cents, rejected=rejected)
+
+        fixed_cents = np.array(self.fixed_cents, dtype=np.int64)
+        prefix = np.array(self.fixed_prefix, dtype=np.int64)
+        fixed_alloc = np.clip(totals[:, None] - prefix[None, :], 0, fixed_cents[None, :])
+        remaining = totals - fixed_alloc.sum(axis=1)
+
+        weights = np.array(self.weights, dtype=np.int64)
+        pct_alloc = np.zeros((n, weights.size), dtype=np.int64)
+        if self.weight_total > 0:
+            base = np.where(remaining > 0, remaining, 0)
+            if self.percent_of_total:
+                fits = ((base + 1) * self.denominator - 1) // self.weight_total
+                base = np.where(base > 0, np.minimum(totals, fits), 0)
+            target = base * self.weight_total // self.denominator
+            products = base[:, None] * weights[None, :]
+            pct_alloc = products // self.denominator
+            leftover = target - pct_alloc.sum(axis=1)
+            if leftover.any():
+                # Rank remainders per row (stable, so ties keep bucket order) and
+                # give one cent to each of the top `leftover` ranks
+                order = np.argsort(-(products % self.denominator), axis=1, kind="stable")
+                bonus = (np.arange(weights.size)[None, :] < leftover[:, None]).astype(np.int64)
+                extra = np.zeros_like(pct_alloc)
+                np.put_along_axis(extra, order, bonus, axis=1)
+                pct_alloc += extra
+            remaining = remaining - target
+
+        cents = np.concatenate((fixed_alloc, pct_alloc), axis=1)
+
+        if policy is OverflowPolicy.CAP:
+            # Unassigned slack goes to the first funded bucket
+            positive = cents > 0
+            slack_rows = (remaining > 0) & positive.any(axis=1)
+            if slack_rows.any():
+                first = positive.argmax(axis=1)
+                rows = np.nonzero(slack_rows)[0]
+                cents[rows, first[rows]] += remaining[rows]
+
+        return AllocationMatrix(bucket_ids=bucket_ids, cents=cents, rejected=rejected)
+
+    def allocate_batch(
+        self,
+        amounts: Sequence[float] | np.ndarray,
+        policy: OverflowPolicy = OverflowPolicy.CAP,
+    ) -> AllocationMatrix:
+        """Vectorized allocate() over an array of dollar amounts."""
+        totals = np.rint(np.asarray(amounts, dtype=np.float64) * 100).astype(np.int64)
+        return self.run_batch(totals, policy)
 
 
 def calculate_allocation(
@@ -15,41 +507,59 @@ def calculate_allocation(
     """
     if not buckets:
         return {}
+    return AllocationProgram.from_buckets(buckets).allocate(total_amount)
 
-    allocations: dict[str, float] = {}
-    remaining = total_amount
-
-    # First, handle fixed amount buckets
-    fixed_buckets = [b for b in buckets if b.bucket_type == BucketType.FIXED.value]
-    for bucket in fixed_buckets:
-        allocation = min(float(bucket.allocation_value), remaining)
-        if allocation > 0:
-            allocations[bucket.id] = round(allocation, 2)
-            remaining -= allocation
-
-    # Then, handle percentage buckets
-    percentage_buckets = [
-        b for b in buckets if b.bucket_type == BucketType.PERCENTAGE.value
-    ]
-    total_percentage = sum(float(b.allocation_value) for b in percentage_buckets)
-
-    if total_percentage > 0 and remaining > 0:
-        for bucket in percentage_buckets:
-            percentage = float(bucket.allocation_value)
-            if total_percentage > 100:
-                # Normalize percentages if they exceed 100%
-                percentage = (percentage / total_percentage) * 100
-            allocation = round((percentage / 100) * remaining, 2)
-            if allocation > 0:
-                allocations[bucket.id] = allocation
-
-    # Adjust for rounding errors
-    allocated_total = sum(allocations.values())
-    if allocations and abs(total_amount - allocated_total) > 0.01:
-        # Add the difference to the first bucket
-        first_bucket_id = next(iter(allocations))
-        allocations[first_bucket_id] = round(
-            allocations[first_bucket_id] + (total_amount - allocated_total), 2
-        )
 
-    return allocations
+def calculate_allocation_batch(
+    amounts: Sequence[float] | np.ndarray, buckets: Sequence[Bucket]
+) -> AllocationMatrix:
+    """
+    Split many deposits across one bucket configuration in a single pass.
+
+    Intended for backfills and bulk previews; row i matches
+    calculate_allocation(amounts[i], buckets) exactly.
+    """
+    return AllocationProgram.from_buckets(buckets).allocate_batch(amounts)
+
+
+# ── Cached programs ───────────────────────────────────────────────────────────
+
+async def load_bucket_program(
+    session: AsyncSession, user_id: str, respect_targets: bool = False
+) -> AllocationProgram:
+    """
+    Compiled program for a user's active buckets.
+
+    Cached under the user's bucket snapshot version, which every bucket
+    mutation (balances included) bumps, so it never needs invalidating.
+    """
+    snapshot = await get_bucket_snapshot(session, user_id)
+    if snapshot.version is None:
+        return AllocationProgram.from_buckets(snapshot.buckets, respect_targets)
+
+    key = (user_id, snapshot.version, respect_targets)
+    program = bucket_program_cache.get(key)
+    if program is None:
+        program = AllocationProgram.from_buckets(snapshot.buckets, respect_targets)
+        bucket_program_cache.set(key, program)
+    return program  # type: ignore[return-value]
+
+
+async def load_template_program(
+    session: AsyncSession, template_id: str, rules_version: int
+) -> AllocationProgram | None:
+    """
+    Compiled program for a split template, or None if it has no items.
+
+    Cached under the owner's rules_version (crud_user.get_rules_version),
+    which every template change bumps, so it never needs invalidating.
+    """
+    key = (template_id, rules_version)
+    program = template_program_cache.get(key)
+    if program is None:
+        template = await get_split_template(session, template_id)
+        if not template or not template.items:
+            return None
+        program = AllocationProgram.from_template(template)
+        template_program_cache.set(key, program)
+    return program  # type: ignore[return-value]
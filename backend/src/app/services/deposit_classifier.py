@@ -0,0 +1,119 @@
+"""
+Deposit classification.
+
+Decides which Plaid transactions become Deposits. A user's DepositRuleSet is
+compiled once into an immutable DepositClassifier (frozensets, a float
+threshold) and cached, so classifying a sync page is a single pass of set
+lookups with nothing rebuilt per transaction.
+
+A transaction is a deposit when it is a settled credit (negative Plaid
+amount, not pending) of at least the minimum amount, and then, in order:
+1. its merchant is on the deny list -> no
+2. its merchant is on the allow list -> yes
+3. any category is denied -> no
+4. any category is allowed (defaults plus the user's additions) -> yes
+Merchants match case-insensitively on merchant_name, falling back to name.
+"""
+from collections.abc import Iterable
+from dataclasses import dataclass
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import deposit_classifier_cache
+from app.crud.crud_deposit_rule import get_deposit_rules
+from app.crud.crud_user import get_rules_version
+from app.models.deposit_rule import DepositRuleSet
+from app.services.plaid import PlaidTransaction
+
+DEFAULT_MIN_DEPOSIT = 10.00
+DEFAULT_DEPOSIT_CATEGORIES = frozenset({
+    "Transfer",
+    "Payroll",
+    "Direct Deposit",
+    "Income",
+    "Dividend",
+})
+
+
+def _merchant_key(name: str | None) -> str:
+    return name.strip().casefold() if name else ""
+
+
+@dataclass(frozen=True, slots=True)
+class DepositClassifier:
+    min_amount: float
+    categories: frozenset[str]        # allowed, after removing denied ones
+    deny_categories: frozenset[str]
+    allow_merchants: frozenset[str]   # _merchant_key()s
+    deny_merchants: frozenset[str]
+
+    @classmethod
+    def compile(cls, rules: DepositRuleSet | None = None) -> "DepositClassifier":
+        """Classifier for a user's rules, or the defaults when rules is None."""
+        if rules is None:
+            return cls(
+                min_amount=DEFAULT_MIN_DEPOSIT,
+                categories=DEFAULT_DEPOSIT_CATEGORIES,
+                deny_categories=frozenset(),
+                allow_merchants=frozenset(),
+                deny_merchants=frozenset(),
+            )
+        deny_categories = frozenset(rules.deny_categories or ())
+        return cls(
+            min_amount=(
+                float(rules.min_amount) if rules.min_amount is not None else DEFAULT_MIN_DEPOSIT
+            ),
+            categories=(DEFAULT_DEPOSIT_CATEGORIES | set(rules.allow_categories or ())) - deny_categories,
+            deny_categories=deny_categories,
+            allow_merchants=frozenset(map(_merchant_key, rules.allow_merchants or ())),
+            deny_merchants=frozenset(map(_merchant_key, rules.deny_merchants or ())),
+        )
+
+    def is_deposit(self, transaction: PlaidTransaction) -> bool:
+        return bool(self.classify((transaction,)))
+
+    def classify(self, transactions: Iterable[PlaidTransaction]) -> list[PlaidTransaction]:
+        """The deposits among `transactions`, in their original order."""
+        # Locals: this loop runs once per transaction of every sync page
+        threshold = -self.min_amount
+        categories = self.categories
+        deny_categories = self.deny_categories
+        allow_merchants = self.allow_merchants
+        deny_merchants = self.deny_merchants
+        check_merchants = bool(allow_merchants or deny_merchants)
+
+        deposits = []
+        for tx in transactions:
+            # Deposits are negative in Plaid; need -amount >= min_amount
+            if tx.amount > threshold or tx.amount >= 0 or tx.pending:
+                continue
+            if check_merchants:
+                merchant = _merchant_key(tx.merchant_name or tx.name)
+                if merchant in deny_merchants:
+                    continue
+                if merchant in allow_merchants:
+                    deposits.append(tx)
+                    continue
+            if deny_categories and not deny_categories.isdisjoint(tx.category):
+                continue
+            if not categories.isdisjoint(tx.category):
+                deposits.append(tx)
+        return deposits
+
+
+default_deposit_classifier = DepositClassifier.compile()
+
+
+async def load_deposit_classifier(session: AsyncSession, user_id: str) -> DepositClassifier:
+    """
+    Compiled classifier for a user's deposit rules (the defaults if they have none).
+
+    Cached under the user's rules_version, which crud_deposit_rule bumps.
+    """
+    key = (user_id, await get_rules_version(session, user_id))
+    classifier = deposit_classifier_cache.get(key)
+    if classifier is None:
+        rules = await get_deposit_rules(session, user_id)
+        classifier = DepositClassifier.compile(rules) if rules else default_deposit_classifier
+        deposit_classifier_cache.set(key, classifier)
+    return classifier  # type: ignore[return-value]
@@ -2,34 +2,121 @@
 Deposit detection service.
 
 Triggered by Plaid TRANSACTIONS webhooks. Syncs new credit transactions,
-creates Deposit rows, and auto-applies the user's first split template.
+creates Deposit rows, and auto-applies the split template the user's routing
+rules pick (the oldest template when none match).
 """
 import logging
+from collections.abc import AsyncIterator
+from datetime import date, timedelta
 from decimal import Decimal
+from uuid import uuid4
 
-from sqlalchemy import select
+from sqlalchemy import (
+    DateTime,
+    String,
+    any_,
+    bindparam,
+    case,
+    cast,
+    column,
+    delete,
+    exists,
+    func,
+    insert,
+    literal,
+    literal_column,
+    select,
+    table,
+    text,
+    tuple_,
+    update,
+)
+from sqlalchemy.dialects.postgresql import ARRAY, UUID, distinct_on
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
 
+from app.core.config import settings
+from app.crud.crud_user import get_rules_version
 from app.models.bank_account import BankAccount
 from app.models.deposit import Deposit, DepositStatus
 from app.models.split_plan import SplitAction, SplitPlan, SplitPlanStatus
-from app.models.split_template import SplitTemplate
-from app.services.plaid import plaid_service
+from app.services.allocation import (
+    AllocationOverflowError,
+    OverflowPolicy,
+    from_cents,
+    load_template_program,
+    to_cents,
+)
+from app.services.deposit_classifier import load_deposit_classifier
+from app.services.plaid import PlaidTransaction, TransactionSyncPage, plaid_service
+from app.services.template_routing import load_template_router
 
 logger = logging.getLogger(__name__)
 
+# Per-transaction staging for backfill_transactions (temporary, per transaction)
+_STAGING = table(
+    "deposit_backfill",
+    column("seq"),
+    column("plaid_transaction_id"),
+    column("amount"),
+    column("source"),
+    column("tx_date"),
+)
 
-async def sync_new_transactions(db: AsyncSession, item_id: str) -> list[Deposit]:
+# Element type for `= ANY` over uuid columns (see _any)
+_UUID = UUID(as_uuid=False)
+
+# Deposits a modified Plaid transaction may rewrite (if no plan is approved)
+REPLANNABLE_DEPOSIT_STATUSES = (
+    DepositStatus.DETECTED.value,
+    DepositStatus.PENDING_REVIEW.value,
+)
+# Deposits a removed Plaid transaction may retire: no money moved yet
+REMOVABLE_DEPOSIT_STATUSES = (
+    *REPLANNABLE_DEPOSIT_STATUSES,
+    DepositStatus.PENDING.value,
+)
+APPROVED_PLAN_STATUSES = (
+    SplitPlanStatus.APPROVED.value,
+    SplitPlanStatus.EXECUTING.value,
+    SplitPlanStatus.COMPLETED.value,
+)
+UNEXECUTED_PLAN_STATUSES = (
+    SplitPlanStatus.DRAFT.value,
+    SplitPlanStatus.PENDING_APPROVAL.value,
+    SplitPlanStatus.APPROVED.value,
+)
+
+
+async def sync_new_transactions(db: AsyncSession, item_id: str) -> int:
     """
     Sync new Plaid transactions for a given item_id and create Deposit records.
 
     Steps:
     1. Look up BankAccount by plaid_item_id
-    2. Call Plaid transactions/sync with stored cursor
-    3. Filter to credit transactions, skip already-seen plaid_transaction_ids
-    4. INSERT Deposit rows; call auto_apply_template for each
-    5. Persist the updated sync cursor
+    2. Page through Plaid transactions/sync from the stored cursor until
+       has_more is false
+    3. Per page: pick deposits with the user's DepositClassifier; bulk INSERT
+       added ones (already-stored plaid_transaction_ids are skipped by ON
+       CONFLICT), upsert modified ones, retire removed ones, and call
+       auto_apply_templates for the new and changed deposits
+    4. Per page: commit, then drop the page; the cursor is saved with the
+       last page (has_more false) only
+
+    Committing per page keeps memory bounded, and the writes are idempotent
+    per transaction_id, so a failure part-way keeps what was stored. The
+    cursor must not move mid-run: Plaid requires a run that hits
+    MUTATION_DURING_PAGINATION to restart from the cursor it started at, so
+    a retry after a failure starts from that cursor too and replays the
+    pages already stored. The first sync of an account (no cursor) runs in
+    backfill mode instead; see backfill_transactions().
+
+    Returns:
+        Number of deposits created
+
+    Raises:
+        Whatever Plaid or the database raised, after rolling back the page in
+        flight, so the sync job is retried rather than marked done
     """
     result = await db.execute(
         select(BankAccount).where(
@@ -40,135 +127,395 @@ async def sync_new_transactions(db: AsyncSession, item_id: str) -> list[Deposit]
     bank_account = result.scalar_one_or_none()
     if not bank_account:
         logger.warning("sync_new_transactions: no bank account for item_id=%s", item_id)
-        return []
+        return 0
 
     if not bank_account.plaid_access_token:
         logger.warning("sync_new_transactions: bank account %s has no access token", bank_account.id)
-        return []
+        return 0
 
+    new_count = 0
+    pages = plaid_service.sync_transactions(
+        access_token=bank_account.plaid_access_token,
+        cursor=bank_account.cursor,
+    )
     try:
-        transactions, next_cursor = await plaid_service.sync_transactions(
-            access_token=bank_account.plaid_access_token,
-            cursor=bank_account.cursor,
-        )
+        if bank_account.cursor is None:
+            new_count = await backfill_transactions(db, bank_account, pages)
+        else:
+            async for page in pages:
+                new_count += await _process_page(db, bank_account, page)
+                if not page.has_more:
+                    # Even if the run had no new deposits
+                    bank_account.cursor = page.next_cursor
+                await db.commit()
     except Exception:
-        logger.exception("Plaid sync failed for item_id=%s", item_id)
-        return []
+        # Earlier pages are committed, the cursor is not: the caller
+        # (app.worker) retries the whole run from the start cursor
+        await db.rollback()
+        logger.error(
+            "Plaid sync failed for item_id=%s after %d new deposits", item_id, new_count
+        )
+        raise
 
-    new_deposits: list[Deposit] = []
+    logger.info(
+        "sync_new_transactions done: item_id=%s, %d new deposits",
+        item_id, new_count,
+    )
+    return new_count
 
-    for tx in transactions:
-        if not plaid_service.is_deposit_transaction(tx):
-            continue
 
-        # Deduplication — skip if we already have this transaction
-        dup_check = await db.execute(
-            select(Deposit).where(Deposit.plaid_transaction_id == tx.transaction_id)
-        )
-        if dup_check.scalar_one_or_none():
-            logger.debug("Skipping duplicate plaid_transaction_id=%s", tx.transaction_id)
-            continue
+async def backfill_transactions(
+    db: AsyncSession,
+    bank_account: BankAccount,
+    pages: AsyncIterator[TransactionSyncPage],
+) -> int:
+    """
+    Ingest an account's history (first sync, no cursor) in one set-based merge.
 
-        deposit = Deposit(
-            user_id=bank_account.user_id,
-            bank_account_id=bank_account.id,
-            amount=abs(tx.amount),
-            source=tx.merchant_name or tx.name,
-            plaid_transaction_id=tx.transaction_id,
-            status=DepositStatus.DETECTED.value,
-        )
-        db.add(deposit)
-        await db.flush()
-        await db.refresh(deposit)
+    Each page's deposits are streamed into a temporary staging table with
+    asyncpg COPY and the page is dropped; once Plaid has no more pages, one
+    INSERT ... SELECT moves the latest version of every staged transaction
+    into deposits, with detected_at set to the transaction date (so imported
+    history keeps its place in deposit lists and simulation windows).
+    Deposits dated more than settings.plaid_backfill_recent_days ago are
+    stored as 'historical' and never auto-applied; only the recent ones go
+    through auto_apply_templates.
 
-        await auto_apply_template(db, deposit)
+    Runs as a single transaction (the staging table is ON COMMIT DROP) and
+    stores the final cursor with the merge, so a failure leaves the account
+    to backfill again from scratch.
 
-        new_deposits.append(deposit)
-        logger.info(
-            "Created deposit %s (amount=%.2f, source=%s)",
-            deposit.id, deposit.amount, deposit.source,
-        )
+    Returns:
+        Number of deposits created
+    """
+    classifier = await load_deposit_classifier(db, bank_account.user_id)
+    await db.execute(text(
+        f"CREATE TEMP TABLE {_STAGING.name} ("
+        " seq bigserial,"
+        " plaid_transaction_id varchar(255) NOT NULL,"
+        " amount numeric(12, 2) NOT NULL,"
+        " source varchar(255),"
+        " tx_date date NOT NULL"
+        ") ON COMMIT DROP"
+    ))
+    raw = await (await db.connection()).get_raw_connection()
+    driver = raw.driver_connection  # asyncpg.Connection
 
-    # Persist updated cursor even if no new deposits (advances the cursor)
-    if next_cursor:
-        bank_account.cursor = next_cursor
-        await db.flush()
+    staged = 0
+    next_cursor = None
+    async for page in pages:
+        records = [
+            (tx.transaction_id, Decimal(str(abs(tx.amount))), tx.merchant_name or tx.name, tx.date)
+            for tx in classifier.classify([*page.added, *page.modified])
+        ]
+        if records:
+            await driver.copy_records_to_table(
+                _STAGING.name,
+                records=records,
+                columns=["plaid_transaction_id", "amount", "source", "tx_date"],
+            )
+            staged += len(records)
+        if page.removed:
+            await db.execute(
+                delete(_STAGING).where(_STAGING.c.plaid_transaction_id == _any(page.removed))
+            )
+        next_cursor = page.next_cursor
 
-    await db.commit()
+    cutoff = date.today() - timedelta(days=settings.plaid_backfill_recent_days)
+    latest = (
+        select(_STAGING)
+        .ext(distinct_on(_STAGING.c.plaid_transaction_id))
+        .order_by(_STAGING.c.plaid_transaction_id, _STAGING.c.seq.desc())
+        .subquery()
+    )
+    result = await db.execute(
+        pg_insert(Deposit)
+        .from_select(
+            ["id", "user_id", "bank_account_id", "amount", "source",
+             "plaid_transaction_id", "status", "detected_at"],
+            select(
+                func.gen_random_uuid(),
+                literal(bank_account.user_id, UUID(as_uuid=False)),
+                literal(bank_account.id, UUID(as_uuid=False)),
+                latest.c.amount,
+                latest.c.source,
+                latest.c.plaid_transaction_id,
+                case(
+                    (latest.c.tx_date < cutoff, DepositStatus.HISTORICAL.value),
+                    else_=DepositStatus.DETECTED.value,
+                ),
+                # History keeps its own dates, so it doesn't all look detected today
+                cast(latest.c.tx_date, DateTime(timezone=True)),
+            ),
+        )
+        .on_conflict_do_nothing(index_elements=[Deposit.plaid_transaction_id])
+        .returning(Deposit.id, Deposit.status)
+    )
+    merged = result.all()
+    recent_ids = [row.id for row in merged if row.status == DepositStatus.DETECTED.value]
+    if recent_ids:
+        recent = await db.scalars(select(Deposit).where(Deposit.id == _any(recent_ids, _UUID)))
+        await auto_apply_templates(db, list(recent))
 
+    bank_account.cursor = next_cursor
+    await db.commit()
     logger.info(
-        "sync_new_transactions done: item_id=%s, %d new deposits",
-        item_id, len(new_deposits),
+        "Backfill for bank account %s: %d staged, %d new deposits (%d recent)",
+        bank_account.id, staged, len(merged), len(recent_ids),
+    )
+    return len(merged)
+
+
+async def insert_deposits(db: AsyncSession, rows: list[dict]) -> list[Deposit]:
+    """
+    Insert a page of deposit rows in one statement; returns only the new ones.
+
+    INSERT ... ON CONFLICT (plaid_transaction_id) DO NOTHING RETURNING lets
+    the unique constraint do deduplication, so rows already stored (from an
+    earlier or concurrent sync) are skipped without a lookup. Returned
+    deposits are attached to the session, in the order of `rows`.
+    """
+    if not rows:
+        return []
+    result = await db.scalars(
+        pg_insert(Deposit)
+        .on_conflict_do_nothing(index_elements=[Deposit.plaid_transaction_id])
+        .returning(Deposit),
+        rows,
+    )
+    position = {row["plaid_transaction_id"]: i for i, row in enumerate(rows)}
+    return sorted(result.all(), key=lambda d: position[d.plaid_transaction_id])
+
+
+async def upsert_deposits(
+    db: AsyncSession, rows: list[dict]
+) -> tuple[list[Deposit], list[Deposit]]:
+    """
+    Insert or update a page of modified deposit rows in one statement.
+
+    Stored deposits take the new amount and source and go back to 'detected'
+    (the caller re-plans them), but only while no plan has been approved and
+    only if the amount or source actually changed; other rows are left alone
+    and not returned.
+
+    Returns:
+        (inserted, updated) deposits, attached to the session
+    """
+    if not rows:
+        return [], []
+    stmt = pg_insert(Deposit)
+    result = await db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[Deposit.plaid_transaction_id],
+            set_={
+                "amount": stmt.excluded.amount,
+                "source": stmt.excluded.source,
+                "status": DepositStatus.DETECTED.value,
+            },
+            where=Deposit.status.in_(REPLANNABLE_DEPOSIT_STATUSES)
+            & tuple_(Deposit.amount, Deposit.source).is_distinct_from(
+                tuple_(stmt.excluded.amount, stmt.excluded.source)
+            )
+            & ~exists().where(
+                SplitPlan.deposit_id == Deposit.id,
+                SplitPlan.status.in_(APPROVED_PLAN_STATUSES),
+            ),
+        )
+        .returning(Deposit, literal_column("xmax = 0").label("inserted"))
+        .execution_options(populate_existing=True),
+        rows,
     )
-    return new_deposits
+    inserted: list[Deposit] = []
+    updated: list[Deposit] = []
+    for deposit, was_inserted in result.all():
+        (inserted if was_inserted else updated).append(deposit)
+    return inserted, updated
 
 
-async def auto_apply_template(db: AsyncSession, deposit: Deposit) -> SplitPlan | None:
+async def remove_deposits(db: AsyncSession, transaction_ids: list[str]) -> list[str]:
     """
-    Apply the user's first split template to a deposit, creating a SplitPlan.
+    Mark deposits whose Plaid transactions were removed, and cancel their plans.
+
+    Deposits already being moved or completed are left as they are (and
+    logged); for the rest, unexecuted plans are cancelled in one statement.
 
-    - If no template exists, deposit stays 'detected' for manual allocation.
-    - If fixed allocations exceed the deposit amount, skip and leave as 'detected'.
-    - On success, creates SplitPlan (status=pending_approval, source=auto)
-      and updates deposit.status to 'pending_review'.
+    Returns:
+        Ids of the deposits marked removed
     """
+    if not transaction_ids:
+        return []
     result = await db.execute(
-        select(SplitTemplate)
-        .where(SplitTemplate.user_id == deposit.user_id)
-        .options(selectinload(SplitTemplate.items))
-        .order_by(SplitTemplate.created_at)
-        .limit(1)
+        update(Deposit)
+        .where(
+            Deposit.plaid_transaction_id == _any(transaction_ids),
+            Deposit.status.in_(REMOVABLE_DEPOSIT_STATUSES),
+        )
+        .values(status=DepositStatus.REMOVED.value)
+        .returning(Deposit.id)
+        .execution_options(synchronize_session=False)
     )
-    template = result.scalar_one_or_none()
-
-    if not template or not template.items:
-        logger.info("No split template for user %s — deposit %s stays 'detected'", deposit.user_id, deposit.id)
-        return None
-
-    deposit_amount = Decimal(str(deposit.amount))
-    action_amounts: list[tuple[str, Decimal]] = []
-    fixed_total = Decimal("0")
-
-    for item in template.items:
-        if item.allocation_type == "fixed":
-            amount = Decimal(str(item.allocation_value))
-            fixed_total += amount
-            action_amounts.append((item.bucket_id, amount))
-        else:  # percentage
-            amount = (deposit_amount * Decimal(str(item.allocation_value)) / Decimal("100")).quantize(
-                Decimal("0.01")
+    deposit_ids = list(result.scalars())
+    if deposit_ids:
+        await db.execute(
+            update(SplitPlan)
+            .where(
+                SplitPlan.deposit_id == _any(deposit_ids, _UUID),
+                SplitPlan.status.in_(UNEXECUTED_PLAN_STATUSES),
+            )
+            .values(status=SplitPlanStatus.CANCELLED.value)
+            .execution_options(synchronize_session=False)
+        )
+    if len(deposit_ids) < len(transaction_ids):
+        logger.info(
+            "%d removed transactions had no deposit or one already executing",
+            len(transaction_ids) - len(deposit_ids),
+        )
+    return deposit_ids
+
+
+def _any(values: list[str], element_type=String):
+    """
+    `= ANY(:values)` operand; one array bind, so the statement is the same for any length.
+
+    element_type must match the compared column: asyncpg casts the bind to
+    `element_type[]`, and Postgres has no uuid = varchar operator.
+    """
+    return any_(bindparam("values", values, type_=ARRAY(element_type)))
+
+
+def _deposit_rows(bank_account: BankAccount, transactions: list[PlaidTransaction]) -> list[dict]:
+    """Deposit rows for classified transactions, one per transaction_id (last wins)."""
+    by_id = {
+        tx.transaction_id: {
+            "user_id": bank_account.user_id,
+            "bank_account_id": bank_account.id,
+            "amount": abs(tx.amount),
+            "source": tx.merchant_name or tx.name,
+            "plaid_transaction_id": tx.transaction_id,
+            "status": DepositStatus.DETECTED.value,
+        }
+        for tx in transactions
+    }
+    return list(by_id.values())
+
+
+async def _process_page(
+    db: AsyncSession, bank_account: BankAccount, page: TransactionSyncPage
+) -> int:
+    """
+    Apply one transactions/sync page; returns the number of new deposits.
+
+    - added: bulk insert, skipping already-stored transactions
+    - modified: bulk upsert; changed deposits lose their unexecuted plans and
+      are re-planned with the new amount
+    - removed: bulk status change to 'removed', unexecuted plans cancelled
+    """
+    classifier = await load_deposit_classifier(db, bank_account.user_id)
+
+    rows = _deposit_rows(bank_account, classifier.classify(page.added))
+    deposits = await insert_deposits(db, rows)
+    if len(deposits) < len(rows):
+        logger.debug("Skipped %d already-stored transactions", len(rows) - len(deposits))
+    created = len(deposits)
+
+    if page.modified:
+        inserted, updated = await upsert_deposits(
+            db, _deposit_rows(bank_account, classifier.classify(page.modified))
+        )
+        if updated:
+            # Unapproved plans for the old amount; auto-apply makes new ones below
+            await db.execute(
+                delete(SplitPlan)
+                .where(SplitPlan.deposit_id == _any([d.id for d in updated], _UUID))
+                .execution_options(synchronize_session=False)
             )
-            action_amounts.append((item.bucket_id, amount))
+            logger.info("Updated %d modified deposits", len(updated))
+        deposits += inserted + updated
+        created += len(inserted)
+
+    if page.removed:
+        removed = await remove_deposits(db, page.removed)
+        if removed:
+            logger.info("Marked %d deposits removed", len(removed))
 
-    if fixed_total > deposit_amount:
+    for deposit in deposits[:created]:
         logger.info(
-            "Skipping auto-apply for deposit %s: fixed total $%s > deposit $%s",
-            deposit.id, fixed_total, deposit_amount,
+            "Created deposit %s (amount=%.2f, source=%s)",
+            deposit.id, deposit.amount, deposit.source,
         )
-        return None
+    await auto_apply_templates(db, deposits)
+    return created
 
-    plan = SplitPlan(
-        deposit_id=deposit.id,
-        total_amount=float(deposit_amount),
-        status=SplitPlanStatus.PENDING_APPROVAL.value,
-        source="auto",
-    )
-    db.add(plan)
-    await db.flush()
 
-    for bucket_id, amount in action_amounts:
-        db.add(SplitAction(
-            split_plan_id=plan.id,
-            bucket_id=bucket_id,
-            amount=float(amount),
-        ))
+async def auto_apply_templates(db: AsyncSession, deposits: list[Deposit]) -> list[str]:
+    """
+    Apply the routed split template to each deposit, creating SplitPlans.
+
+    - The template comes from the user's cached TemplateRouter (routing rules
+      on source, amount and bank account, else the oldest template). Router
+      and program are cached under the user's rules_version, read once per
+      user in the batch, so there is no query per deposit on a warm cache
+      and an edit committed through the API is seen at once.
+    - If no template exists, the deposit stays 'detected' for manual allocation.
+    - If the template overflows the deposit (fixed allocations, or fixed
+      plus percentage shares, above the amount, or percentages above 100%),
+      skip and leave as 'detected'.
+    - Uses the same allocation core as preview, with OverflowPolicy.REJECT:
+      template percentages are of the whole deposit (as the mobile client
+      shows them), and any unallocated remainder stays in the source account.
+    - On success, creates a SplitPlan (status=pending_approval, source=auto)
+      with its SplitActions and sets deposit.status to 'pending_review'.
 
-    deposit.status = DepositStatus.PENDING_REVIEW.value
-    await db.flush()
-    await db.refresh(plan)
+    Plan ids are generated here rather than by a flush, so all plans go in
+    one multi-row INSERT and all actions in a second, whatever the batch
+    size. The deposit status changes are written by the next flush.
 
-    logger.info(
-        "Auto-applied template '%s' to deposit %s → plan %s",
-        template.name, deposit.id, plan.id,
-    )
-    return plan
+    Returns:
+        Ids of the created plans, in deposit order
+    """
+    plan_rows: list[dict] = []
+    action_rows: list[dict] = []
+    versions: dict[str, int] = {}
+    for deposit in deposits:
+        deposit_cents = to_cents(deposit.amount)
+        version = versions.get(deposit.user_id)
+        if version is None:
+            version = versions[deposit.user_id] = await get_rules_version(db, deposit.user_id)
+        router = await load_template_router(db, deposit.user_id, version)
+        template_id = router.route(deposit.source, deposit_cents, deposit.bank_account_id)
+        program = await load_template_program(db, template_id, version) if template_id else None
+
+        if program is None:
+            logger.info("No split template for user %s — deposit %s stays 'detected'", deposit.user_id, deposit.id)
+            continue
+
+        try:
+            action_cents = program.run(deposit_cents, OverflowPolicy.REJECT)
+        except AllocationOverflowError as e:
+            logger.info("Skipping auto-apply for deposit %s: %s", deposit.id, e)
+            continue
+
+        plan_id = str(uuid4())
+        plan_rows.append({
+            "id": plan_id,
+            "deposit_id": deposit.id,
+            "total_amount": from_cents(deposit_cents),
+            "status": SplitPlanStatus.PENDING_APPROVAL.value,
+            "source": "auto",
+        })
+        action_rows.extend(
+            {"split_plan_id": plan_id, "bucket_id": bucket_id, "amount": from_cents(cents)}
+            for bucket_id, cents in action_cents.items()
+        )
+        deposit.status = DepositStatus.PENDING_REVIEW.value
+
+        logger.info(
+            "Auto-applied template '%s' to deposit %s → plan %s",
+            router.template_names[template_id], deposit.id, plan_id,
+        )
+
+    if plan_rows:
+        await db.execute(insert(SplitPlan), plan_rows)
+    if action_rows:
+        await db.execute(insert(SplitAction), action_rows)
+    return [row["id"] for row in plan_rows]
@@ -0,0 +1,167 @@
+"""
+Postgres-backed queue of Plaid sync jobs.
+
+The webhook route enqueues, app.worker dequeues. Workers claim jobs with
+SELECT ... FOR UPDATE SKIP LOCKED inside an UPDATE, so any number of them
+can poll the same table without handing one job out twice or blocking on
+each other's claimed rows. A job whose item already has a running job is
+not claimed until that one finishes (a partial unique index backs this),
+so syncs of one item never overlap and need no lock of their own.
+
+Lifecycle: queued -> running -> done | failed. A failed attempt below
+settings.sync_job_max_attempts enqueues a retry with exponential backoff;
+a job stuck in running past settings.sync_job_timeout_seconds (its worker
+died) is failed and retried the same way by reap_jobs().
+"""
+import logging
+from datetime import timedelta
+
+from sqlalchemy import delete, exists, func, select, text, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+
+from app.core.config import settings
+from app.models.sync_job import SyncJob, SyncJobStatus
+
+logger = logging.getLogger(__name__)
+
+# Finished jobs are kept this long for inspection, then deleted by reap_jobs()
+FINISHED_JOB_RETENTION = timedelta(days=7)
+MAX_RETRY_DELAY_SECONDS = 300
+
+_FINISHED = [SyncJobStatus.DONE.value, SyncJobStatus.FAILED.value]
+
+
+async def enqueue_sync(
+    session: AsyncSession, item_id: str, attempts: int = 0, delay_seconds: float = 0
+) -> bool:
+    """
+    Queue a sync of item_id.
+
+    Args:
+        delay_seconds: earliest start, from now. Webhooks pass the coalescing
+            window, so the rest of a burst finds this job still queued
+
+    Returns:
+        False if a queued (not yet claimed) job for the item already exists;
+        that job will see the same new transactions, so none is added
+    """
+    values: dict = {"item_id": item_id, "attempts": attempts}
+    if delay_seconds:
+        values["run_after"] = func.now() + timedelta(seconds=delay_seconds)
+    result = await session.execute(
+        pg_insert(SyncJob)
+        .values(**values)
+        .on_conflict_do_nothing(
+            index_elements=[SyncJob.item_id],
+            # Literal, not a bind parameter: Postgres must match it to the
+            # partial index predicate when planning
+            index_where=text("status = 'queued'"),
+        )
+        .returning(SyncJob.id)
+    )
+    return result.first() is not None
+
+
+async def claim_jobs(session: AsyncSession, limit: int) -> list[SyncJob]:
+    """
+    Move up to `limit` due jobs, oldest first, to running and return them.
+
+    Jobs for an item that already has a running job wait their turn.
+    """
+    running = aliased(SyncJob)
+    claimable = (
+        select(SyncJob.id)
+        .where(
+            SyncJob.status == SyncJobStatus.QUEUED.value,
+            SyncJob.run_after <= func.now(),
+            ~exists().where(
+                running.item_id == SyncJob.item_id,
+                running.status == SyncJobStatus.RUNNING.value,
+            ),
+        )
+        .order_by(SyncJob.run_after)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    result = await session.scalars(
+        update(SyncJob)
+        .where(SyncJob.id.in_(claimable.scalar_subquery()))
+        .values(
+            status=SyncJobStatus.RUNNING.value,
+            attempts=SyncJob.attempts + 1,
+            locked_at=func.now(),
+        )
+        .returning(SyncJob)
+        .execution_options(synchronize_session=False)
+    )
+    return list(result.all())
+
+
+async def complete_job(session: AsyncSession, job_id: str) -> None:
+    await session.execute(
+        update(SyncJob)
+        .where(SyncJob.id == job_id)
+        .values(status=SyncJobStatus.DONE.value, locked_at=None)
+    )
+
+
+async def fail_job(session: AsyncSession, job: SyncJob, error: str) -> None:
+    """Mark a claimed job failed and queue a retry if it has attempts left."""
+    await session.execute(
+        update(SyncJob)
+        .where(SyncJob.id == job.id)
+        .values(status=SyncJobStatus.FAILED.value, locked_at=None, last_error=error)
+    )
+    if job.attempts >= settings.sync_job_max_attempts:
+        logger.error("Sync job %s for item_id=%s gave up after %d attempts: %s",
+                     job.id, job.item_id, job.attempts, error)
+        return
+    delay = min(2 ** job.attempts, MAX_RETRY_DELAY_SECONDS)
+    await enqueue_sync(session, job.item_id, attempts=job.attempts, delay_seconds=delay)
+    logger.warning("Sync job %s for item_id=%s failed (attempt %d), retrying in %ds: %s",
+                   job.id, job.item_id, job.attempts, delay, error)
+
+
+async def reap_jobs(session: AsyncSession) -> int:
+    """
+    Retry jobs whose worker died mid-run and delete old finished jobs.
+
+    Returns:
+        Number of stuck jobs failed over
+    """
+    stale = await session.scalars(
+        select(SyncJob)
+        .where(
+            SyncJob.status == SyncJobStatus.RUNNING.value,
+            SyncJob.locked_at < func.now() - timedelta(seconds=settings.sync_job_timeout_seconds),
+        )
+        .with_for_update(skip_locked=True)
+    )
+    stale_jobs = list(stale.all())
+    for job in stale_jobs:
+        await fail_job(session, job, "worker timed out")
+
+    await session.execute(
+        delete(SyncJob).where(
+            SyncJob.status.in_(_FINISHED),
+            SyncJob.updated_at < func.now() - FINISHED_JOB_RETENTION,
+        )
+    )
+    return len(stale_jobs)
+
+
+async def count_jobs(session: AsyncSession) -> dict[str, int]:
+    """
+    Jobs per status, across all workers.
+
+    Finished jobs only count until reap_jobs() deletes them, so done and
+    failed cover the last FINISHED_JOB_RETENTION.
+    """
+    rows = await session.execute(
+        select(SyncJob.status, func.count()).group_by(SyncJob.status)
+    )
+    counts = {status.value: 0 for status in SyncJobStatus}
+    counts.update({status: count for status, count in rows.all()})
+    return counts
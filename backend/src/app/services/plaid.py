@@ -7,10 +7,12 @@ Story 83: Plaid integration architecture
 
 import asyncio
 import certifi
+import json
 import logging
 import os
 import ssl
-from dataclasses import dataclass
+from collections.abc import AsyncIterator
+from dataclasses import dataclass, field
 from datetime import date, datetime
 from enum import Enum
 from typing import Any
@@ -41,6 +43,17 @@ from app.core.config import settings
 
 logger = logging.getLogger(__name__)
 
+# Restarts allowed when Plaid reports a mutation during sync pagination
+_MAX_SYNC_RESTARTS = 3
+
+
+def _plaid_error_code(error: plaid.ApiException) -> str | None:
+    """error_code from a Plaid API error body, if it has one."""
+    try:
+        return json.loads(error.body or "{}").get("error_code")
+    except (TypeError, ValueError):
+        return None
+
 
 PLAID_ENV_URLS = {
     "sandbox": plaid.Environment.Sandbox,
@@ -93,6 +106,30 @@ class PlaidTransaction:
     pending: bool
 
 
+@dataclass
+class TransactionSyncPage:
+    """One page of a transactions/sync run."""
+    added: list[PlaidTransaction]
+    next_cursor: str  # resume point once this page has been processed
+    has_more: bool
+    modified: list[PlaidTransaction] = field(default_factory=list)
+    removed: list[str] = field(default_factory=list)  # transaction_ids
+
+
+def _to_transaction(t: Any) -> PlaidTransaction:
+    """PlaidTransaction from an SDK Transaction."""
+    return PlaidTransaction(
+        transaction_id=t.transaction_id,
+        account_id=t.account_id,
+        amount=float(t.amount),
+        date=t.date,
+        name=t.name,
+        merchant_name=getattr(t, "merchant_name", None),
+        category=list(t.category) if t.category else [],
+        pending=t.pending,
+    )
+
+
 @dataclass
 class LinkTokenResponse:
     """Response from creating a Plaid Link token."""
@@ -127,7 +164,7 @@ class PlaidService:
             )
 
             configuration = plaid.Configuration(
-                host=PLAID_ENV_URLS.get(
+                host=settings.plaid_host or PLAID_ENV_URLS.get(
                     self.environment.value, plaid.Environment.Sandbox
                 ),
                 api_key={
@@ -140,7 +177,9 @@ class PlaidService:
             api_client = plaid.ApiClient(configuration)
             self.client = plaid_api.PlaidApi(api_client)
 
-            logger.info(f"Plaid client initialized ({self.environment.value})")
+            logger.info(
+                f"Plaid client initialized ({self.environment.value}, {configuration.host})"
+            )
 
         except Exception as e:
             logger.error(f"Failed to initialize Plaid: {e}")
@@ -272,44 +311,63 @@ class PlaidService:
         self,
         access_token: str,
         cursor: str | None = None,
-    ) -> tuple[list[PlaidTransaction], str]:
+    ) -> AsyncIterator[TransactionSyncPage]:
         """
-        Sync transactions using Plaid's sync endpoint.
+        Sync transactions using Plaid's sync endpoint, one page at a time.
+
+        Keeps calling transactions/sync until has_more is false, yielding each
+        page before fetching the next, so callers can process and drop pages
+        (and persist page.next_cursor) with bounded memory.
 
-        Uses cursor-based pagination for efficient updates.
+        If Plaid reports the data changed mid-pagination, paging restarts from
+        the cursor this run started at, as Plaid requires; pages may then be
+        yielded again, so consumers must be idempotent per transaction_id.
 
         Args:
             access_token: Plaid access token
             cursor: Previous sync cursor (None for initial sync)
 
-        Returns:
-            Tuple of (transactions, new_cursor)
+        Yields:
+            TransactionSyncPage per transactions/sync response
         """
         client = self._ensure_client()
-        logger.info(f"Syncing transactions (cursor={cursor})")
-
-        kwargs: dict[str, Any] = {"access_token": access_token}
-        if cursor:
-            kwargs["cursor"] = cursor
-
-        request = TransactionsSyncRequest(**kwargs)
-        response = await asyncio.to_thread(client.transactions_sync, request)
-
-        transactions = [
-            PlaidTransaction(
-                transaction_id=t.transaction_id,
-                account_id=t.account_id,
-                amount=float(t.amount),
-                date=t.date,
-                name=t.name,
-                merchant_name=getattr(t, "merchant_name", None),
-                category=list(t.category) if t.category else [],
-                pending=t.pending,
+        start_cursor = cursor
+        restarts = 0
+
+        while True:
+            logger.info("Syncing transactions (cursor=%s)", cursor)
+            kwargs: dict[str, Any] = {
+                "access_token": access_token,
+                "count": settings.plaid_sync_page_size,
+            }
+            if cursor:
+                kwargs["cursor"] = cursor
+
+            request = TransactionsSyncRequest(**kwargs)
+            try:
+                response = await asyncio.to_thread(client.transactions_sync, request)
+            except plaid.ApiException as e:
+                if (
+                    _plaid_error_code(e) == "TRANSACTIONS_SYNC_MUTATION_DURING_PAGINATION"
+                    and restarts < _MAX_SYNC_RESTARTS
+                ):
+                    restarts += 1
+                    logger.warning("Transactions changed during pagination; restarting sync")
+                    cursor = start_cursor
+                    continue
+                raise
+
+            yield TransactionSyncPage(
+                added=[_to_transaction(t) for t in response.added],
+                modified=[_to_transaction(t) for t in response.modified],
+                removed=[t.transaction_id for t in response.removed],
+                next_cursor=response.next_cursor,
+                has_more=bool(response.has_more),
             )
-            for t in response.added
-        ]
 
-        return (transactions, response.next_cursor)
+            if not response.has_more:
+                return
+            cursor = response.next_cursor
 
     async def get_balance(
         self,
@@ -369,9 +427,15 @@ class PlaidService:
         from plaid.model.transfer_authorization_create_request import (
             TransferAuthorizationCreateRequest,
         )
+        from plaid.model.transfer_authorization_idempotency_key import (
+            TransferAuthorizationIdempotencyKey,
+        )
         from plaid.model.transfer_authorization_user_in_request import (
             TransferAuthorizationUserInRequest,
         )
+        from plaid.model.transfer_create_idempotency_key import (
+            TransferCreateIdempotencyKey,
+        )
         from plaid.model.transfer_create_request import TransferCreateRequest
         from plaid.model.transfer_network import TransferNetwork
         from plaid.model.transfer_type import TransferType
@@ -388,13 +452,14 @@ class PlaidService:
             amount=f"{amount:.2f}",
             ach_class=ACHClass("ppd"),
             user=TransferAuthorizationUserInRequest(legal_name="FlowSplit User"),
-            idempotency_key=idempotency_key,
+            idempotency_key=TransferAuthorizationIdempotencyKey(idempotency_key),
         )
         auth_response = await asyncio.to_thread(
             client.transfer_authorization_create, auth_request
         )
         authorization = auth_response.authorization
-        if authorization.decision != "approved":
+        decision = getattr(authorization.decision, "value", authorization.decision)
+        if decision != "approved":
             raise ValueError(
                 f"Plaid transfer authorization denied: {authorization.decision_rationale}"
             )
@@ -405,7 +470,7 @@ class PlaidService:
             account_id=account_id,
             authorization_id=authorization.id,
             description=description[:15],  # Plaid max 15 chars
-            idempotency_key=idempotency_key,
+            idempotency_key=TransferCreateIdempotencyKey(idempotency_key),
         )
         transfer_response = await asyncio.to_thread(
             client.transfer_create, transfer_request
@@ -451,44 +516,7 @@ class PlaidService:
                 # await self._process_transfer_update(payload)
                 pass
 
-    # -------------------------------------------------------------------------
-    # Deposit Detection
-    # -------------------------------------------------------------------------
-
-    def is_deposit_transaction(self, transaction: PlaidTransaction) -> bool:
-        """
-        Determine if a transaction is a deposit that should be split.
-
-        Criteria:
-        - Negative amount (credit to account)
-        - Not pending
-        - Above minimum threshold
-        - Matches deposit categories (payroll, transfer, etc.)
-        """
-        # Deposits appear as negative amounts in Plaid
-        if transaction.amount >= 0:
-            return False
-
-        if transaction.pending:
-            return False
-
-        # Minimum deposit threshold (configurable)
-        min_deposit = 10.00
-        if abs(transaction.amount) < min_deposit:
-            return False
-
-        # Check category for deposit-like transactions
-        deposit_categories = {
-            "Transfer",
-            "Payroll",
-            "Direct Deposit",
-            "Income",
-            "Dividend",
-        }
-        if any(cat in deposit_categories for cat in transaction.category):
-            return True
-
-        return False
+    # Deposit detection lives in app.services.deposit_classifier
 
 
 # Global service instance
@@ -0,0 +1,159 @@
+"""
+Template routing.
+
+Picks which split template auto-apply uses for a deposit. A user's active
+TemplateRoutingRules and templates are compiled once into an immutable
+TemplateRouter and cached, so routing a deposit is an in-memory lookup:
+
+- source patterns go into a token trie; walking it from each word of the
+  deposit source yields every rule whose pattern occurs in the source;
+- rules without a pattern are candidates for every deposit;
+- candidates are checked in priority order against their amount interval
+  (integer cents) and bank account, and the first that passes wins.
+
+Deposits no rule matches fall back to the user's oldest template.
+"""
+import re
+from collections.abc import Sequence
+from dataclasses import dataclass
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import template_router_cache
+from app.crud.crud_routing_rule import get_routing_rules_by_user
+from app.crud.crud_user import get_rules_version
+from app.models.routing_rule import TemplateRoutingRule
+from app.models.split_template import SplitTemplate
+from app.services.allocation import to_cents
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+# Trie node: word -> child node; _RULES holds the rules whose pattern ends here
+_RULES = ""
+
+
+def tokenize(text: str | None) -> list[str]:
+    """Lower-cased alphanumeric words; punctuation and spacing are ignored."""
+    return _WORD.findall(text.lower()) if text else []
+
+
+@dataclass(frozen=True, slots=True)
+class CompiledRule:
+    template_id: str
+    min_cents: int | None
+    max_cents: int | None
+    bank_account_id: str | None
+
+    def accepts(self, amount_cents: int, bank_account_id: str | None) -> bool:
+        return (
+            (self.min_cents is None or amount_cents >= self.min_cents)
+            and (self.max_cents is None or amount_cents <= self.max_cents)
+            and (self.bank_account_id is None or self.bank_account_id == bank_account_id)
+        )
+
+
+@dataclass(frozen=True)
+class TemplateRouter:
+    """
+    A user's routing rules compiled for lookup.
+
+    `rules` is in priority order, so candidates are compared by index. The
+    trie is built once and never mutated after compile().
+    """
+    rules: tuple[CompiledRule, ...]
+    trie: dict
+    unconditional: tuple[int, ...]  # rules with no source pattern
+    template_names: dict[str, str]
+    default_template_id: str | None
+
+    @classmethod
+    def compile(
+        cls,
+        rules: Sequence[TemplateRoutingRule],
+        templates: Sequence[tuple[str, str]],
+    ) -> "TemplateRouter":
+        """
+        Args:
+            rules: active rules in priority order
+            templates: (id, name) pairs, oldest first
+        """
+        template_names = dict(templates)
+        compiled: list[CompiledRule] = []
+        trie: dict = {}
+        unconditional: list[int] = []
+        for rule in rules:
+            if rule.template_id not in template_names:
+                continue
+            index = len(compiled)
+            compiled.append(CompiledRule(
+                template_id=rule.template_id,
+                min_cents=to_cents(rule.min_amount) if rule.min_amount is not None else None,
+                max_cents=to_cents(rule.max_amount) if rule.max_amount is not None else None,
+                bank_account_id=rule.bank_account_id,
+            ))
+            words = tokenize(rule.source_pattern)
+            if not words:
+                unconditional.append(index)
+                continue
+            node = trie
+            for word in words:
+                node = node.setdefault(word, {})
+            node.setdefault(_RULES, []).append(index)
+
+        return cls(
+            rules=tuple(compiled),
+            trie=trie,
+            unconditional=tuple(unconditional),
+            template_names=template_names,
+            default_template_id=templates[0][0] if templates else None,
+        )
+
+    def _source_matches(self, source: str | None) -> set[int]:
+        """Indexes of rules whose pattern occurs as a run of words in source."""
+        words = tokenize(source)
+        found: set[int] = set()
+        for start in range(len(words)):
+            node = self.trie
+            for word in words[start:]:
+                node = node.get(word)
+                if node is None:
+                    break
+                found.update(node.get(_RULES, ()))
+        return found
+
+    def route(
+        self, source: str | None, amount_cents: int, bank_account_id: str | None
+    ) -> str | None:
+        """Template id for a deposit, or None if the user has no templates."""
+        candidates = self._source_matches(source) if self.trie else set()
+        candidates.update(self.unconditional)
+        for index in sorted(candidates):
+            if self.rules[index].accepts(amount_cents, bank_account_id):
+                return self.rules[index].template_id
+        return self.default_template_id
+
+
+async def load_template_router(
+    session: AsyncSession, user_id: str, rules_version: int | None = None
+) -> TemplateRouter:
+    """
+    Compiled router for a user's active rules and templates.
+
+    Cached under the user's rules_version, which rule and template crud bump;
+    pass it if already read, else it is read here.
+    """
+    if rules_version is None:
+        rules_version = await get_rules_version(session, user_id)
+    key = (user_id, rules_version)
+    router = template_router_cache.get(key)
+    if router is None:
+        rules = await get_routing_rules_by_user(session, user_id, active_only=True)
+        result = await session.execute(
+            select(SplitTemplate.id, SplitTemplate.name)
+            .where(SplitTemplate.user_id == user_id)
+            .order_by(SplitTemplate.created_at)
+        )
+        router = TemplateRouter.compile(rules, [tuple(row) for row in result.all()])
+        template_router_cache.set(key, router)
+    return router  # type: ignore[return-value]
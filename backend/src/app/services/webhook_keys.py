@@ -0,0 +1,100 @@
+"""
+Plaid webhook verification keys.
+
+Plaid signs webhooks with ES256 keys identified by `kid` and rotates them by
+issuing new kids. Keys are fetched from /webhook_verification_key/get once,
+parsed into jose key objects and cached per kid for
+settings.plaid_webhook_key_ttl_seconds, so repeat webhooks verify entirely
+in memory. After the TTL a key is fetched again, which is how a key Plaid
+has since expired (expired_at set) stops being accepted.
+
+Concurrent misses for one kid share a single fetch.
+"""
+import asyncio
+import logging
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from jose import jwk
+from jose.backends.base import Key
+from plaid.model.webhook_verification_key_get_request import (
+    WebhookVerificationKeyGetRequest,
+)
+
+from app.core.cache import LRUCache
+from app.core.config import settings
+from app.services.plaid import plaid_service
+
+logger = logging.getLogger(__name__)
+
+
+class WebhookKeyError(Exception):
+    """The key for a kid could not be fetched or parsed, or Plaid reports it expired."""
+
+
+class WebhookKeyCache:
+    def __init__(
+        self,
+        fetch: Callable[[str], Awaitable[Any]],
+        ttl_seconds: float,
+        maxsize: int = 32,
+    ):
+        """
+        Args:
+            fetch: kid -> Plaid JWKPublicKey (kty, crv, x, y, alg, expired_at)
+        """
+        self.fetch = fetch
+        self._keys: LRUCache[str, Key] = LRUCache(maxsize=maxsize, ttl_seconds=ttl_seconds)
+        self._inflight: dict[str, asyncio.Task[Key]] = {}
+
+    async def get(self, kid: str) -> Key:
+        """Parsed public key for kid; raises WebhookKeyError."""
+        key = self._keys.get(kid)
+        if key is not None:
+            return key
+        task = self._inflight.get(kid)
+        if task is None:
+            task = asyncio.create_task(self._load(kid))
+            self._inflight[kid] = task
+            task.add_done_callback(lambda _: self._inflight.pop(kid, None))
+        # shield: one cancelled webhook request must not cancel the others' fetch
+        return await asyncio.shield(task)
+
+    async def _load(self, kid: str) -> Key:
+        try:
+            plaid_key = await self.fetch(kid)
+        except Exception as e:
+            raise WebhookKeyError(f"Could not fetch Plaid verification key {kid}") from e
+        if getattr(plaid_key, "expired_at", None) is not None:
+            raise WebhookKeyError(f"Plaid verification key {kid} has expired")
+        # jose raises JWKError, ValueError or TypeError depending on what's wrong
+        try:
+            key = jwk.construct(
+                {"kty": plaid_key.kty, "crv": plaid_key.crv, "x": plaid_key.x, "y": plaid_key.y},
+                algorithm="ES256",
+            )
+        except Exception as e:
+            raise WebhookKeyError(f"Plaid verification key {kid} is malformed") from e
+        self._keys.set(kid, key)
+        logger.info("Cached Plaid webhook verification key %s", kid)
+        return key
+
+    def clear(self) -> None:
+        self._keys.clear()
+
+
+async def _fetch_plaid_key(kid: str) -> Any:
+    client = plaid_service.client
+    if client is None:
+        raise RuntimeError("Plaid client not initialized")
+    response = await asyncio.to_thread(
+        client.webhook_verification_key_get,
+        WebhookVerificationKeyGetRequest(key_id=kid),
+    )
+    return response.key
+
+
+plaid_webhook_keys = WebhookKeyCache(
+    fetch=_fetch_plaid_key,
+    ttl_seconds=settings.plaid_webhook_key_ttl_seconds,
+)
@@ -0,0 +1,120 @@
+"""
+Sync job worker.
+
+Runs the Plaid syncs that the webhook route queues in sync_jobs:
+
+    PYTHONPATH=src python -m app.worker [--concurrency 4]
+
+Each of `concurrency` slots claims one job at a time and runs it; claiming
+never hands out a job for an item that is already syncing, in this worker or
+another. When the queue is empty a slot polls every
+settings.worker_poll_interval_seconds. Only needs Postgres, so it runs the
+same locally (docker compose) as in production. SIGINT/SIGTERM let running
+jobs finish before exiting.
+"""
+import argparse
+import asyncio
+import logging
+import signal
+
+from app.core.config import settings
+from app.core.database import async_session_maker, engine
+from app.core.metrics import metrics
+from app.models.sync_job import SyncJob
+from app.services.deposit_detection import sync_new_transactions
+from app.services.job_queue import claim_jobs, complete_job, fail_job, reap_jobs
+
+logger = logging.getLogger(__name__)
+
+REAP_INTERVAL_SECONDS = 60
+
+
+async def process_job(job: SyncJob) -> None:
+    """Run one claimed job and record the outcome."""
+    async with async_session_maker() as db:
+        try:
+            await sync_new_transactions(db, job.item_id)
+            metrics.incr("syncs_executed")
+            await complete_job(db, job.id)
+            await db.commit()
+            return
+        except Exception as e:
+            await db.rollback()
+            logger.exception("Sync job %s for item_id=%s failed", job.id, job.item_id)
+            metrics.incr("sync_jobs_failed")
+            error = repr(e)
+
+    async with async_session_maker() as db:
+        await fail_job(db, job, error)
+        await db.commit()
+
+
+async def _claim_one() -> SyncJob | None:
+    async with async_session_maker() as db:
+        jobs = await claim_jobs(db, limit=1)
+        await db.commit()
+    return jobs[0] if jobs else None
+
+
+async def _slot(stop: asyncio.Event, poll_interval: float) -> None:
+    while not stop.is_set():
+        try:
+            job = await _claim_one()
+        except Exception:
+            logger.exception("Failed to claim a sync job")
+            job = None
+        if job is None:
+            try:
+                await asyncio.wait_for(stop.wait(), poll_interval)
+            except TimeoutError:
+                pass
+            continue
+        await process_job(job)
+
+
+async def _reaper(stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        try:
+            async with async_session_maker() as db:
+                reaped = await reap_jobs(db)
+                await db.commit()
+            if reaped:
+                logger.warning("Requeued %d stuck sync jobs", reaped)
+            logger.info("Sync worker counters: %s", metrics.snapshot())
+        except Exception:
+            logger.exception("Sync job reaper failed")
+        try:
+            await asyncio.wait_for(stop.wait(), REAP_INTERVAL_SECONDS)
+        except TimeoutError:
+            pass
+
+
+async def run_worker(concurrency: int, poll_interval: float, stop: asyncio.Event | None = None) -> None:
+    stop = stop or asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    logger.info("Sync worker started: concurrency=%d, poll every %.1fs", concurrency, poll_interval)
+    try:
+        await asyncio.gather(
+            _reaper(stop),
+            *(_slot(stop, poll_interval) for _ in range(concurrency)),
+        )
+    finally:
+        await engine.dispose()
+    logger.info("Sync worker stopped")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run queued Plaid sync jobs")
+    parser.add_argument("--concurrency", type=int, default=settings.worker_concurrency)
+    parser.add_argument("--poll-interval", type=float, default=settings.worker_poll_interval_seconds)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.DEBUG if settings.debug else logging.INFO)
+    asyncio.run(run_worker(args.concurrency, args.poll_interval))
+
+
+if __name__ == "__main__":
+    main()
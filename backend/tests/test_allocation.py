@@ -9,10 +9,18 @@ Buckets not summing to 100% will have the remainder added to the first bucket
 complete allocation plan.
 """
 
+import random
+
+import numpy as np
 import pytest
 
 from app.models.bucket import BucketType
-from app.services.allocation import calculate_allocation
+from app.core.cache import LRUCache
+from app.services.allocation import (
+    AllocationProgram,
+    calculate_allocation,
+    calculate_allocation_batch,
+)
 from tests.conftest import make_bucket
 
 
@@ -166,3 +174,202 @@ def test_rounding_adjustment_applied_on_large_error():
     assert sum(result.values()) == pytest.approx(100.0, abs=0.001)
     # First bucket absorbs the $1 remainder (33 + 1 = 34)
     assert result["a"] == 34.0
+
+
+# ── Integer-cents engine ──────────────────────────────────────────────────────
+
+def test_largest_remainder_sums_exactly():
+    """Three thirds of $100 — the spare cent goes to one bucket, not drift."""
+    buckets = [
+        make_bucket("a", BucketType.PERCENTAGE, 33.33),
+        make_bucket("b", BucketType.PERCENTAGE, 33.33),
+        make_bucket("c", BucketType.PERCENTAGE, 33.34),
+    ]
+    result = calculate_allocation(100.0, buckets)
+    assert result == {"a": 33.33, "b": 33.33, "c": 33.34}
+
+
+def test_largest_remainder_breaks_ties_by_bucket_order():
+    buckets = [
+        make_bucket("a", BucketType.PERCENTAGE, 50),
+        make_bucket("b", BucketType.PERCENTAGE, 50),
+    ]
+    result = calculate_allocation(0.03, buckets)
+    assert result == {"a": 0.02, "b": 0.01}
+
+
+def test_largest_remainder_favours_largest_fraction():
+    # 20% / 80% of 7c = 1.4c / 5.6c → the spare cent goes to the 0.6 remainder
+    result = AllocationProgram.compile([], [("small", 2000), ("big", 8000)]).run(7)
+    assert result == {"small": 1, "big": 6}
+
+
+def test_program_run_always_sums_to_total():
+    program = AllocationProgram.compile(
+        [("fixed", 37)], [("a", 1234), ("b", 4321), ("c", 4445)]
+    )
+    for total in range(1, 500):
+        assert sum(program.run(total).values()) == total
+
+
+# ── Batch path ────────────────────────────────────────────────────────────────
+
+def test_batch_matches_scalar_bit_for_bit():
+    rng = random.Random(97)
+    for _ in range(50):
+        buckets = [
+            make_bucket(
+                f"b{i}",
+                rng.choice([BucketType.FIXED, BucketType.PERCENTAGE]),
+                round(rng.uniform(0, 80), 2),
+            )
+            for i in range(rng.randint(1, 8))
+        ]
+        amounts = [round(rng.uniform(0, 5000), 2) for _ in range(40)] + [0.0, 0.01]
+        matrix = calculate_allocation_batch(amounts, buckets)
+        floats = matrix.amounts
+        for i, amount in enumerate(amounts):
+            expected = calculate_allocation(amount, buckets)
+            assert matrix.row(i) == expected
+            for j, bucket_id in enumerate(matrix.bucket_ids):
+                assert floats[i, j] == expected.get(bucket_id, 0.0)
+
+
+def test_batch_columns_are_fixed_then_percentage():
+    buckets = [
+        make_bucket("pct", BucketType.PERCENTAGE, 100),
+        make_bucket("fixed", BucketType.FIXED, 200),
+    ]
+    matrix = calculate_allocation_batch(np.array([1000.0, 150.0]), buckets)
+    assert matrix.bucket_ids == ("fixed", "pct")
+    assert matrix.cents.tolist() == [[20000, 80000], [15000, 0]]
+
+
+def test_batch_empty_inputs():
+    assert calculate_allocation_batch([], [make_bucket("a", BucketType.PERCENTAGE, 100)]).cents.shape == (0, 1)
+    assert calculate_allocation_batch([10.0], []).cents.shape == (1, 0)
+
+
+# ── Compiled programs ─────────────────────────────────────────────────────────
+
+def test_program_precomputes_prefix_sums_and_denominator():
+    program = AllocationProgram.compile(
+        [("rent", 120000), ("tithe", 20000)], [("a", 6000), ("b", 6000)]
+    )
+    assert program.fixed_prefix == (0, 120000)
+    assert program.fixed_total == 140000
+    assert program.weight_total == 12000
+    assert program.denominator == 12000
+    assert program.bucket_ids == ("rent", "tithe", "a", "b")
+
+
+def test_program_is_reusable_across_deposits():
+    buckets = [
+        make_bucket("tithe", BucketType.FIXED, 120),
+        make_bucket("savings", BucketType.PERCENTAGE, 30),
+        make_bucket("rest", BucketType.PERCENTAGE, 70),
+    ]
+    program = AllocationProgram.from_buckets(buckets)
+    for amount in (0.01, 50.0, 120.0, 1200.0, 3333.33):
+        assert program.allocate(amount) == calculate_allocation(amount, buckets)
+
+
+def test_empty_program():
+    program = AllocationProgram.from_buckets([])
+    assert program.is_empty
+    assert program.run(1000) == {}
+
+
+def test_lru_cache_evicts_least_recently_used():
+    cache: LRUCache[str, int] = LRUCache(maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # "b" is now least recently used
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+
+
+def test_lru_cache_ttl_expires(monkeypatch):
+    import app.core.cache as cache_module
+
+    now = [1000.0]
+    monkeypatch.setattr(cache_module.time, "monotonic", lambda: now[0])
+    cache: LRUCache[str, int] = LRUCache(maxsize=10, ttl_seconds=5)
+    cache.set("a", 1)
+    now[0] += 4
+    assert cache.get("a") == 1
+    now[0] += 2
+    assert cache.get("a") is None
+
+
+# ── Target caps ───────────────────────────────────────────────────────────────
+
+def _capped_bucket(id, bucket_type, value, target=None, balance=0):
+    bucket = make_bucket(id, bucket_type, value)
+    bucket.target_amount = target
+    bucket.current_balance = balance
+    return bucket
+
+
+def test_capped_program_without_binding_targets_matches_uncapped():
+    buckets = [
+        _capped_bucket("tithe", BucketType.FIXED, 100, target=10_000),
+        _capped_bucket("save", BucketType.PERCENTAGE, 33.33, target=5_000, balance=100),
+        _capped_bucket("rest", BucketType.PERCENTAGE, 66.67),
+    ]
+    for amount in (0.01, 99.99, 1000.0, 1234.56):
+        assert (
+            AllocationProgram.from_buckets(buckets, respect_targets=True).allocate(amount)
+            == calculate_allocation(amount, buckets)
+        )
+
+
+def test_full_bucket_spills_share_to_remaining_percentages():
+    buckets = [
+        _capped_bucket("vacation", BucketType.PERCENTAGE, 50, target=500, balance=500),
+        _capped_bucket("save", BucketType.PERCENTAGE, 25),
+        _capped_bucket("spend", BucketType.PERCENTAGE, 25),
+    ]
+    program = AllocationProgram.from_buckets(buckets, respect_targets=True)
+    assert program.allocate(100) == {"save": 50.0, "spend": 50.0}
+
+
+def test_partially_full_bucket_is_topped_up_to_target():
+    buckets = [
+        _capped_bucket("vacation", BucketType.PERCENTAGE, 50, target=500, balance=490),
+        _capped_bucket("save", BucketType.PERCENTAGE, 50),
+    ]
+    program = AllocationProgram.from_buckets(buckets, respect_targets=True)
+    assert program.allocate(100) == {"vacation": 10.0, "save": 90.0}
+
+
+def test_fixed_bucket_capped_at_headroom():
+    buckets = [
+        _capped_bucket("rent", BucketType.FIXED, 1200, target=1500, balance=1000),
+        _capped_bucket("save", BucketType.PERCENTAGE, 100),
+    ]
+    program = AllocationProgram.from_buckets(buckets, respect_targets=True)
+    assert program.allocate(2000) == {"rent": 500.0, "save": 1500.0}
+
+
+def test_money_no_bucket_can_take_stays_unallocated():
+    buckets = [
+        _capped_bucket("a", BucketType.PERCENTAGE, 60, target=20),
+        _capped_bucket("b", BucketType.PERCENTAGE, 40, target=30, balance=25),
+    ]
+    program = AllocationProgram.from_buckets(buckets, respect_targets=True)
+    assert program.allocate(100) == {"a": 20.0, "b": 5.0}
+
+
+def test_capped_batch_matches_scalar():
+    rng = random.Random(7)
+    buckets = [
+        _capped_bucket(f"b{i}", BucketType.PERCENTAGE, 10, target=rng.choice([None, 50, 200]))
+        for i in range(10)
+    ]
+    program = AllocationProgram.from_buckets(buckets, respect_targets=True)
+    amounts = [rng.randint(1, 300_000) / 100 for _ in range(200)]
+    matrix = program.allocate_batch(amounts)
+    for i, amount in enumerate(amounts):
+        assert matrix.row(i) == program.allocate(amount)
@@ -0,0 +1,214 @@
+"""
+Differential harness for the allocation core.
+
+Preview (bucket programs, OverflowPolicy.CAP) and template auto-apply
+(template programs, OverflowPolicy.REJECT) share one AllocationProgram. These
+tests pin every entry point to an independent exact-fraction reference so a
+change to the hot path cannot silently make them disagree. Template programs
+take percentages of the whole deposit (percent_of_total), bucket programs of
+what the fixed buckets leave; both are checked.
+"""
+
+import math
+import random
+from dataclasses import replace
+from fractions import Fraction
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from app.models.bucket import BucketType
+from app.services.allocation import (
+    PERCENT_SCALE,
+    AllocationOverflowError,
+    AllocationProgram,
+    OverflowPolicy,
+)
+from tests.conftest import make_bucket
+
+
+def reference_allocation(
+    total: int,
+    fixed: list[tuple[str, int]],
+    percentages: list[tuple[str, int]],
+    policy: OverflowPolicy,
+    percent_of_total: bool = False,
+) -> dict[str, int] | None:
+    """Spec-level allocation with exact fractions. None means rejected."""
+    fixed_total = sum(c for _, c in fixed)
+    weight_total = sum(w for _, w in percentages)
+    scale = max(weight_total, PERCENT_SCALE)
+    if policy is OverflowPolicy.REJECT and (
+        fixed_total > total or weight_total > PERCENT_SCALE or (
+            percent_of_total and total > 0
+            and fixed_total + int(Fraction(total * weight_total, scale)) > total
+        )
+    ):
+        return None
+
+    result: dict[str, int] = {}
+    remaining = total
+    for bucket_id, cents in fixed:
+        take = max(0, min(cents, remaining))
+        if take:
+            result[bucket_id] = take
+            remaining -= take
+
+    if weight_total and remaining > 0:
+        base = remaining
+        if percent_of_total:
+            # Whole deposit, or the largest base whose floored pool fits what is left
+            base = min(total, math.ceil(Fraction((remaining + 1) * scale, weight_total)) - 1)
+        exact = [(bid, Fraction(base * w, scale)) for bid, w in percentages]
+        pool = int(sum(share for _, share in exact))  # floor of exact total
+        floors = {bid: int(share) for bid, share in exact}
+        spare = pool - sum(floors.values())
+        ranked = sorted(
+            range(len(exact)), key=lambda i: (-(exact[i][1] - floors[exact[i][0]]), i)
+        )
+        for i in ranked[:spare]:
+            floors[exact[i][0]] += 1
+        for bid, _ in exact:
+            if floors[bid]:
+                result[bid] = floors[bid]
+        remaining -= pool
+
+    if policy is OverflowPolicy.CAP and result and remaining > 0:
+        first = next(iter(result))
+        result[first] += remaining
+    return result
+
+
+def random_config(rng: random.Random):
+    fixed = [(f"f{i}", rng.choice([0, rng.randint(1, 50_000)])) for i in range(rng.randint(0, 4))]
+    percentages = [(f"p{i}", rng.randint(0, 6000)) for i in range(rng.randint(0, 8))]
+    return fixed, percentages
+
+
+def run_or_none(program: AllocationProgram, total: int, policy: OverflowPolicy):
+    try:
+        return program.run(total, policy)
+    except AllocationOverflowError:
+        return None
+
+
+@pytest.mark.parametrize("percent_of_total", [False, True])
+@pytest.mark.parametrize("policy", list(OverflowPolicy))
+def test_scalar_matches_reference(policy, percent_of_total):
+    rng = random.Random(f"scalar-{policy.value}-{percent_of_total}")
+    for _ in range(300):
+        fixed, percentages = random_config(rng)
+        program = AllocationProgram.compile(fixed, percentages, percent_of_total=percent_of_total)
+        for total in [rng.randint(0, 200_000) for _ in range(10)] + [0, 1, 3]:
+            assert run_or_none(program, total, policy) == reference_allocation(
+                total, fixed, percentages, policy, percent_of_total
+            )
+
+
+@pytest.mark.parametrize("percent_of_total", [False, True])
+@pytest.mark.parametrize("policy", list(OverflowPolicy))
+def test_batch_matches_scalar(policy, percent_of_total):
+    rng = random.Random(f"batch-{policy.value}-{percent_of_total}")
+    for _ in range(100):
+        fixed, percentages = random_config(rng)
+        program = AllocationProgram.compile(fixed, percentages, percent_of_total=percent_of_total)
+        totals = np.array([rng.randint(0, 200_000) for _ in range(30)], dtype=np.int64)
+        matrix = program.run_batch(totals, policy)
+        for i, total in enumerate(totals.tolist()):
+            expected = run_or_none(program, total, policy)
+            assert bool(matrix.rejected[i]) == (expected is None)
+            row = {
+                bid: int(c) for bid, c in zip(matrix.bucket_ids, matrix.cents[i]) if c
+            }
+            assert row == (expected or {})
+
+
+def test_bucket_and_template_programs_agree():
+    """Buckets and templates compile alike, bar the template's percentage base."""
+    rng = random.Random("bucket-vs-template")
+    for _ in range(100):
+        buckets, items = [], []
+        for i in range(rng.randint(1, 8)):
+            kind = rng.choice([BucketType.FIXED, BucketType.PERCENTAGE])
+            value = round(rng.uniform(0, 60), 2)
+            buckets.append(make_bucket(f"b{i}", kind, value))
+            items.append(SimpleNamespace(
+                bucket_id=f"b{i}", allocation_type=kind.value, allocation_value=value
+            ))
+        from_buckets = AllocationProgram.from_buckets(buckets)
+        from_template = AllocationProgram.from_template(SimpleNamespace(items=items))
+        assert replace(from_buckets, percent_of_total=True) == from_template
+
+
+def test_policies_differ_only_on_overflow():
+    program = AllocationProgram.compile([("rent", 50_000)], [("a", 6000), ("b", 6000)])
+    # Percentages over 100%: CAP normalizes, REJECT refuses
+    assert program.run(100_000, OverflowPolicy.CAP) == {"rent": 50_000, "a": 25_000, "b": 25_000}
+    with pytest.raises(AllocationOverflowError):
+        program.run(100_000, OverflowPolicy.REJECT)
+
+    program = AllocationProgram.compile([], [("a", 2500)])
+    # Under 100%: CAP hands the rest to the first bucket, REJECT leaves it
+    assert program.run(10_000, OverflowPolicy.CAP) == {"a": 10_000}
+    assert program.run(10_000, OverflowPolicy.REJECT) == {"a": 2500}
+
+
+def test_template_percentages_are_of_the_whole_deposit():
+    items = [
+        SimpleNamespace(bucket_id="rent", allocation_type="fixed", allocation_value=500),
+        SimpleNamespace(bucket_id="save", allocation_type="percentage", allocation_value=10),
+    ]
+    program = AllocationProgram.from_template(SimpleNamespace(items=items))
+    assert program.run(100_000, OverflowPolicy.REJECT) == {"rent": 50_000, "save": 10_000}
+
+    items[1].allocation_value = 60
+    program = AllocationProgram.from_template(SimpleNamespace(items=items))
+    # $500 + 60% of $1000 does not fit: REJECT refuses, CAP shrinks the percentages
+    with pytest.raises(AllocationOverflowError):
+        program.run(100_000, OverflowPolicy.REJECT)
+    assert program.run(100_000, OverflowPolicy.CAP) == {"rent": 50_000, "save": 50_000}
+
+
+# ── Target caps ───────────────────────────────────────────────────────────────
+
+def reference_water_fill(
+    pool: Fraction, percentages: list[tuple[str, int]], caps: dict[str, int]
+) -> dict[str, Fraction]:
+    """Exact capped split by naive re-looping: saturate, renormalize, repeat."""
+    exact: dict[str, Fraction] = {}
+    active = [(bid, w) for bid, w in percentages if w > 0]
+    left = pool
+    while active:
+        weight = sum(w for _, w in active)
+        over = [(bid, w) for bid, w in active if bid in caps and caps[bid] < left * w / weight]
+        if not over:
+            for bid, w in active:
+                exact[bid] = left * w / weight
+            break
+        for bid, w in over:
+            exact[bid] = Fraction(caps[bid])
+            left -= caps[bid]
+        active = [item for item in active if item not in over]
+    return exact
+
+
+@pytest.mark.parametrize("seed", range(300))
+def test_water_fill_matches_iterative_reference(seed):
+    rng = random.Random(seed)
+    percentages = [(f"p{i}", rng.randint(0, 800)) for i in range(rng.randint(1, 12))]
+    caps = {bid: rng.randint(0, 40_000) for bid, _ in percentages if rng.random() < 0.6}
+    total = rng.randint(0, 500_000)
+    program = AllocationProgram.compile([], percentages, headroom=caps)
+
+    result = program.run(total, OverflowPolicy.REJECT)
+    pool = total * program.weight_total // program.denominator
+    exact = reference_water_fill(
+        Fraction(total * program.weight_total, program.denominator), percentages, caps
+    )
+
+    for bid, share in result.items():
+        assert share <= caps.get(bid, share)
+    for bid, value in exact.items():
+        assert abs(result.get(bid, 0) - value) < 1
+    assert sum(result.values()) == min(pool, int(sum(exact.values())))
@@ -0,0 +1,152 @@
+"""
+Property-based invariants for the allocation engine.
+
+Whatever the bucket set or amount, an allocation must sum to the deposit
+(or stay within it when money may be left over), never contain a negative or
+zero share, and list buckets in a deterministic order. Pair with
+benchmarks/bench_suite.py when changing the hot path.
+"""
+
+from dataclasses import replace
+from types import SimpleNamespace
+
+import numpy as np
+from hypothesis import given, settings
+from hypothesis import strategies as st
+
+from app.models.bucket import BucketType
+from app.services.allocation import (
+    PERCENT_SCALE,
+    AllocationOverflowError,
+    AllocationProgram,
+    OverflowPolicy,
+    calculate_allocation,
+    to_cents,
+)
+from tests.conftest import make_bucket
+
+cents = st.integers(min_value=0, max_value=100_000_000)  # up to $1M
+fixed_items = st.lists(st.integers(min_value=0, max_value=500_000), max_size=6)
+weight_items = st.lists(st.integers(min_value=0, max_value=PERCENT_SCALE), max_size=12)
+
+
+@st.composite
+def programs(draw, with_headroom: bool = False) -> AllocationProgram:
+    fixed = [(f"f{i}", c) for i, c in enumerate(draw(fixed_items))]
+    percentages = [(f"p{i}", w) for i, w in enumerate(draw(weight_items))]
+    headroom = None
+    if with_headroom:
+        ids = [bucket_id for bucket_id, _ in fixed + percentages]
+        capped = draw(st.lists(st.sampled_from(ids), unique=True)) if ids else []
+        headroom = {bucket_id: draw(cents) // 100 for bucket_id in capped}
+    return AllocationProgram.compile(fixed, percentages, headroom)
+
+
+def assert_well_formed(program: AllocationProgram, result: dict[str, int]) -> None:
+    """No zero or negative shares; keys in program (fixed, then percentage) order."""
+    assert all(share > 0 for share in result.values())
+    order = {bucket_id: i for i, bucket_id in enumerate(program.bucket_ids)}
+    positions = [order[bucket_id] for bucket_id in result]
+    assert positions == sorted(positions)
+
+
+@given(programs(), cents)
+def test_cap_allocates_exactly_the_deposit(program, total):
+    result = program.run(total, OverflowPolicy.CAP)
+    assert_well_formed(program, result)
+    if result:
+        assert sum(result.values()) == total
+
+
+@given(programs(), cents)
+def test_reject_never_exceeds_the_deposit(program, total):
+    try:
+        result = program.run(total, OverflowPolicy.REJECT)
+    except AllocationOverflowError:
+        assert program.fixed_total > total or program.weight_total > PERCENT_SCALE
+        return
+    assert_well_formed(program, result)
+    assert sum(result.values()) <= total
+    if program.weight_total == PERCENT_SCALE and total > 0:
+        assert sum(result.values()) == total
+
+
+@given(programs(), cents)
+def test_reject_gives_fixed_buckets_exactly_their_amount(program, total):
+    # Under CAP the slack may land on a fixed bucket; REJECT never tops up
+    try:
+        result = program.run(total, OverflowPolicy.REJECT)
+    except AllocationOverflowError:
+        return
+    for bucket_id, configured in zip(program.fixed_ids, program.fixed_cents):
+        assert result.get(bucket_id, 0) == configured
+
+
+@given(programs(with_headroom=True), cents)
+def test_capped_buckets_stay_within_headroom(program, total):
+    for policy in OverflowPolicy:
+        try:
+            result = program.run(total, policy)
+        except AllocationOverflowError:
+            continue
+        assert_well_formed(program, result)
+        assert sum(result.values()) <= total
+        for bucket_id, cap in zip(program.percentage_ids, program.caps):
+            if cap is not None:
+                assert result.get(bucket_id, 0) <= cap
+
+
+@given(programs(), cents)
+def test_allocation_is_deterministic(program, total):
+    first = program.run(total)
+    rebuilt = AllocationProgram.compile(
+        list(zip(program.fixed_ids, program.fixed_cents)),
+        list(zip(program.percentage_ids, program.weights)),
+    )
+    second = rebuilt.run(total)
+    assert list(first.items()) == list(second.items())
+
+
+@settings(max_examples=50)
+@given(programs(), st.lists(cents, min_size=1, max_size=50))
+def test_batch_rows_equal_scalar_runs(program, totals):
+    matrix = program.run_batch(np.array(totals, dtype=np.int64))
+    bucket_ids = program.bucket_ids
+    for i, total in enumerate(totals):
+        row = {b: int(c) for b, c in zip(bucket_ids, matrix.cents[i]) if c}
+        assert list(row.items()) == list(program.run(total).items())
+
+
+@given(
+    st.lists(
+        st.tuples(
+            st.sampled_from([BucketType.FIXED, BucketType.PERCENTAGE]),
+            st.decimals(min_value=0, max_value=5000, places=2),
+        ),
+        min_size=1,
+        max_size=10,
+    ),
+    st.decimals(min_value="0.01", max_value=1_000_000, places=2),
+)
+def test_calculate_allocation_sums_to_amount_in_cents(specs, amount):
+    buckets = [
+        make_bucket(f"b{i}", bucket_type, float(value))
+        for i, (bucket_type, value) in enumerate(specs)
+    ]
+    result = calculate_allocation(float(amount), buckets)
+    assert all(share > 0 for share in result.values())
+    if result:
+        assert sum(to_cents(share) for share in result.values()) == to_cents(amount)
+
+
+@given(programs())
+def test_template_and_bucket_compilation_agree(program):
+    items = [
+        SimpleNamespace(bucket_id=b, allocation_type="fixed", allocation_value=c / 100)
+        for b, c in zip(program.fixed_ids, program.fixed_cents)
+    ] + [
+        SimpleNamespace(bucket_id=b, allocation_type="percentage", allocation_value=w / 100)
+        for b, w in zip(program.percentage_ids, program.weights)
+    ]
+    from_template = AllocationProgram.from_template(SimpleNamespace(items=items))
+    assert from_template == replace(program, percent_of_total=True)
@@ -32,6 +32,8 @@ def test_health_check(client):
     "/api/v1/buckets",
     "/api/v1/deposits",
     "/api/v1/users/me",
+    "/api/v1/routing-rules",
+    "/api/v1/deposit-rules",
 ])
 def test_protected_routes_require_auth(client, path):
     response = client.get(path)
@@ -50,6 +52,11 @@ def test_deposits_post_requires_auth(client):
     assert response.status_code in (401, 403, 422)
 
 
+def test_batch_preview_requires_auth(client):
+    response = client.post("/api/v1/split-plans/preview", json={"all_pending": True})
+    assert response.status_code in (401, 403, 422)
+
+
 # ── Invalid token returns 401 ─────────────────────────────────────────────────
 
 def test_invalid_bearer_token_rejected(client):
@@ -75,3 +82,26 @@ def test_openapi_includes_core_routes(client):
     paths = response.json()["paths"]
     assert any("buckets" in path for path in paths)
     assert any("deposits" in path for path in paths)
+
+
+# ── Request validation ────────────────────────────────────────────────────────
+
+@pytest.mark.parametrize("field", ["template_id", "priority", "is_active"])
+def test_routing_rule_update_rejects_null_for_required_columns(field):
+    from pydantic import ValidationError
+
+    from app.schemas.routing_rule import RoutingRuleUpdate
+
+    with pytest.raises(ValidationError, match="may be omitted but not null"):
+        RoutingRuleUpdate.model_validate({field: None})
+    # Omitted fields and nullable ones are still fine
+    assert RoutingRuleUpdate.model_validate({"source_pattern": None}).model_dump(
+        exclude_unset=True
+    ) == {"source_pattern": None}
+
+
+def test_deposit_rules_update_treats_null_lists_as_empty():
+    from app.schemas.deposit_rule import DepositRulesUpdate
+
+    update = DepositRulesUpdate.model_validate({"allow_categories": None, "min_amount": None})
+    assert update.model_dump(exclude_unset=True) == {"allow_categories": [], "min_amount": None}
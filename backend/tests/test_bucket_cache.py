@@ -0,0 +1,95 @@
+"""
+Tests for the versioned bucket snapshot cache.
+
+Redis is replaced by a small in-memory fake; no server is needed.
+"""
+
+from datetime import datetime, timezone
+
+import pytest
+import redis.asyncio as redis
+
+from app.core.bucket_cache import BucketSnapshotCache
+from app.models.bucket import BucketType
+from app.schemas.bucket import BucketResponse
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data: dict[str, bytes] = {}
+        self.down = False
+
+    def _check(self):
+        if self.down:
+            raise redis.ConnectionError("down")
+
+    async def get(self, key):
+        self._check()
+        return self.data.get(key)
+
+    async def set(self, key, value, ex=None):
+        self._check()
+        self.data[key] = value if isinstance(value, bytes) else str(value).encode()
+
+    async def incr(self, key):
+        self._check()
+        value = int(self.data.get(key, b"0")) + 1
+        self.data[key] = str(value).encode()
+        return value
+
+
+def make_snapshot(*names: str) -> tuple[BucketResponse, ...]:
+    now = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    return tuple(
+        BucketResponse(
+            id=f"id-{name}",
+            user_id="u1",
+            name=name,
+            bucket_type=BucketType.PERCENTAGE,
+            allocation_value=50,
+            current_balance=0,
+            sort_order=i,
+            is_active=True,
+            created_at=now,
+            updated_at=now,
+        )
+        for i, name in enumerate(names)
+    )
+
+
+async def test_local_tier_hit_until_version_bump():
+    cache = BucketSnapshotCache(maxsize=10, ttl_seconds=60)
+    version = await cache.current_version("u1")
+    assert await cache.get("u1", version) is None
+
+    await cache.set("u1", version, make_snapshot("a"))
+    assert await cache.get("u1", await cache.current_version("u1")) == make_snapshot("a")
+
+    await cache.bump("u1")
+    assert await cache.get("u1", await cache.current_version("u1")) is None
+
+
+async def test_redis_tier_shares_snapshots_and_versions_across_workers():
+    shared = FakeRedis()
+    worker_a = BucketSnapshotCache(maxsize=10, ttl_seconds=60, redis_client=shared)
+    worker_b = BucketSnapshotCache(maxsize=10, ttl_seconds=60, redis_client=shared)
+
+    version = await worker_a.current_version("u1")
+    await worker_a.set("u1", version, make_snapshot("a", "b"))
+    assert await worker_b.get("u1", await worker_b.current_version("u1")) == make_snapshot("a", "b")
+
+    # A bump in one worker hides the snapshot from both, local tiers included
+    await worker_a.bump("u1")
+    assert await worker_b.get("u1", await worker_b.current_version("u1")) is None
+    assert await worker_a.get("u1", await worker_a.current_version("u1")) is None
+
+
+@pytest.mark.parametrize("method", ["current_version", "bump"])
+async def test_redis_outage_degrades_to_uncached(method):
+    shared = FakeRedis()
+    cache = BucketSnapshotCache(maxsize=10, ttl_seconds=60, redis_client=shared)
+    shared.down = True
+    if method == "current_version":
+        assert await cache.current_version("u1") is None
+    else:
+        await cache.bump("u1")  # logged, not raised
@@ -0,0 +1,110 @@
+"""
+Tests for the table-driven deposit classifier.
+"""
+
+import random
+from datetime import date
+from types import SimpleNamespace
+
+import pytest
+
+from app.services.deposit_classifier import DepositClassifier
+from app.services.plaid import PlaidTransaction
+
+
+def tx(
+    amount: float = -100.0,
+    category: list[str] | None = None,
+    merchant: str | None = None,
+    name: str = "ACH CREDIT",
+    pending: bool = False,
+    transaction_id: str = "t",
+) -> PlaidTransaction:
+    return PlaidTransaction(
+        transaction_id=transaction_id, account_id="acc", amount=amount,
+        date=date(2026, 1, 1), name=name, merchant_name=merchant,
+        category=["Payroll"] if category is None else category, pending=pending,
+    )
+
+
+def rules(**overrides) -> SimpleNamespace:
+    fields = dict(
+        min_amount=None, allow_categories=[], deny_categories=[],
+        allow_merchants=[], deny_merchants=[],
+    )
+    fields.update(overrides)
+    return SimpleNamespace(**fields)
+
+
+def legacy_is_deposit(transaction: PlaidTransaction) -> bool:
+    """PlaidService.is_deposit_transaction before the classifier (reference)."""
+    if transaction.amount >= 0 or transaction.pending:
+        return False
+    if abs(transaction.amount) < 10.00:
+        return False
+    deposit_categories = {"Transfer", "Payroll", "Direct Deposit", "Income", "Dividend"}
+    return any(cat in deposit_categories for cat in transaction.category)
+
+
+@pytest.mark.parametrize("transaction,expected", [
+    (tx(), True),
+    (tx(amount=100.0), False),               # debit
+    (tx(pending=True), False),
+    (tx(amount=-9.99), False),               # below $10
+    (tx(amount=-10.00), True),
+    (tx(category=["Food and Drink"]), False),
+    (tx(category=["Transfer", "Credit"]), True),
+])
+def test_defaults_match_previous_rules(transaction, expected):
+    assert DepositClassifier.compile().is_deposit(transaction) is expected
+
+
+def test_defaults_agree_with_previous_rules_on_random_transactions():
+    rng = random.Random(7)
+    categories = ["Payroll", "Transfer", "Food and Drink", "Income", "Shops", "Dividend"]
+    page = [
+        tx(
+            amount=round(rng.uniform(-500, 200), 2),
+            category=rng.sample(categories, rng.randint(0, 2)),
+            pending=rng.random() < 0.1,
+            transaction_id=str(i),
+        )
+        for i in range(2_000)
+    ]
+    assert DepositClassifier.compile().classify(page) == [t for t in page if legacy_is_deposit(t)]
+
+
+def test_user_threshold_and_zero_amounts():
+    classifier = DepositClassifier.compile(rules(min_amount=0))
+    assert classifier.is_deposit(tx(amount=-0.01))
+    assert not classifier.is_deposit(tx(amount=0.0))
+    assert not DepositClassifier.compile(rules(min_amount=250)).is_deposit(tx(amount=-200))
+
+
+def test_category_allow_and_deny_lists_extend_the_defaults():
+    classifier = DepositClassifier.compile(rules(
+        allow_categories=["Interest Earned"], deny_categories=["Transfer"],
+    ))
+    assert classifier.is_deposit(tx(category=["Interest Earned"]))
+    assert classifier.is_deposit(tx(category=["Payroll"]))
+    assert not classifier.is_deposit(tx(category=["Transfer"]))
+    # A denied category wins over an allowed one on the same transaction
+    assert not classifier.is_deposit(tx(category=["Payroll", "Transfer"]))
+
+
+def test_merchant_lists_take_precedence_over_categories():
+    classifier = DepositClassifier.compile(rules(
+        allow_merchants=["  Etsy Payouts "], deny_merchants=["VENMO"],
+    ))
+    assert classifier.is_deposit(tx(merchant="etsy payouts", category=["Shops"]))
+    assert not classifier.is_deposit(tx(merchant="Venmo", category=["Transfer"]))
+    # Falls back to the transaction name when Plaid has no merchant
+    assert not classifier.is_deposit(tx(merchant=None, name="venmo", category=["Transfer"]))
+    # Merchant allow-listing does not bypass the amount checks
+    assert not classifier.is_deposit(tx(amount=-5, merchant="Etsy Payouts"))
+
+
+def test_classify_keeps_page_order():
+    page = [tx(transaction_id=str(i), amount=-10 - i) for i in range(5)]
+    page[2] = tx(transaction_id="debit", amount=40)
+    assert [t.transaction_id for t in DepositClassifier.compile().classify(page)] == ["0", "1", "3", "4"]
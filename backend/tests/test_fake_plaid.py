@@ -0,0 +1,92 @@
+"""
+Tests for the local Plaid stand-in (benchmarks/fake_plaid.py).
+
+The fake runs under uvicorn on an ephemeral port and PlaidService talks to
+it through the real plaid-python SDK, so these also check that every
+response deserializes into the SDK's models.
+"""
+
+import plaid
+import pytest
+
+from app.api.routes import webhooks
+from app.services import plaid as plaid_module
+from app.services.plaid import PlaidService
+from app.services.webhook_keys import WebhookKeyCache, _fetch_plaid_key
+from benchmarks.fake_plaid import (
+    ACCESS_TOKEN_PREFIX,
+    FakePlaid,
+    FakePlaidConfig,
+    serve_in_thread,
+)
+
+
+@pytest.fixture
+def fake():
+    return FakePlaid(FakePlaidConfig(transactions_per_item=120, page_size=50))
+
+
+@pytest.fixture
+def service(fake, monkeypatch):
+    with serve_in_thread(fake) as url:
+        settings = plaid_module.settings
+        monkeypatch.setattr(settings, "plaid_host", url)
+        monkeypatch.setattr(settings, "plaid_client_id", "fake-client")
+        monkeypatch.setattr(settings, "plaid_secret", "fake-secret")
+        monkeypatch.setattr(settings, "plaid_sync_page_size", 500)
+        yield PlaidService()
+
+
+async def test_sync_pages_through_the_item_at_the_configured_page_size(fake, service):
+    pages = [p async for p in service.sync_transactions(ACCESS_TOKEN_PREFIX + "item-1")]
+
+    assert [len(p.added) for p in pages] == [50, 50, 20]
+    assert [p.has_more for p in pages] == [True, True, False]
+    ids = [t.transaction_id for p in pages for t in p.added]
+    assert len(set(ids)) == 120
+    assert any(t.amount < 0 for p in pages for t in p.added)
+
+    fake.add_transactions("item-1", 5)
+    more = [p async for p in service.sync_transactions(ACCESS_TOKEN_PREFIX + "item-1", pages[-1].next_cursor)]
+    assert [len(p.added) for p in more] == [5]
+
+
+async def test_injected_errors_surface_as_plaid_api_exceptions(fake, service):
+    fake.config.error_rate = 1.0
+    with pytest.raises(plaid.ApiException) as exc:
+        [p async for p in service.sync_transactions(ACCESS_TOKEN_PREFIX + "item-1")]
+    assert plaid_module._plaid_error_code(exc.value) == "INTERNAL_SERVER_ERROR"
+    assert fake.stats["errors_injected"] == 1
+
+
+async def test_mutation_during_pagination_restarts_the_sync(fake, service):
+    fake.config.mutation_rate = 1.0
+    with pytest.raises(plaid.ApiException):
+        [p async for p in service.sync_transactions(ACCESS_TOKEN_PREFIX + "item-1")]
+    # first attempt plus the allowed restarts
+    assert fake.stats["mutations_injected"] == plaid_module._MAX_SYNC_RESTARTS + 1
+
+
+async def test_transfers_are_authorized_and_idempotent(fake, service):
+    args = (ACCESS_TOKEN_PREFIX + "item-1", "item-1-checking", 42.5, "FlowSplit split")
+    first = await service.create_plaid_transfer(*args, idempotency_key="plan-1")
+    again = await service.create_plaid_transfer(*args, idempotency_key="plan-1")
+    other = await service.create_plaid_transfer(*args, idempotency_key="plan-2")
+    assert first == again != other
+
+    fake.config.transfer_decline_rate = 1.0
+    with pytest.raises(ValueError, match="denied"):
+        await service.create_plaid_transfer(*args, idempotency_key="plan-3")
+
+
+async def test_signed_webhooks_verify_against_the_served_key(fake, service, monkeypatch):
+    monkeypatch.setattr(webhooks.plaid_service, "client", service.client)
+    monkeypatch.setattr(webhooks, "plaid_webhook_keys", WebhookKeyCache(_fetch_plaid_key, ttl_seconds=60))
+
+    body = fake.webhook_body("item-1")
+    await webhooks._verify_plaid_signature(fake.sign_webhook(body), body)
+
+    tampered = body.replace(b"item-1", b"item-2")
+    with pytest.raises(webhooks.HTTPException) as exc:
+        await webhooks._verify_plaid_signature(fake.sign_webhook(body), tampered)
+    assert exc.value.detail == "Webhook body hash mismatch"
@@ -0,0 +1,232 @@
+"""
+Tests for the sync job queue, the worker and the enqueue-only webhook.
+
+Statements are compiled for Postgres and inspected; sessions are mocks.
+"""
+
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.dialects import postgresql
+
+from app import worker
+from app.core.config import settings
+from app.core.database import get_session
+from app.core.metrics import metrics
+from app.main import app
+from app.services import job_queue
+
+
+def compiled(statement) -> str:
+    return " ".join(str(statement.compile(dialect=postgresql.dialect())).split())
+
+
+def mock_session() -> MagicMock:
+    session = MagicMock()
+    session.execute = AsyncMock(return_value=MagicMock(first=lambda: ("job-id",)))
+    session.scalars = AsyncMock(return_value=MagicMock(all=lambda: []))
+    session.commit = AsyncMock()
+    session.rollback = AsyncMock()
+    session.__aenter__ = AsyncMock(return_value=session)
+    session.__aexit__ = AsyncMock(return_value=False)
+    return session
+
+
+async def test_claim_uses_skip_locked_and_marks_running():
+    session = mock_session()
+    await job_queue.claim_jobs(session, limit=3)
+
+    sql = compiled(session.scalars.await_args.args[0])
+    assert sql.startswith("UPDATE sync_jobs SET status=")
+    assert "ORDER BY sync_jobs.run_after" in sql
+    assert "FOR UPDATE SKIP LOCKED" in sql
+    assert "attempts=(sync_jobs.attempts +" in sql
+    # One running job per item: the next waits instead of syncing alongside it
+    assert "NOT (EXISTS (SELECT * FROM sync_jobs AS sync_jobs_1" in sql
+    assert "sync_jobs_1.item_id = sync_jobs.item_id AND sync_jobs_1.status = " in sql
+    assert "RETURNING" in sql
+
+
+async def test_enqueue_is_a_noop_while_a_job_for_the_item_is_queued():
+    session = mock_session()
+    assert await job_queue.enqueue_sync(session, "item") is True
+
+    sql = compiled(session.execute.await_args.args[0])
+    assert "ON CONFLICT (item_id) WHERE status = 'queued' DO NOTHING" in sql
+
+    session.execute.return_value = MagicMock(first=lambda: None)
+    assert await job_queue.enqueue_sync(session, "item") is False
+
+
+@pytest.mark.parametrize("attempts,retried", [(1, True), (5, False)])
+async def test_fail_job_retries_until_max_attempts(attempts, retried, monkeypatch):
+    monkeypatch.setattr(job_queue.settings, "sync_job_max_attempts", 5)
+    enqueue = AsyncMock()
+    monkeypatch.setattr(job_queue, "enqueue_sync", enqueue)
+    job = SimpleNamespace(id="j1", item_id="item", attempts=attempts)
+
+    await job_queue.fail_job(mock_session(), job, "boom")
+
+    assert enqueue.await_count == int(retried)
+    if retried:
+        assert enqueue.await_args.kwargs == {"attempts": attempts, "delay_seconds": 2}
+
+
+async def test_worker_completes_job_after_sync(monkeypatch):
+    session = mock_session()
+    monkeypatch.setattr(worker, "async_session_maker", lambda: session)
+    sync = AsyncMock(return_value=3)
+    monkeypatch.setattr(worker, "sync_new_transactions", sync)
+    complete, fail = AsyncMock(), AsyncMock()
+    monkeypatch.setattr(worker, "complete_job", complete)
+    monkeypatch.setattr(worker, "fail_job", fail)
+
+    await worker.process_job(SimpleNamespace(id="j1", item_id="item", attempts=1))
+
+    sync.assert_awaited_once_with(session, "item")
+    complete.assert_awaited_once_with(session, "j1")
+    fail.assert_not_awaited()
+
+
+async def test_worker_records_failure(monkeypatch):
+    session = mock_session()
+    monkeypatch.setattr(worker, "async_session_maker", lambda: session)
+    monkeypatch.setattr(worker, "sync_new_transactions", AsyncMock(side_effect=RuntimeError("db down")))
+    complete, fail = AsyncMock(), AsyncMock()
+    monkeypatch.setattr(worker, "complete_job", complete)
+    monkeypatch.setattr(worker, "fail_job", fail)
+    job = SimpleNamespace(id="j1", item_id="item", attempts=1)
+
+    await worker.process_job(job)
+
+    complete.assert_not_awaited()
+    fail.assert_awaited_once_with(session, job, "RuntimeError('db down')")
+    session.rollback.assert_awaited()
+
+
+async def test_failed_plaid_sync_fails_the_job_for_retry(monkeypatch):
+    """A real sync_new_transactions failure reaches fail_job, not complete_job."""
+    from app.services import deposit_detection
+
+    session = mock_session()
+    account = SimpleNamespace(id="a", user_id="u", plaid_access_token="token", cursor="c0")
+    session.execute = AsyncMock(return_value=MagicMock(scalar_one_or_none=lambda: account))
+    monkeypatch.setattr(worker, "async_session_maker", lambda: session)
+
+    async def failing_pages(**kwargs):
+        raise ConnectionError("Plaid unreachable")
+        yield  # pragma: no cover
+
+    monkeypatch.setattr(deposit_detection.plaid_service, "sync_transactions", failing_pages)
+    complete, fail = AsyncMock(), AsyncMock()
+    monkeypatch.setattr(worker, "complete_job", complete)
+    monkeypatch.setattr(worker, "fail_job", fail)
+    job = SimpleNamespace(id="j1", item_id="item", attempts=1)
+
+    await worker.process_job(job)
+
+    complete.assert_not_awaited()
+    fail.assert_awaited_once_with(session, job, "ConnectionError('Plaid unreachable')")
+
+
+async def test_cursor_only_moves_when_the_run_completes(monkeypatch):
+    """Pages are committed as they go, but a failed run keeps its start cursor."""
+    from app.services import deposit_detection
+    from app.services.plaid import TransactionSyncPage
+
+    session = mock_session()
+    account = SimpleNamespace(id="a", user_id="u", plaid_access_token="token", cursor="c0")
+    session.execute = AsyncMock(return_value=MagicMock(scalar_one_or_none=lambda: account))
+    cursors_at_commit = []
+    session.commit = AsyncMock(side_effect=lambda: cursors_at_commit.append(account.cursor))
+    monkeypatch.setattr(deposit_detection, "_process_page", AsyncMock(return_value=1))
+    fail_after_first_page = True
+
+    async def pages(**kwargs):
+        yield TransactionSyncPage(added=[], next_cursor="c1", has_more=True)
+        if fail_after_first_page:
+            raise ConnectionError("Plaid unreachable")
+        yield TransactionSyncPage(added=[], next_cursor="c2", has_more=False)
+
+    monkeypatch.setattr(deposit_detection.plaid_service, "sync_transactions", pages)
+
+    with pytest.raises(ConnectionError):
+        await deposit_detection.sync_new_transactions(session, "item")
+    assert cursors_at_commit == ["c0"] and account.cursor == "c0"
+
+    fail_after_first_page = False
+    assert await deposit_detection.sync_new_transactions(session, "item") == 2
+    assert cursors_at_commit == ["c0", "c0", "c2"]
+
+
+def post_transactions_webhook(monkeypatch, enqueue: AsyncMock, times: int = 1) -> list[dict]:
+    session = mock_session()
+
+    async def override_session():
+        yield session
+
+    monkeypatch.setattr("app.api.routes.webhooks.enqueue_sync", enqueue)
+    app.dependency_overrides[get_session] = override_session
+    try:
+        with TestClient(app) as client:
+            responses = [
+                client.post("/api/v1/webhooks/plaid", json={
+                    "webhook_type": "TRANSACTIONS",
+                    "webhook_code": "SYNC_UPDATES_AVAILABLE",
+                    "item_id": "item-1",
+                })
+                for _ in range(times)
+            ]
+    finally:
+        app.dependency_overrides.clear()
+    assert all(r.status_code == 200 for r in responses)
+    return [r.json() for r in responses]
+
+
+def test_transactions_webhook_only_enqueues(monkeypatch):
+    monkeypatch.setattr(settings, "plaid_webhook_coalesce_seconds", 5.0)
+    enqueue = AsyncMock(return_value=True)
+
+    assert post_transactions_webhook(monkeypatch, enqueue) == [{"status": "queued", "item_id": "item-1"}]
+    assert enqueue.await_args.args[1] == "item-1"
+    assert enqueue.await_args.kwargs == {"delay_seconds": 5.0}
+
+
+def test_webhook_burst_is_coalesced_and_counted(monkeypatch):
+    metrics.reset()
+    # The first webhook queues the job; the rest find it still waiting out the window
+    enqueue = AsyncMock(side_effect=[True, False, False])
+
+    responses = post_transactions_webhook(monkeypatch, enqueue, times=3)
+
+    assert [r["status"] for r in responses] == ["queued", "coalesced", "coalesced"]
+    assert metrics.snapshot() == {
+        "plaid_webhooks_coalesced": 2,
+        "plaid_webhooks_received": 3,
+        "sync_jobs_enqueued": 1,
+    }
+
+
+def test_metrics_reads_sync_outcomes_from_the_job_table():
+    """The worker's syncs show up in the API's /metrics via sync_jobs."""
+    metrics.reset()
+    metrics.incr("plaid_webhooks_received", 3)
+    session = mock_session()
+    session.execute.return_value = MagicMock(all=lambda: [("done", 4), ("failed", 1)])
+
+    async def override_session():
+        yield session
+
+    app.dependency_overrides[get_session] = override_session
+    try:
+        with TestClient(app) as client:
+            body = client.get("/metrics").json()
+    finally:
+        app.dependency_overrides.clear()
+
+    assert body["counters"]["plaid_webhooks_received"] == 3
+    assert body["sync_jobs"] == {"queued": 0, "running": 0, "done": 4, "failed": 1}
+    sql = compiled(session.execute.await_args.args[0])
+    assert sql.endswith("FROM sync_jobs GROUP BY sync_jobs.status")
@@ -0,0 +1,145 @@
+"""
+Tests for the Supabase JWKS key store.
+
+Keys are real P-256 keys generated per test; the JWKS endpoint is replaced
+by a counting async fetch that loads a local document.
+"""
+
+import asyncio
+import time
+
+import jwt
+import pytest
+from cryptography.hazmat.primitives.asymmetric import ec
+from jwt.algorithms import ECAlgorithm
+
+from app.core import security
+from app.core.jwks import SupabaseJWKS
+
+
+@pytest.fixture(autouse=True)
+def _no_network(monkeypatch):
+    async def refuse(self) -> None:
+        raise AssertionError("JWKS store tried to reach the network")
+
+    monkeypatch.setattr(SupabaseJWKS, "_fetch", refuse)
+
+
+def make_key(kid: str):
+    """(private key, public JWK dict) pair."""
+    private = ec.generate_private_key(ec.SECP256R1())
+    public = ECAlgorithm.to_jwk(private.public_key(), as_dict=True)
+    public.update(kid=kid, alg="ES256", use="sig")
+    return private, public
+
+
+def counting_store(document: dict, delay: float = 0.0, fail: bool = False) -> tuple[SupabaseJWKS, list]:
+    store = SupabaseJWKS("https://example.supabase.co/jwks", refresh_seconds=600)
+    calls: list[float] = []
+
+    async def fetch() -> None:
+        calls.append(time.monotonic())
+        await asyncio.sleep(delay)
+        if fail:
+            raise ConnectionError("Supabase unreachable")
+        store.load(document)
+
+    store._fetch = fetch  # type: ignore[method-assign]
+    return store, calls
+
+
+async def test_unknown_kid_misses_share_one_fetch_and_hits_stay_in_memory():
+    _, public = make_key("kid-1")
+    store, calls = counting_store({"keys": [public]}, delay=0.01)
+
+    keys = await asyncio.gather(*(store.get_signing_key("kid-1") for _ in range(10)))
+    assert len(calls) == 1
+    assert all(k is keys[0] and k is not None for k in keys)
+
+    assert await store.get_signing_key("kid-1") is keys[0]
+    assert len(calls) == 1
+
+
+async def test_unknown_kid_refetch_is_rate_limited(monkeypatch):
+    _, public = make_key("kid-1")
+    store, calls = counting_store({"keys": [public]})
+    await store.refresh()
+
+    assert await store.get_signing_key("forged") is None
+    assert len(calls) == 2  # one refetch for the unknown kid
+    assert await store.get_signing_key("forged") is None
+    assert len(calls) == 2  # no second refetch within the window
+
+    now = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: now + store.min_refetch_seconds + 1)
+    assert await store.get_signing_key("forged") is None
+    assert len(calls) == 3
+
+
+async def test_routine_refresh_does_not_block_a_rotated_kid():
+    _, old = make_key("kid-old")
+    _, new = make_key("kid-new")
+    document = {"keys": [old]}
+    store, calls = counting_store(document)
+    await store.refresh()  # startup / background refresh
+
+    document["keys"] = [old, new]  # Supabase rotates right after
+    assert await store.get_signing_key("kid-new") is not None
+    assert len(calls) == 2
+
+
+async def test_failed_refetch_is_rate_limited_too(monkeypatch):
+    store, calls = counting_store({"keys": []}, fail=True)
+
+    assert await store.get_signing_key("kid-1") is None
+    assert await store.get_signing_key("kid-1") is None
+    assert len(calls) == 1  # the endpoint is down; requests must not retry it each time
+
+    now = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: now + store.min_refetch_seconds + 1)
+    assert await store.get_signing_key("kid-1") is None
+    assert len(calls) == 2
+
+
+async def test_failed_prefetch_does_not_block_startup():
+    store, calls = counting_store({"keys": []}, fail=True)
+    await store.start()
+    assert store._refresher is not None and not store._refresher.done()
+    await store.stop()
+    assert store._refresher is None
+    assert len(calls) == 1
+
+
+def test_load_skips_unusable_keys():
+    _, public = make_key("kid-1")
+    store = SupabaseJWKS("https://example.supabase.co/jwks", refresh_seconds=600)
+    store.load({"keys": [
+        public,
+        {**public, "kid": "enc", "use": "enc"},
+        {"kid": "broken", "kty": "EC", "crv": "P-256", "x": "AA", "y": "AA"},
+    ]})
+    assert list(store._keys) == ["kid-1"]
+
+
+async def test_es256_token_verifies_against_the_store(monkeypatch):
+    private, public = make_key("kid-1")
+    store, calls = counting_store({"keys": [public]})
+    monkeypatch.setattr(security, "supabase_jwks", store)
+    security.clear_verified_tokens()
+
+    token = jwt.encode(
+        {"sub": "user-1", "aud": "authenticated", "exp": int(time.time()) + 3600},
+        private, algorithm="ES256", headers={"kid": "kid-1"},
+    )
+    payload = await security.verify_supabase_token(token)
+    assert payload is not None and payload["sub"] == "user-1"
+    assert len(calls) == 1
+
+    other, _ = make_key("kid-1")
+    forged = jwt.encode(
+        {"sub": "user-2", "aud": "authenticated", "exp": int(time.time()) + 3600},
+        other, algorithm="ES256", headers={"kid": "kid-1"},
+    )
+    assert await security.verify_supabase_token(forged) is None
+    security.clear_verified_tokens()
+
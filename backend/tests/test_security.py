@@ -0,0 +1,79 @@
+"""
+Tests for Supabase token verification and the verified-token cache.
+
+Tokens are HS256-signed with a test secret, so no JWKS endpoint is needed.
+"""
+
+import time
+
+import jwt
+import pytest
+
+from app.core import security
+from app.core.metrics import metrics
+
+SECRET = "test-secret-of-at-least-32-bytes!!"
+
+
+@pytest.fixture(autouse=True)
+def _fresh_cache(monkeypatch):
+    monkeypatch.setattr(security.settings, "supabase_jwt_secret", SECRET)
+    security.clear_verified_tokens()
+    metrics.reset()
+    yield
+    security.clear_verified_tokens()
+
+
+def make_token(sub: str = "user-1", expires_in: float = 3600, secret: str = SECRET) -> str:
+    return jwt.encode(
+        {"sub": sub, "aud": "authenticated", "exp": int(time.time() + expires_in)},
+        secret,
+        algorithm="HS256",
+    )
+
+
+def count_decodes(monkeypatch) -> list[str]:
+    calls: list[str] = []
+    decode = security.jwt.decode
+
+    def counting(token, *args, **kwargs):
+        calls.append(token)
+        return decode(token, *args, **kwargs)
+
+    monkeypatch.setattr(security.jwt, "decode", counting)
+    return calls
+
+
+async def test_repeat_token_is_verified_once(monkeypatch):
+    decodes = count_decodes(monkeypatch)
+    token = make_token()
+
+    first = await security.verify_supabase_token(token)
+    second = await security.verify_supabase_token(token)
+
+    assert first == second and first["sub"] == "user-1"
+    assert len(decodes) == 1
+    assert metrics.snapshot() == {"auth_token_cache_hits": 1, "auth_token_cache_misses": 1}
+    assert metrics.hit_rate("auth_token_cache") == 0.5
+
+
+async def test_cached_payload_expires_with_the_token(monkeypatch):
+    token = make_token(expires_in=60)
+    assert await security.verify_supabase_token(token) is not None
+
+    now = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: now + 61)
+    decodes = count_decodes(monkeypatch)
+
+    await security.verify_supabase_token(token)
+    assert len(decodes) == 1  # the entry lapsed at exp, so the token is verified again
+
+
+async def test_invalid_tokens_are_not_cached(monkeypatch):
+    decodes = count_decodes(monkeypatch)
+    forged = make_token(secret="wrong-secret-of-at-least-32-bytes")
+
+    assert await security.verify_supabase_token(forged) is None
+    assert await security.verify_supabase_token(forged) is None
+    assert len(decodes) == 2
+    assert metrics.hit_rate("auth_token_cache") == 0.0
@@ -1,17 +1,32 @@
 """
-Tests for split execution result properties and transfer service (Story 097).
+Tests for split execution result properties, transfer service (Story 097),
+template simulation and Plaid sync pagination.
 
 These test pure logic that doesn't require a database connection.
 """
 
+import json
+import re
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+import plaid
 import pytest
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.dialects.postgresql import asyncpg
 
+from app.services.allocation import AllocationProgram, OverflowPolicy
+from app.services.deposit_classifier import DepositClassifier
 from app.services.split_execution import (
     ActionExecutionResult,
     ActionStatus,
     SplitExecutionResult,
     SplitExecutionService,
 )
+from app.services.plaid import PlaidService, PlaidTransaction, TransactionSyncPage
+from app.services.simulation import TemplateSimulation
 from app.services.transfer import TransferService
 from tests.conftest import make_action_result
 
@@ -206,3 +221,376 @@ class TestPushpayIntegration:
     async def test_link_with_reference(self):
         url = await self.pp.generate_giving_link("org", 50.0, reference="dep-1")
         assert "r=dep-1" in url
+
+
+# ── TemplateSimulation ────────────────────────────────────────────────────────
+
+def _simulation_rows(*amounts: str) -> list:
+    detected_at = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    return [(f"d{i}", Decimal(a), detected_at) for i, a in enumerate(amounts)]
+
+
+def test_simulation_matches_reject_policy_and_totals_across_chunks():
+    program = AllocationProgram.compile(fixed=[("rent", 50_000)], percentages=[("save", 5_000)])
+    simulation = TemplateSimulation(program)
+
+    first = simulation.add_chunk(_simulation_rows("1000.00", "100.00"))
+    second = simulation.add_chunk(_simulation_rows("600.01"))
+
+    assert first[0]["allocations"] == program.allocate(1000, OverflowPolicy.REJECT)
+    assert first[1]["skipped"] is True and first[1]["allocations"] == {}
+    assert second[0]["allocations"] == {"rent": 500.0, "save": 50.0}
+
+    summary = simulation.summary()
+    assert summary["deposit_count"] == 3
+    assert summary["skipped_count"] == 1
+    assert summary["total_amount"] == 1700.01
+    assert summary["bucket_totals"] == {"rent": 1000.0, "save": 300.0}
+
+
+async def test_simulation_stream_skips_removed_deposits(monkeypatch):
+    from app.services import simulation
+
+    detected_at = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    stored = [
+        ("d0", Decimal("1000.00"), detected_at, "pending_review"),
+        ("d1", Decimal("800.00"), detected_at, "removed"),  # reversed by Plaid
+        ("d2", Decimal("600.00"), detected_at, "detected"),
+    ]
+
+    class Session:
+        """Serves `stored` through the statement's status filter, like Postgres would."""
+
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *exc):
+            return False
+
+        async def stream(self, statement):
+            self.sql = str(statement.compile(dialect=postgresql.dialect()))
+            excluded = {
+                value for value in statement.compile().params.values() if value == "removed"
+            }
+            rows = [row[:3] for row in stored if row[3] not in excluded]
+
+            async def partitions():
+                yield rows
+
+            return SimpleNamespace(partitions=partitions)
+
+    session = Session()
+    monkeypatch.setattr(simulation, "async_session_maker", lambda: session)
+    program = AllocationProgram.compile(fixed=[("rent", 50_000)], percentages=[])
+
+    lines = [line async for line in simulation.stream_template_simulation(program, "u", detected_at)]
+
+    assert "deposits.status != %(status_1)s" in session.sql
+    summary = json.loads("".join(lines).splitlines()[-1])
+    assert summary["deposit_count"] == 2
+    assert summary["total_amount"] == 1600.0
+
+
+# ── PlaidService.sync_transactions pagination ─────────────────────────────────
+
+def _sync_response(ids: list[str], next_cursor: str, has_more: bool) -> SimpleNamespace:
+    added = [
+        SimpleNamespace(
+            transaction_id=tx_id, account_id="acc", amount=-100.0, date=date(2026, 1, 1),
+            name="Payroll", merchant_name=None, category=None, pending=False,
+        )
+        for tx_id in ids
+    ]
+    return SimpleNamespace(
+        added=added, modified=[], removed=[], next_cursor=next_cursor, has_more=has_more
+    )
+
+
+class FakeSyncClient:
+    """transactions_sync stand-in serving scripted responses and recording cursors."""
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.cursors: list[str | None] = []
+
+    def transactions_sync(self, request):
+        self.cursors.append(request.to_dict().get("cursor"))
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+async def test_sync_transactions_pages_until_has_more_is_false():
+    service = PlaidService()
+    service.client = FakeSyncClient([
+        _sync_response(["t1", "t2"], "c1", True),
+        _sync_response(["t3"], "c2", True),
+        _sync_response([], "c3", False),
+    ])
+
+    pages = [page async for page in service.sync_transactions("token", cursor="c0")]
+
+    assert [[t.transaction_id for t in p.added] for p in pages] == [["t1", "t2"], ["t3"], []]
+    assert [p.next_cursor for p in pages] == ["c1", "c2", "c3"]
+    assert service.client.cursors == ["c0", "c1", "c2"]
+
+
+async def test_sync_transactions_restarts_after_mutation_during_pagination():
+    mutation = plaid.ApiException(status=400, reason="Bad Request")
+    mutation.body = '{"error_code": "TRANSACTIONS_SYNC_MUTATION_DURING_PAGINATION"}'
+    service = PlaidService()
+    service.client = FakeSyncClient([
+        _sync_response(["t1"], "c1", True),
+        mutation,
+        _sync_response(["t1", "t2"], "c2", False),
+    ])
+
+    pages = [page async for page in service.sync_transactions("token")]
+
+    assert len(pages) == 2
+    assert service.client.cursors == [None, "c1", None]
+
+
+# ── sync_new_transactions page deduplication ──────────────────────────────────
+
+async def test_page_is_one_insert_and_only_inserted_rows_get_templates(monkeypatch):
+    from app.services import deposit_detection
+
+    # The database reports t-old as a conflict: only t-new comes back
+    inserted = [SimpleNamespace(id="d1", plaid_transaction_id="t-new", amount=100, source="Payroll")]
+    db = MagicMock()
+    db.scalars = AsyncMock(return_value=MagicMock(all=lambda: inserted))
+    auto_apply = AsyncMock()
+    monkeypatch.setattr(deposit_detection, "auto_apply_templates", auto_apply)
+    monkeypatch.setattr(
+        deposit_detection, "load_deposit_classifier",
+        AsyncMock(return_value=DepositClassifier.compile()),
+    )
+    page = [
+        PlaidTransaction(
+            transaction_id=tx_id, account_id="acc", amount=-100.0, date=date(2026, 1, 1),
+            name="Payroll", merchant_name=None, category=["Payroll"], pending=False,
+        )
+        for tx_id in ("t-old", "t-new", "t-new")
+    ]
+    account = SimpleNamespace(id="acct", user_id="user")
+
+    created = await deposit_detection._process_page(
+        db, account, TransactionSyncPage(added=page, next_cursor="c", has_more=False)
+    )
+
+    assert created == 1
+    assert db.scalars.await_count == 1
+    statement, rows = db.scalars.await_args.args
+    compiled = str(statement.compile(dialect=postgresql.dialect()))
+    assert "ON CONFLICT (plaid_transaction_id) DO NOTHING RETURNING" in compiled
+    assert [row["plaid_transaction_id"] for row in rows] == ["t-old", "t-new"]
+    auto_apply.assert_awaited_once_with(db, inserted)
+
+
+async def test_auto_apply_templates_inserts_plans_and_actions_in_two_statements(monkeypatch):
+    from app.services import deposit_detection
+
+    program = AllocationProgram.compile(
+        fixed=[("b-rent", 50_000)], percentages=[("b-save", 2000)], percent_of_total=True
+    )
+    router = SimpleNamespace(route=lambda *_: "tpl", template_names={"tpl": "Payday"})
+    monkeypatch.setattr(deposit_detection, "load_template_router", AsyncMock(return_value=router))
+    monkeypatch.setattr(deposit_detection, "load_template_program", AsyncMock(return_value=program))
+    get_version = AsyncMock(return_value=7)
+    monkeypatch.setattr(deposit_detection, "get_rules_version", get_version)
+    deposits = [
+        SimpleNamespace(id=f"d{i}", user_id="u", amount=amount, source="Payroll",
+                        bank_account_id=None, status="detected")
+        for i, amount in enumerate([1000, 100, 750])  # d1 cannot cover the fixed $500
+    ]
+    db = MagicMock(execute=AsyncMock())
+
+    plan_ids = await deposit_detection.auto_apply_templates(db, deposits)
+
+    assert len(plan_ids) == 2
+    assert db.execute.await_count == 2
+    (_, plans), (_, actions) = (call.args for call in db.execute.await_args_list)
+    assert [p["id"] for p in plans] == plan_ids
+    assert [p["deposit_id"] for p in plans] == ["d0", "d2"]
+    assert [(a["split_plan_id"], a["bucket_id"], a["amount"]) for a in actions] == [
+        (plan_ids[0], "b-rent", 500.0),
+        (plan_ids[0], "b-save", 200.0),  # 20% of the whole deposit
+        (plan_ids[1], "b-rent", 500.0),
+        (plan_ids[1], "b-save", 150.0),
+    ]
+    assert [d.status for d in deposits] == ["pending_review", "detected", "pending_review"]
+    get_version.assert_awaited_once_with(db, "u")  # once per user, not per deposit
+    deposit_detection.load_template_program.assert_awaited_with(db, "tpl", 7)
+
+
+async def test_rule_changes_reach_other_processes_through_rules_version(monkeypatch):
+    """Routers are cached per rules_version, so a bump in the API retires the worker's copy."""
+    from app.core.cache import template_router_cache
+    from app.crud.crud_user import bump_rules_version
+    from app.services import template_routing
+
+    template_router_cache.clear()
+    load_rules = AsyncMock(return_value=[])
+    monkeypatch.setattr(template_routing, "get_routing_rules_by_user", load_rules)
+    versions = iter([1, 1, 2])
+    monkeypatch.setattr(template_routing, "get_rules_version", AsyncMock(side_effect=lambda *_: next(versions)))
+    db = MagicMock(execute=AsyncMock(return_value=MagicMock(all=lambda: [("tpl", "Payday")])))
+
+    first = await template_routing.load_template_router(db, "u")
+    assert await template_routing.load_template_router(db, "u") is first
+    assert await template_routing.load_template_router(db, "u") is not first
+    assert load_rules.await_count == 2
+    template_router_cache.clear()
+
+    await bump_rules_version(db, "u")
+    bump = str(db.execute.await_args.args[0].compile(dialect=postgresql.dialect()))
+    assert bump.startswith("UPDATE users SET rules_version=(users.rules_version + ")
+
+
+def _credit(tx_id: str, amount: float = -100.0) -> PlaidTransaction:
+    return PlaidTransaction(
+        transaction_id=tx_id, account_id="acc", amount=amount, date=date(2026, 1, 1),
+        name="Payroll", merchant_name=None, category=["Payroll"], pending=False,
+    )
+
+
+async def test_modified_transactions_are_upserted_and_replanned(monkeypatch):
+    from app.services import deposit_detection
+
+    new = SimpleNamespace(id="d-new", plaid_transaction_id="t-new", amount=50, source="Payroll")
+    changed = SimpleNamespace(id="d-old", plaid_transaction_id="t-old", amount=90, source="Payroll")
+    db = MagicMock()
+    db.scalars = AsyncMock(return_value=MagicMock(all=lambda: []))
+    db.execute = AsyncMock(side_effect=[
+        MagicMock(all=lambda: [(new, True), (changed, False)]),  # upsert
+        MagicMock(),                                             # delete old plans
+    ])
+    auto_apply = AsyncMock()
+    monkeypatch.setattr(deposit_detection, "auto_apply_templates", auto_apply)
+    monkeypatch.setattr(
+        deposit_detection, "load_deposit_classifier",
+        AsyncMock(return_value=DepositClassifier.compile()),
+    )
+    page = TransactionSyncPage(
+        added=[], modified=[_credit("t-new", -50), _credit("t-old", -90)],
+        next_cursor="c", has_more=False,
+    )
+
+    created = await deposit_detection._process_page(db, SimpleNamespace(id="a", user_id="u"), page)
+
+    assert created == 1
+    upsert, delete_plans = (call.args[0] for call in db.execute.await_args_list)
+    upsert_sql = " ".join(str(upsert.compile(dialect=postgresql.dialect())).split())
+    assert "ON CONFLICT (plaid_transaction_id) DO UPDATE SET amount = excluded.amount" in upsert_sql
+    assert "IS DISTINCT FROM (excluded.amount, excluded.source)" in upsert_sql
+    assert "NOT (EXISTS (SELECT" in upsert_sql
+    assert "xmax = 0 AS inserted" in upsert_sql
+    delete_sql = str(delete_plans.compile(dialect=asyncpg.dialect()))
+    assert delete_sql.startswith("DELETE FROM split_plans")
+    # split_plans.deposit_id is uuid: a varchar[] bind would fail in Postgres
+    assert "split_plans.deposit_id = ANY ($1::UUID[])" in delete_sql
+    auto_apply.assert_awaited_once_with(db, [new, changed])
+
+
+async def test_removed_transactions_cancel_unexecuted_plans_in_one_statement():
+    from app.services import deposit_detection
+
+    db = MagicMock()
+    db.execute = AsyncMock(side_effect=[
+        MagicMock(scalars=lambda: iter(["d1", "d2"])),  # deposits marked removed
+        MagicMock(),                                    # plans cancelled
+    ])
+
+    removed = await deposit_detection.remove_deposits(db, ["t1", "t2", "t-executed"])
+
+    assert removed == ["d1", "d2"]
+    mark, cancel = (
+        str(call.args[0].compile(dialect=postgresql.dialect(), compile_kwargs={"render_postcompile": True}))
+        for call in db.execute.await_args_list
+    )
+    assert mark.startswith("UPDATE deposits SET status=")
+    assert "= ANY (" in mark
+    assert cancel.startswith("UPDATE split_plans SET status=")
+    assert "split_plans.deposit_id = ANY (" in cancel
+    mark_asyncpg, cancel_asyncpg = (
+        str(call.args[0].compile(dialect=asyncpg.dialect())) for call in db.execute.await_args_list
+    )
+    assert "deposits.plaid_transaction_id = ANY ($2::VARCHAR[])" in mark_asyncpg
+    assert "split_plans.deposit_id = ANY ($2::UUID[])" in cancel_asyncpg
+    cancel_params = db.execute.await_args_list[1].args[0].compile().params
+    assert cancel_params["status"] == "cancelled"
+    assert cancel_params["values"] == ["d1", "d2"]
+
+
+async def test_backfill_copies_pages_to_staging_and_merges_once(monkeypatch):
+    from app.services import deposit_detection
+
+    recent = SimpleNamespace(id="d-recent")
+    db = MagicMock()
+    db.execute = AsyncMock(return_value=MagicMock(all=lambda: [
+        SimpleNamespace(id="d-old", status="historical"),
+        SimpleNamespace(id="d-recent", status="detected"),
+    ]))
+    db.scalars = AsyncMock(return_value=iter([recent]))
+    db.commit = AsyncMock()
+    driver = MagicMock(copy_records_to_table=AsyncMock())
+    connection = MagicMock(get_raw_connection=AsyncMock(return_value=MagicMock(driver_connection=driver)))
+    db.connection = AsyncMock(return_value=connection)
+    auto_apply = AsyncMock()
+    monkeypatch.setattr(deposit_detection, "auto_apply_templates", auto_apply)
+    monkeypatch.setattr(
+        deposit_detection, "load_deposit_classifier",
+        AsyncMock(return_value=DepositClassifier.compile()),
+    )
+
+    async def pages():
+        yield TransactionSyncPage(added=[_credit("t1"), _credit("t2", 50.0)], next_cursor="c1", has_more=True)
+        yield TransactionSyncPage(added=[_credit("t3")], removed=["t1"], next_cursor="c2", has_more=False)
+
+    account = SimpleNamespace(id="a", user_id="u", cursor=None)
+    created = await deposit_detection.backfill_transactions(db, account, pages())
+
+    assert created == 2
+    # One COPY per page with deposits; the debit t2 is classified out
+    copied = [call.kwargs["records"] for call in driver.copy_records_to_table.await_args_list]
+    assert [[r[0] for r in records] for records in copied] == [["t1"], ["t3"]]
+    statements = [str(call.args[0].compile(dialect=postgresql.dialect())) for call in db.execute.await_args_list]
+    assert statements[0].startswith("CREATE TEMP TABLE deposit_backfill")
+    assert statements[1].startswith("DELETE FROM deposit_backfill")
+    assert statements[2].startswith("INSERT INTO deposits")
+    assert "DISTINCT ON (deposit_backfill.plaid_transaction_id)" in statements[2]
+    assert "status, detected_at)" in statements[2]
+    assert re.search(r"CAST\(anon_\d+\.tx_date AS TIMESTAMP WITH TIME ZONE\)", statements[2])
+    assert len(statements) == 3
+    # The recent deposits are loaded by uuid: the bind must be uuid[], not varchar[]
+    load_recent = db.scalars.await_args.args[0]
+    assert "deposits.id = ANY ($1::UUID[])" in str(load_recent.compile(dialect=asyncpg.dialect()))
+    # Only the recent deposit is auto-applied; the cursor lands with the merge
+    auto_apply.assert_awaited_once_with(db, [recent])
+    assert account.cursor == "c2"
+    db.commit.assert_awaited_once()
+
+
+async def test_insert_deposits_skips_statement_for_empty_page():
+    from app.services.deposit_detection import insert_deposits
+
+    db = MagicMock(scalars=AsyncMock())
+    assert await insert_deposits(db, []) == []
+    db.scalars.assert_not_awaited()
+
+
+# ── get_deposits_by_ids ───────────────────────────────────────────────────────
+
+async def test_deposits_by_ids_drops_ids_that_are_not_uuids():
+    from app.crud.crud_deposit import get_deposits_by_ids
+
+    valid = "9f1c2b7e-3a4d-4e5f-8a9b-0c1d2e3f4a5b"
+    db = MagicMock(execute=AsyncMock(return_value=MagicMock()))
+    assert await get_deposits_by_ids(db, "u", ["nope", "1; drop"]) == []
+    db.execute.assert_not_awaited()
+
+    await get_deposits_by_ids(db, "u", ["nope", valid])
+    params = db.execute.await_args.args[0].compile(dialect=postgresql.dialect()).params
+    assert params["id_1"] == [valid]
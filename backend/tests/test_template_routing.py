@@ -0,0 +1,69 @@
+"""
+Tests for TemplateRouter — pure in-memory matching, no DB needed.
+"""
+
+from types import SimpleNamespace
+
+from app.services.template_routing import TemplateRouter, tokenize
+
+TEMPLATES = [("t-default", "Default"), ("t-payroll", "Payroll"), ("t-gig", "Side gig")]
+
+
+def make_rule(template_id, priority=0, source=None, min_amount=None, max_amount=None, bank=None):
+    return SimpleNamespace(
+        template_id=template_id,
+        priority=priority,
+        source_pattern=source,
+        min_amount=min_amount,
+        max_amount=max_amount,
+        bank_account_id=bank,
+    )
+
+
+def test_tokenize_ignores_case_and_punctuation():
+    assert tokenize("ACME Corp. - PAYROLL/DD") == ["acme", "corp", "payroll", "dd"]
+    assert tokenize(None) == []
+
+
+def test_no_rules_falls_back_to_oldest_template():
+    router = TemplateRouter.compile([], TEMPLATES)
+    assert router.route("Anything", 1000, None) == "t-default"
+
+
+def test_no_templates_routes_nowhere():
+    assert TemplateRouter.compile([], []).route("Acme", 1000, None) is None
+
+
+def test_source_pattern_matches_word_run_anywhere_in_source():
+    router = TemplateRouter.compile([make_rule("t-payroll", source="acme payroll")], TEMPLATES)
+    assert router.route("ACME PAYROLL DIRECT DEP", 1000, None) == "t-payroll"
+    assert router.route("Direct dep: Acme Payroll", 1000, None) == "t-payroll"
+    # Words present but not consecutive, or only a prefix of a word
+    assert router.route("Acme refund payroll", 1000, None) == "t-default"
+    assert router.route("Acmepayroll", 1000, None) == "t-default"
+
+
+def test_priority_order_wins_among_matches():
+    rules = [
+        make_rule("t-gig", source="venmo"),
+        make_rule("t-payroll", source="venmo cashout"),
+    ]
+    router = TemplateRouter.compile(rules, TEMPLATES)
+    assert router.route("Venmo cashout", 1000, None) == "t-gig"
+
+
+def test_amount_interval_and_bank_account_are_checked():
+    rules = [
+        make_rule("t-payroll", source="acme", min_amount=1000, max_amount=5000),
+        make_rule("t-gig", bank="acct-2"),
+    ]
+    router = TemplateRouter.compile(rules, TEMPLATES)
+    assert router.route("Acme", 100_000, "acct-1") == "t-payroll"
+    assert router.route("Acme", 500_000, "acct-1") == "t-payroll"
+    assert router.route("Acme", 500_001, "acct-1") == "t-default"
+    assert router.route("Acme", 99_999, "acct-2") == "t-gig"
+
+
+def test_rules_for_missing_templates_are_ignored():
+    router = TemplateRouter.compile([make_rule("t-deleted", source="acme")], TEMPLATES)
+    assert router.route("Acme", 1000, None) == "t-default"
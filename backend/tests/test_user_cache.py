@@ -0,0 +1,148 @@
+"""
+Tests for read-mostly user resolution (crud_user.resolve_user).
+
+Sessions are real AsyncSessions with no database behind them: any query
+fails the test, so a cache hit is proven to cost zero round trips.
+"""
+
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from fastapi import BackgroundTasks
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api import deps
+from app.core.cache import rejected_claims_cache, user_cache
+from app.core.metrics import metrics
+from app.crud import crud_user
+from app.models.user import User
+
+
+@pytest.fixture(autouse=True)
+def _fresh_cache():
+    user_cache.clear()
+    rejected_claims_cache.clear()
+    metrics.reset()
+    yield
+    user_cache.clear()
+    rejected_claims_cache.clear()
+
+
+def make_session(monkeypatch) -> AsyncSession:
+    session = AsyncSession()
+
+    async def no_queries(*args, **kwargs):
+        raise AssertionError("user resolution queried the database")
+
+    monkeypatch.setattr(session, "execute", no_queries)
+    monkeypatch.setattr(session, "flush", no_queries)
+    return session
+
+
+def stored_user(**overrides) -> User:
+    fields = {
+        "id": "00000000-0000-0000-0000-000000000001",
+        "supabase_id": "sb-1",
+        "email": "ada@example.com",
+        "phone_number": None,
+        "full_name": "Ada",
+        "is_active": True,
+    }
+    return User(**{**fields, **overrides})
+
+
+async def test_miss_loads_once_and_caches_after_commit(monkeypatch):
+    loaded = stored_user()
+    calls = []
+
+    async def get_or_create(session, supabase_id, *args):
+        calls.append(supabase_id)
+        return loaded
+
+    monkeypatch.setattr(crud_user, "get_or_create_user", get_or_create)
+    session = make_session(monkeypatch)
+
+    user, stale = await crud_user.resolve_user(session, "sb-1", email="ada@example.com")
+    assert user is loaded and not stale
+    assert user_cache.get("sb-1") is None  # not cached until the request commits
+
+    session.sync_session.dispatch.after_commit(session.sync_session)
+    cached = user_cache.get("sb-1")
+    assert cached is not None and cached is not loaded
+    assert cached.id == loaded.id and cached.email == "ada@example.com"
+    assert calls == ["sb-1"]
+
+
+async def test_hit_attaches_user_without_queries_or_writes(monkeypatch):
+    snapshot = crud_user._detached_copy(stored_user())
+    user_cache.set("sb-1", snapshot)
+    session = make_session(monkeypatch)
+
+    user, stale = await crud_user.resolve_user(session, "sb-1", email="ada@example.com", full_name="Ada")
+
+    assert not stale
+    assert user is not snapshot and user in session
+    assert user.id == snapshot.id and user.is_active
+    assert not session.dirty and not session.new
+    assert metrics.hit_rate("user_cache") == 1.0
+
+
+async def test_changed_claims_are_reported_not_written(monkeypatch):
+    user_cache.set("sb-1", crud_user._detached_copy(stored_user()))
+    session = make_session(monkeypatch)
+
+    user, stale = await crud_user.resolve_user(session, "sb-1", email="ada@new.example.com")
+
+    assert stale
+    assert user.email == "ada@example.com"
+    assert not session.dirty
+
+
+def test_profile_changes_ignores_missing_claims():
+    user = stored_user()
+    assert crud_user.profile_changes(user, email=None, phone_number=None, full_name="Ada") == {}
+    assert crud_user.profile_changes(user, phone_number="+15550100") == {"phone_number": "+15550100"}
+
+
+async def test_rejected_claims_are_not_resynced_on_every_request(monkeypatch):
+    """A duplicate email must not turn each request into a background UPDATE."""
+    session = MagicMock(commit=AsyncMock(side_effect=IntegrityError("UPDATE", {}, Exception())))
+    session.rollback = AsyncMock()
+    session.__aenter__ = AsyncMock(return_value=session)
+    session.__aexit__ = AsyncMock(return_value=False)
+    monkeypatch.setattr(deps, "async_session_maker", lambda: session)
+    monkeypatch.setattr(deps, "sync_user_profile", AsyncMock(return_value=True))
+    monkeypatch.setattr(deps, "verify_supabase_token", AsyncMock(return_value={
+        "sub": "sb-1", "email": "taken@example.com",
+    }))
+    monkeypatch.setattr(deps, "resolve_user", AsyncMock(return_value=(stored_user(), True)))
+    credentials = SimpleNamespace(credentials="token")
+
+    tasks = BackgroundTasks()
+    await deps.get_current_user(session, credentials, tasks)
+    assert len(tasks.tasks) == 1
+    await tasks()
+    session.rollback.assert_awaited_once()
+
+    tasks = BackgroundTasks()
+    await deps.get_current_user(session, credentials, tasks)
+    assert tasks.tasks == []  # the same claims failed already
+
+    deps.verify_supabase_token.return_value = {"sub": "sb-1", "email": "new@example.com"}
+    await deps.get_current_user(session, credentials, tasks)
+    assert len(tasks.tasks) == 1  # different claims are tried
+
+
+async def test_sync_drops_cached_user_even_if_row_already_matches(monkeypatch):
+    user_cache.set("sb-1", crud_user._detached_copy(stored_user()))
+    session = make_session(monkeypatch)
+
+    async def no_rows(*args, **kwargs):
+        return MagicMock(rowcount=0)
+
+    monkeypatch.setattr(session, "execute", no_rows)
+    assert await crud_user.sync_user_profile(session, "sb-1", email="ada@new.example.com") is False
+
+    assert user_cache.get("sb-1") is None
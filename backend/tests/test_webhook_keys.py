@@ -0,0 +1,134 @@
+"""
+Tests for the Plaid webhook verification key cache.
+
+Keys are real P-256 keys generated per test; Plaid's key endpoint is a
+counting async stand-in.
+"""
+
+import asyncio
+import base64
+import hashlib
+import time
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from fastapi import HTTPException
+from jose import jwt as jose_jwt
+
+from app.api.routes import webhooks
+from app.services.webhook_keys import WebhookKeyCache, WebhookKeyError
+
+
+def _b64(n: int) -> str:
+    return base64.urlsafe_b64encode(n.to_bytes(32, "big")).rstrip(b"=").decode()
+
+
+def make_key(kid: str = "kid-1", expired_at: int | None = None):
+    """(private key PEM, Plaid-shaped public key) pair."""
+    private = ec.generate_private_key(ec.SECP256R1())
+    numbers = private.public_key().public_numbers()
+    pem = private.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    ).decode()
+    public = SimpleNamespace(
+        kid=kid, kty="EC", crv="P-256", alg="ES256", use="sig",
+        x=_b64(numbers.x), y=_b64(numbers.y), expired_at=expired_at,
+    )
+    return pem, public
+
+
+class CountingFetch:
+    def __init__(self, keys: dict, delay: float = 0.0, fail: bool = False):
+        self.keys = keys
+        self.delay = delay
+        self.fail = fail
+        self.calls: list[str] = []
+
+    async def __call__(self, kid: str):
+        self.calls.append(kid)
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise ConnectionError("Plaid unreachable")
+        return self.keys[kid]
+
+
+async def test_concurrent_misses_share_one_fetch_and_hits_stay_in_memory():
+    _, public = make_key()
+    fetch = CountingFetch({"kid-1": public}, delay=0.01)
+    cache = WebhookKeyCache(fetch, ttl_seconds=60)
+
+    keys = await asyncio.gather(*(cache.get("kid-1") for _ in range(10)))
+    assert fetch.calls == ["kid-1"]
+    assert all(k is keys[0] for k in keys)
+
+    assert await cache.get("kid-1") is keys[0]
+    assert fetch.calls == ["kid-1"]
+
+
+async def test_key_is_refetched_after_ttl_and_expiry_is_respected(monkeypatch):
+    _, public = make_key()
+    fetch = CountingFetch({"kid-1": public})
+    cache = WebhookKeyCache(fetch, ttl_seconds=60)
+    await cache.get("kid-1")
+
+    # Plaid rotates the key out; once our TTL lapses the refetch sees expired_at
+    public.expired_at = int(time.time())
+    now = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: now + 61)
+    with pytest.raises(WebhookKeyError, match="expired"):
+        await cache.get("kid-1")
+    assert fetch.calls == ["kid-1", "kid-1"]
+
+
+async def test_failed_fetch_is_not_cached():
+    _, public = make_key()
+    fetch = CountingFetch({"kid-1": public}, fail=True)
+    cache = WebhookKeyCache(fetch, ttl_seconds=60)
+
+    results = await asyncio.gather(cache.get("kid-1"), cache.get("kid-1"), return_exceptions=True)
+    assert all(isinstance(r, WebhookKeyError) for r in results)
+
+    fetch.fail = False
+    assert await cache.get("kid-1") is not None
+    assert fetch.calls == ["kid-1", "kid-1"]
+
+
+@pytest.mark.parametrize("bad", [{"x": "AAAA"}, {"y": None}, {"kty": "RSA"}])
+async def test_malformed_key_is_a_key_error_and_not_cached(bad):
+    _, public = make_key()
+    for field, value in bad.items():
+        setattr(public, field, value)
+    fetch = CountingFetch({"kid-1": public})
+    cache = WebhookKeyCache(fetch, ttl_seconds=60)
+
+    with pytest.raises(WebhookKeyError, match="malformed"):
+        await cache.get("kid-1")
+    with pytest.raises(WebhookKeyError):
+        await cache.get("kid-1")
+    assert fetch.calls == ["kid-1", "kid-1"]
+
+
+async def test_signature_verification_uses_cached_key(monkeypatch):
+    pem, public = make_key()
+    fetch = CountingFetch({"kid-1": public})
+    monkeypatch.setattr(webhooks, "plaid_webhook_keys", WebhookKeyCache(fetch, ttl_seconds=60))
+    monkeypatch.setattr(webhooks.plaid_service, "client", MagicMock())
+
+    body = b'{"webhook_type": "TRANSACTIONS"}'
+
+    def sign(payload_body: bytes) -> str:
+        claims = {"iat": int(time.time()), "request_body_sha256": hashlib.sha256(payload_body).hexdigest()}
+        return jose_jwt.encode(claims, pem, algorithm="ES256", headers={"kid": "kid-1"})
+
+    await webhooks._verify_plaid_signature(sign(body), body)
+    await webhooks._verify_plaid_signature(sign(body), body)
+    assert fetch.calls == ["kid-1"]
+
+    with pytest.raises(HTTPException) as exc:
+        await webhooks._verify_plaid_signature(sign(b"other"), body)
+    assert exc.value.status_code == 401